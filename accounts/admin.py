@@ -3,6 +3,7 @@ from .models import *
 # Register your models here.
 
 admin.site.register(User)
+admin.site.register(Company)
 @admin.register(ModulePermission)
 class ModulePermissionAdmin(admin.ModelAdmin):
     list_display = ('user', 'module', 'can_create', 'can_read', 'can_update', 'can_delete')
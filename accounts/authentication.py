@@ -0,0 +1,100 @@
+"""
+Authentification JWT avec contexte utilisateur en cache.
+
+Le rôle (user_type), la société et les droits par module sont chargés une
+seule fois puis conservés dans un LRU local au processus. Les vérifications
+de permission et le cloisonnement par société ne font donc plus de requête.
+Le cache est invalidé par accounts.signals à chaque écriture sur
+l'utilisateur, ses permissions de module, son type ou sa société.
+
+Avec `JWT_CLAIMS_MODE`, les requêtes en lecture portant un jeton à
+revendications n'utilisent même pas ce cache (voir accounts.tokens).
+"""
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from superM.cache import LRUCache
+from .models import User
+from .tokens import has_claims, current_token_version, user_from_claims
+
+user_cache = LRUCache(
+    maxsize=getattr(settings, 'USER_CACHE_MAXSIZE', 1024),
+    ttl=getattr(settings, 'USER_CACHE_TTL', 300),
+)
+
+
+def get_cached_user(user_id):
+    """
+    Retourne une copie de l'utilisateur avec user_type, company et
+    module_permissions déjà résolus, ou None s'il n'existe pas.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.objects.select_related('user_type', 'company').filter(pk=user_id).first()
+        if user is None:
+            return None
+        user.module_permissions
+        user_cache.set(user_id, user)
+    return _rebuild(user)
+
+
+def _rebuild(user):
+    """
+    Nouvelle instance par requête, construite avec `from_db` : état, relations
+    et droits propres à la requête, rien de ce qu'une vue y pose ne fuit vers
+    les suivantes ni vers le cache.
+    """
+    names = [field.attname for field in User._meta.concrete_fields]
+    clone = User.from_db(user._state.db, names, [getattr(user, name) for name in names])
+    for name in ('user_type', 'company'):
+        related = getattr(user, name)
+        if related is not None:
+            setattr(clone, name, copy.copy(related))
+    clone.__dict__['module_permissions'] = copy.deepcopy(user.module_permissions)
+    return clone
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+
+
+def invalidate_all_users():
+    user_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if getattr(settings, 'JWT_CLAIMS_MODE', False) and has_claims(validated_token):
+            if validated_token['ver'] != current_token_version(user_id):
+                raise InvalidToken("Les droits de l'utilisateur ont changé, le jeton doit être renouvelé.")
+            if getattr(self, 'read_only', False) and not api_settings.CHECK_REVOKE_TOKEN:
+                return user_from_claims(validated_token)
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_companies(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Company = apps.get_model('accounts', 'Company')
+    names = User.objects.exclude(company_name__isnull=True).exclude(company_name='').values_list('company_name', flat=True).distinct()
+    for name in names:
+        company = Company.objects.get_or_create(name=name)[0]
+        User.objects.filter(company_name=name).update(company=company)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Société',
+                'verbose_name_plural': 'Sociétés',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='accounts.company'),
+        ),
+        migrations.RunPython(populate_companies, migrations.RunPython.noop),
+    ]
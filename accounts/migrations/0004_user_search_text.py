@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+from superM.search import normalize, trigram_index
+
+
+def populate_search_text(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    rows = list(User.objects.all())
+    for user in rows:
+        user.search_text = normalize(user.username, user.first_name, user.last_name, user.email, user.company_name)
+    User.objects.bulk_update(rows, ['search_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        trigram_index('accounts_user'),
+    ]
@@ -1,9 +1,41 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import MinLengthValidator
+from django.utils.functional import cached_property
 from parametres.models import UserType, Commune, Quartier, Zone, Module,TypeCommerce
+from superM.search import normalize
+from superM.tracking import saves_any
 
-class UserManager(BaseUserManager):
+class Company(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Société"
+        verbose_name_plural = "Sociétés"
+
+class TenantQuerySet(models.QuerySet):
+    """
+    Cloisonnement par société : `Model.objects.for_tenant(user)` ne garde que les
+    lignes de la société de l'utilisateur (tout pour un Super_admin). Le champ
+    filtré est `tenant_field` sur le modèle, `company` par défaut. Un
+    utilisateur sans société n'a pas de périmètre : `company_id=None`
+    viserait les lignes de tous les utilisateurs sans société.
+    """
+    def for_tenant(self, user):
+        if not user.is_authenticated:
+            return self.none()
+        if user.is_super_admin:
+            return self
+        if user.company_id is None:
+            return self.none()
+        tenant_field = getattr(self.model, 'tenant_field', 'company')
+        return self.filter(**{f'{tenant_field}_id': user.company_id})
+
+class UserManager(BaseUserManager.from_queryset(TenantQuerySet)):
     def create_user(self, email, username, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
@@ -40,6 +72,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     company_name = models.CharField(max_length=255, blank=True, null=True)
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     date_creation = models.DateField(blank=True, null=True)  # Changé en DateField
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
@@ -47,6 +80,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     quartier = models.ForeignKey(Quartier, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     zone = models.ForeignKey(Zone, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     typecommerce = models.ForeignKey(TypeCommerce, on_delete=models.SET_NULL, null=True, blank=True)
+    token_version = models.PositiveIntegerField(default=0)  # Incrémenté quand les droits changent (voir accounts.tokens)
+    search_text = models.TextField(blank=True, default='', editable=False)  # Voir superM.search
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
@@ -55,6 +90,48 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+    @property
+    def is_super_admin(self):
+        return self.user_type.name.lower() == 'super_admin'
+
+    @cached_property
+    def module_permissions(self):
+        """Droits par nom de module : {module: {'can_create': ..., 'can_read': ..., ...}}."""
+        return {
+            row.pop('module__name'): row
+            for row in self.module_permission_assignments.values(
+                'module__name', 'can_create', 'can_read', 'can_update', 'can_delete'
+            )
+        }
+
+    search_document_fields = ('username', 'first_name', 'last_name', 'email', 'company_name')  # Sources de search_text
+
+    def search_document(self):
+        return normalize(*(getattr(self, name) for name in self.search_document_fields))
+
+    def save(self, *args, **kwargs):
+        # La société (tenant) suit company_name ; les lignes dénormalisées sont
+        # mises à jour par products.signals quand elle change.
+        # Une mise à jour partielle sans company_name ni company ne touche pas à la société.
+        update_fields = kwargs.get('update_fields')
+        previous_company_id = self.company_id
+        if saves_any(update_fields, ('company_name', 'company')):
+            if not self.company_name:
+                self.company = None
+            elif self.company_id is None or self.company.name != self.company_name:
+                self.company = Company.objects.get_or_create(name=self.company_name)[0]
+        self._company_changed = self.pk is not None and previous_company_id != self.company_id
+        self.search_text = self.search_document()
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if self._company_changed:
+                update_fields.add('company')
+            if saves_any(update_fields, self.search_document_fields):
+                # Pas pour une mise à jour partielle sans effet sur la recherche (last_login, token_version)
+                update_fields.add('search_text')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Utilisateur"
         verbose_name_plural = "Utilisateurs"
@@ -1,6 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth.hashers import make_password
 from .models import User, ModulePermission
+from .tokens import add_claims
 from parametres.models import Module, UserType, Commune, Quartier, Zone
 
 # Sérialiseur principal pour les utilisateurs
@@ -129,18 +134,6 @@ class ModulePermissionSerializer(serializers.ModelSerializer):
         model = ModulePermission
         fields = ['id', 'module', 'user', 'can_create', 'can_read', 'can_update', 'can_delete']
 
-    def create(self, validated_data):
-        module_name = validated_data.pop('module')
-        user_email = validated_data.pop('user')
-        module = Module.objects.get(name=module_name)
-        user = User.objects.get(username=user_email)
-        return ModulePermission.objects.create(module=module, user=user, **validated_data)
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['module'] = instance.module.name
-        representation['user'] = instance.user.email
-        return representation
     
 class StatsSerializer(serializers.Serializer):
     overview = serializers.DictField()
@@ -151,4 +144,24 @@ class StatsSerializer(serializers.Serializer):
     class Meta:
         fields = ['overview', 'by_user_type', 'by_commune', 'by_commerce_type']
 
-        
\ No newline at end of file
+        
+
+
+# Sérialiseurs de jetons : ajoutent les revendications signées au jeton d'accès
+# quand JWT_CLAIMS_MODE est actif (voir accounts.tokens)
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if getattr(settings, 'JWT_CLAIMS_MODE', False):
+            data['access'] = str(add_claims(AccessToken(data['access'], verify=False), self.user))
+        return data
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if getattr(settings, 'JWT_CLAIMS_MODE', False):
+            access = AccessToken(data['access'], verify=False)
+            user = User.objects.select_related('user_type').get(pk=access[api_settings.USER_ID_CLAIM])
+            data['access'] = str(add_claims(access, user))
+        return data
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from parametres.models import UserType, Module
+from .authentication import invalidate_user, invalidate_all_users
+from .models import User, ModulePermission, Company
+from .tokens import bump_token_version
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ModulePermission)
+def invalidate_cached_permissions(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserType)
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_cached_users(sender, instance, **kwargs):
+    """Un renommage de type, de module ou de société touche tous les utilisateurs en cache."""
+    invalidate_all_users()
+
+
+@receiver([post_save, post_delete], sender=ModulePermission)
+def revoke_tokens_on_permission_change(sender, instance, **kwargs):
+    bump_token_version([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login', 'token_version'}):
+        return
+    bump_token_version([instance.pk])
+
+
+@receiver(post_save, sender=UserType)
+def revoke_tokens_on_user_type_change(sender, instance, **kwargs):
+    bump_token_version(instance.users.all())
+
+
+@receiver(post_save, sender=Company)
+def revoke_tokens_on_company_change(sender, instance, **kwargs):
+    bump_token_version(instance.users.all())
+
+
+@receiver(post_save, sender=Module)
+def revoke_tokens_on_module_change(sender, instance, **kwargs):
+    bump_token_version(User.objects.filter(module_permission_assignments__module=instance))
@@ -1,3 +1,208 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from parametres.models import Category, OrderStatus, UserType
+from products.models import Order, Product
+from superM.testing import sample_data
+from .authentication import CachedJWTAuthentication, get_cached_user, invalidate_all_users
+from .models import Company, ModulePermission, User
+from .tokens import add_claims, bump_token_version, current_token_version
+
+
+class TokenVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'a@x.com', 'alice', 'pw', user_type=UserType.objects.create(name='Fournisseur'), company_name='ACME'
+        )
+
+    def token_version(self):
+        return User.objects.values_list('token_version', flat=True).get(pk=self.user.pk)
+
+    def test_login_keeps_tokens(self):
+        version = self.token_version()
+        update_last_login(None, self.user)
+        self.assertEqual(self.token_version(), version)
+
+    def test_search_fields_update_search_text_and_revoke_tokens(self):
+        version = self.token_version()
+        self.user.first_name = 'Élodie'
+        self.user.save(update_fields=['first_name'])
+        self.user.refresh_from_db()
+        self.assertIn('elodie', self.user.search_text)
+        self.assertEqual(self.token_version(), version + 1)
+
+
+class TenantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=2)
+        user_type = UserType.objects.get(name='Fournisseur')
+        cls.other = User.objects.create_user('o@x.com', 'other', 'pw', user_type=user_type, company_name='Autre')
+        category = Category.objects.first()
+        cls.other_product = Product.objects.create(
+            name='Mil', category=category, supplier=cls.other, last_order=date.today()
+        )
+        cls.other_order = Order.objects.create(user=cls.other, status=OrderStatus.objects.first())
+        cls.loners = [
+            User.objects.create_user(f'{name}@x.com', name, 'pw', user_type=user_type) for name in ('seul', 'isole')
+        ]
+        Product.objects.create(name='Sorgho', category=category, supplier=cls.loners[0], last_order=date.today())
+
+    def pks(self, model, user):
+        return set(model.objects.for_tenant(user).values_list('pk', flat=True))
+
+    def test_each_company_sees_only_its_rows(self):
+        acme = {product.pk for product in self.data.products}
+        self.assertEqual(self.pks(Product, self.data.supplier), acme)
+        self.assertEqual(self.pks(Product, self.other), {self.other_product.pk})
+        self.assertEqual(self.pks(Order, self.data.supplier), {order.pk for order in self.data.orders})
+        self.assertEqual(self.pks(Order, self.other), {self.other_order.pk})
+        self.assertEqual(self.pks(User, self.other), {self.other.pk})
+
+    def test_super_admin_sees_every_company(self):
+        self.assertEqual(self.pks(Product, self.data.admin), set(Product.objects.values_list('pk', flat=True)))
+
+    def test_users_without_company_share_nothing(self):
+        for user in self.loners:
+            self.assertIsNone(user.company_id)
+            self.assertEqual(self.pks(Product, user), set())
+            self.assertEqual(self.pks(User, user), set())
+
+    def test_partial_save_keeps_the_company(self):
+        company_id = self.other.company_id
+        User.objects.filter(pk=self.other.pk).update(company_name='Nouvelle')
+        user = User.objects.get(pk=self.other.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.first_name = 'Awa'
+            user.save(update_fields=['first_name'])
+        self.assertNotIn('company_id', ' '.join(query['sql'] for query in queries))
+        self.assertEqual(User.objects.values_list('company', flat=True).get(pk=user.pk), company_id)
+        self.assertEqual(Product.objects.values_list('company', flat=True).get(pk=self.other_product.pk), company_id)
+
+        user.save(update_fields=['company_name'])
+        user.refresh_from_db()
+        self.assertEqual(user.company.name, 'Nouvelle')
+        self.assertEqual(Product.objects.values_list('company', flat=True).get(pk=self.other_product.pk), user.company_id)
+
+
+@override_settings(JWT_CLAIMS_MODE=True)
+class ClaimsModeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def token(self, user=None):
+        user = User.objects.select_related('user_type').get(pk=(user or self.data.supplier).pk)
+        return str(add_claims(RefreshToken.for_user(user).access_token, user))
+
+    def authenticate(self, token, method='get'):
+        request = getattr(RequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_reads_use_the_claims_without_accounts_queries(self):
+        token = self.token()
+        self.authenticate(token)  # Version du jeton mise en cache
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual(user.pk, self.data.supplier.pk)
+            self.assertEqual(user.company_id, self.data.supplier.company_id)
+            self.assertEqual(user.user_type.name, 'Fournisseur')
+            self.assertTrue(user.module_permissions['Shops']['can_read'])
+            self.assertFalse(user.module_permissions['Shops']['can_delete'])
+
+    def test_writes_load_the_user(self):
+        user = self.authenticate(self.token(), method='post')
+        self.assertEqual(user.module_permissions, self.data.supplier.module_permissions)
+
+    def test_revoked_token_is_rejected(self):
+        token = self.token()
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            ModulePermission.objects.filter(user=self.data.supplier, module__name='Shops').get().delete()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(token)
+        self.assertNotIn('Shops', self.authenticate(self.token()).module_permissions)
+
+    def test_version_cache_is_cleared_after_commit(self):
+        user = self.data.supplier
+        version = current_token_version(user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_token_version([user.pk])
+            current_token_version(user.pk)  # Lecture concurrente avant le commit : ancienne version en cache
+        self.assertEqual(current_token_version(user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(current_token_version(user.pk), version + 1)
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def setUp(self):
+        invalidate_all_users()
+        self.addCleanup(invalidate_all_users)
+
+    def user(self):
+        return get_cached_user(self.data.supplier.pk)
+
+    def test_second_lookup_is_served_from_the_cache(self):
+        self.user()
+        with self.assertNumQueries(0):
+            user = self.user()
+            self.assertEqual((user.user_type.name, user.company.name), ('Fournisseur', 'ACME'))
+            self.assertTrue(user.module_permissions['Shops']['can_read'])
+
+        token = RefreshToken.for_user(self.data.supplier).access_token
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedJWTAuthentication().authenticate(request)[0].pk, self.data.supplier.pk)
+
+    def test_each_lookup_gets_its_own_instance(self):
+        first = self.user()
+        first.first_name = 'Modifié'
+        first.company.name = 'Autre'
+        first.module_permissions['Shops']['can_delete'] = True
+        first._state.fields_cache.clear()
+        first._state.adding = True
+        with self.assertNumQueries(0):
+            second = self.user()
+            self.assertNotEqual(second.first_name, 'Modifié')
+            self.assertEqual(second.company.name, 'ACME')
+            self.assertFalse(second.module_permissions['Shops']['can_delete'])
+            self.assertFalse(second._state.adding)
+
+    def test_user_change_invalidates(self):
+        self.user()
+        user = User.objects.get(pk=self.data.supplier.pk)
+        user.first_name = 'Awa'
+        user.save(update_fields=['first_name'])
+        self.assertEqual(self.user().first_name, 'Awa')
+
+    def test_permission_change_invalidates(self):
+        self.user()
+        ModulePermission.objects.filter(user=self.data.supplier, module__name='Shops').update(can_delete=True)
+        self.assertFalse(self.user().module_permissions['Shops']['can_delete'])  # update() ne passe pas par les signaux
+        ModulePermission.objects.get(user=self.data.supplier, module__name='Shops').save()
+        self.assertTrue(self.user().module_permissions['Shops']['can_delete'])
+        ModulePermission.objects.get(user=self.data.supplier, module__name='Produits').delete()
+        self.assertNotIn('Produits', self.user().module_permissions)
+
+    def test_company_change_invalidates(self):
+        self.user()
+        company = Company.objects.get(pk=self.data.supplier.company_id)
+        company.name = 'ACME SA'
+        company.save()
+        self.assertEqual(self.user().company.name, 'ACME SA')
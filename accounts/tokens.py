@@ -0,0 +1,101 @@
+"""
+Revendications signées (claims) des jetons d'accès JWT.
+
+Avec `JWT_CLAIMS_MODE` actif, le jeton d'accès porte le type d'utilisateur,
+la société, `is_staff` et un masque de droits par module. Les requêtes en
+lecture sont alors autorisées sans lire les tables accounts : seul le numéro
+de version du jeton (`ver`) est comparé à `User.token_version`, lu depuis le
+cache. Toute modification des droits incrémente cette version, ce qui force
+le client à renouveler son jeton.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings
+
+from parametres.models import UserType
+from .models import User
+
+# Un bit par droit : {module: can_create | can_read | can_update | can_delete}
+PERMISSION_BITS = (
+    ('can_create', 1),
+    ('can_read', 2),
+    ('can_update', 4),
+    ('can_delete', 8),
+)
+
+
+def encode_permissions(module_permissions):
+    return {
+        module: sum(bit for field, bit in PERMISSION_BITS if rights[field])
+        for module, rights in module_permissions.items()
+    }
+
+
+def decode_permissions(bitmap):
+    return {
+        module: {field: bool(bits & bit) for field, bit in PERMISSION_BITS}
+        for module, bits in bitmap.items()
+    }
+
+
+def add_claims(token, user):
+    token['user_type'] = user.user_type.name
+    token['user_type_id'] = user.user_type_id
+    token['company_id'] = user.company_id
+    token['is_staff'] = user.is_staff
+    token['perms'] = encode_permissions(user.module_permissions)
+    token['ver'] = user.token_version
+    return token
+
+
+def has_claims(token):
+    return 'ver' in token
+
+
+def _version_key(user_id):
+    return f'accounts:token_version:{user_id}'
+
+
+def current_token_version(user_id):
+    """Version courante des droits de l'utilisateur (None s'il n'existe plus)."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 60))
+    return version
+
+
+def bump_token_version(users):
+    """Invalide les jetons à revendications des utilisateurs (queryset ou liste d'ids)."""
+    if not isinstance(users, (list, tuple, set)):
+        users = list(users.values_list('pk', flat=True))
+    if not users:
+        return
+    User.objects.filter(pk__in=users).update(token_version=F('token_version') + 1)
+    # Après le commit : une lecture concurrente remettrait sinon en cache l'ancienne version.
+    keys = [_version_key(user_id) for user_id in users]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def user_from_claims(token):
+    """
+    Construit l'utilisateur à partir du jeton, sans requête. Les champs absents
+    du jeton sont différés : ils ne sont chargés que si une vue les lit.
+    """
+    values = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        'is_active': True,
+        'is_staff': token['is_staff'],
+        'user_type_id': token['user_type_id'],
+        'company_id': token['company_id'],
+        'token_version': token['ver'],
+    }
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db('default', field_names, [values[name] for name in field_names])
+    user.user_type = UserType.from_db('default', ['id', 'name'], [token['user_type_id'], token['user_type']])
+    user.__dict__['module_permissions'] = decode_permissions(token['perms'])
+    return user
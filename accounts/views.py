@@ -3,10 +3,15 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from superM.pagination import CustomShopPagination, PaginatedListMixin
+from superM.prefetch import PrefetchPlanMixin
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django_filters.rest_framework import DjangoFilterBackend
+from superM.search import SearchFilter
+from superM.statscache import CachedStatsMixin
+from superM.statsfields import StatsFieldsMixin, select
 from rest_framework.renderers import JSONRenderer
 from rest_framework import generics
 from .models import User, ModulePermission
@@ -15,30 +20,9 @@ from .serializers import (
     ModulePermissionSerializer
 )
 from datetime import datetime, timedelta
+from functools import cache
 
-from parametres.models import UserType
-
-class CustomShopPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
-
-    def get_page_size(self, request):
-        try:
-            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
-            if limit <= 0:
-                return self.page_size
-            return min(limit, self.max_page_size)
-        except (ValueError, TypeError):
-            return self.page_size
-
-    def get_paginated_response(self, data):
-        return Response({
-            'total': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'data': data
-        })
+from parametres.models import UserType, Commune, TypeCommerce
 
 class ReadOnlyOrAuthenticated(IsAuthenticated):
     def has_permission(self, request, view):
@@ -46,11 +30,11 @@ class ReadOnlyOrAuthenticated(IsAuthenticated):
             return True
         return super().has_permission(request, view)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PrefetchPlanMixin, PaginatedListMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().select_related('user_type', 'commune', 'quartier', 'zone').order_by('username')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['username', 'email', 'user_type', 'commune', 'quartier', 'zone', 'is_active']
     search_fields = ['username', 'email', 'first_name', 'last_name']
     pagination_class = CustomShopPagination
@@ -75,17 +59,6 @@ class UserViewSet(viewsets.ModelViewSet):
             return CurrentUserSerializer
         return super().get_serializer_class()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            serializer = self.get_serializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        return Response(serializer.data)
-
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def register(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
@@ -99,7 +72,7 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = CurrentUserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
-class ModulePermissionViewSet(viewsets.ModelViewSet):
+class ModulePermissionViewSet(PrefetchPlanMixin, PaginatedListMixin, viewsets.ModelViewSet):
     queryset = ModulePermission.objects.all().select_related('module', 'user').order_by('user__username')
     serializer_class = ModulePermissionSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
@@ -109,17 +82,6 @@ class ModulePermissionViewSet(viewsets.ModelViewSet):
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]  # Forcer JSON
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            serializer = self.get_serializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        return Response(serializer.data)
-
 
 
 class UserByTypeViewSet(viewsets.ViewSet):
@@ -155,28 +117,18 @@ class UserByTypeViewSet(viewsets.ViewSet):
         """
         Default endpoint to return all users grouped by user_type.
         """
-        # Get all user types
-        user_types = UserType.objects.all()
-
-        # Initialize result list
-        result = []
-
-        # Iterate through each user type
-        for user_type in user_types:
-            users = User.objects.filter(user_type=user_type).select_related(
-                'user_type', 'commune', 'quartier', 'zone'
-            )
-            serializer = UserSerializer(users, many=True, context={'request': request})
-            result.extend(serializer.data)  # Extend to flatten the list
+        # Tous les utilisateurs regroupés par type, en une seule requête
+        users = User.objects.select_related('user_type', 'commune', 'quartier', 'zone').order_by('user_type_id', 'pk')
 
         # Handle pagination
         paginate = request.query_params.get('paginate') == 'true'
         if paginate:
             paginator = self.pagination_class()
-            # Since we're not using a queryset directly, we need to handle pagination manually
-            page = paginator.paginate_queryset(result, request)
-            return paginator.get_paginated_response(page)
-        return Response(result)
+            page = paginator.paginate_queryset(users, request)
+            serializer = UserSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data)
+        serializer = UserSerializer(users, many=True, context={'request': request})
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='super_admin')
     def super_admin(self, request):
@@ -208,8 +160,10 @@ class UserByTypeViewSet(viewsets.ViewSet):
         """Endpoint for detaillant users."""
         return self.get_users_by_type('detaillant', request)
 
-class StatsView(viewsets.ViewSet):
+class StatsView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    cache_scope = 'global'
+    cache_models = [User, UserType, Commune, TypeCommerce]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]  # Forcer JSON
 
@@ -217,77 +171,62 @@ class StatsView(viewsets.ViewSet):
         days = int(request.query_params.get('days', 30))
         start_date = datetime.now() - timedelta(days=days)
 
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        new_users = User.objects.filter(created_at__gte=start_date).count()
-
-        user_types_stats = User.objects.values('user_type__name').annotate(
-            total=Count('id'),
-            active=Count('id', filter=Q(is_active=True)),
-            recent=Count('id', filter=Q(created_at__gte=start_date))
-        ).order_by('user_type__name')
-
-        commune_stats = User.objects.values('commune__name').annotate(
-            total=Count('id'),
-            active=Count('id', filter=Q(is_active=True))
-        ).order_by('-total')[:10]
-
-        commerce_stats = User.objects.values('typecommerce__name').annotate(
-            total=Count('id')
-        ).order_by('-total')
+        @cache
+        def totals():
+            return User.objects.aggregate(
+                total=Count('id'),
+                active=Count('id', filter=Q(is_active=True)),
+                new=Count('id', filter=Q(created_at__gte=start_date))
+            )
 
-        activity_rate = (active_users / total_users * 100) if total_users > 0 else 0
+        # Seules les métriques demandées (`?fields=overview.total_users,by_commune`) sont calculées
+        response_data = select({
+            'overview': {
+                'total_users': lambda: totals()['total'],
+                'active_users': lambda: totals()['active'],
+                'new_users_last_30_days': lambda: totals()['new'],
+                'activity_rate': lambda: round(totals()['active'] / totals()['total'] * 100, 2) if totals()['total'] else 0,
+                'timeframe_days': lambda: days,
+            },
+            'by_user_type': lambda: list(User.objects.values('user_type__name').annotate(
+                total=Count('id'),
+                active=Count('id', filter=Q(is_active=True)),
+                recent=Count('id', filter=Q(created_at__gte=start_date))
+            ).order_by('user_type__name')),
+            'by_commune': lambda: list(User.objects.values('commune__name').annotate(
+                total=Count('id'),
+                active=Count('id', filter=Q(is_active=True))
+            ).order_by('-total')[:10]),
+            'by_commerce_type': lambda: list(User.objects.values('typecommerce__name').annotate(
+                total=Count('id')
+            ).order_by('-total')),
+        }, self.fields)
 
         if request.query_params.get('paginate') == 'true':
             paginator = self.pagination_class()
-            user_types_paginated = paginator.paginate_queryset(user_types_stats, request)
-            commune_paginated = paginator.paginate_queryset(commune_stats, request)
-            commerce_paginated = paginator.paginate_queryset(commerce_stats, request)
-
-            response_data = {
-                'overview': {
-                    'total_users': total_users,
-                    'active_users': active_users,
-                    'new_users_last_30_days': new_users,
-                    'activity_rate': round(activity_rate, 2),
-                    'timeframe_days': days
-                },
-                'by_user_type': user_types_paginated,
-                'by_commune': commune_paginated,
-                'by_commerce_type': commerce_paginated
-            }
+            for section in response_data.keys() - {'overview'}:
+                response_data[section] = paginator.paginate_queryset(response_data[section], request)
             return paginator.get_paginated_response(response_data)
-        else:
-            response_data = {
-                'overview': {
-                    'total_users': total_users,
-                    'active_users': active_users,
-                    'new_users_last_30_days': new_users,
-                    'activity_rate': round(activity_rate, 2),
-                    'timeframe_days': days
-                },
-                'by_user_type': list(user_types_stats),
-                'by_commune': list(commune_stats),
-                'by_commerce_type': list(commerce_stats)
-            }
-            return Response(response_data)
+        return Response(response_data)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == status.HTTP_200_OK:
-            try:
-                user = User.objects.get(email=request.data['email'])
-                response.data.update({
-                    'user_id': user.pk,
-                    'email': user.email,
-                    'username': user.username,
-                    'user_type': user.user_type.name if user.user_type else None,
-                    'company_name': user.company_name if user.company_name else None,
-                })
-            except User.DoesNotExist:
-                return Response({"error": "Utilisateur non trouvé."}, status=status.HTTP_404_NOT_FOUND)
-        return response
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        # L'utilisateur vient d'être authentifié par le sérialiseur : pas de nouvelle requête par email
+        user = serializer.user
+        data = dict(serializer.validated_data)
+        data.update({
+            'user_id': user.pk,
+            'email': user.email,
+            'username': user.username,
+            'user_type': user.user_type.name if user.user_type else None,
+            'company_name': user.company_name if user.company_name else None,
+        })
+        return Response(data, status=status.HTTP_200_OK)
 from rest_framework.views import APIView
 class UserLogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
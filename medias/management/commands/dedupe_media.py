@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+
+from medias.signals import recount, tracked_fields
+from medias.storage import CAS_DIR, PASSTHROUGH, content_name, file_digest
+from superM import images
+from superM.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Range les médias existants dans le stockage par contenu : chaque fichier référencé est copié "
+        "sous l'empreinte de son contenu (une seule copie par contenu), les lignes sont mises à jour "
+        "et l'ancien fichier est supprimé. Les compteurs de références sont ensuite recalculés et les "
+        "dérivés d'images régénérés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche le gain sans rien modifier")
+
+    def referenced_names(self):
+        """{ancien nom: [(modèle, champ), ...]} des fichiers hors stockage par contenu."""
+        references = defaultdict(list)
+        for model, fields in tracked_fields().items():
+            for field in fields:
+                names = model._base_manager.exclude(
+                    Q(**{f'{field.attname}__isnull': True}) | Q(**{field.attname: ''})
+                    | Q(**{f'{field.attname}__startswith': f'{CAS_DIR}/'})
+                ).values_list(field.attname, flat=True).distinct()
+                for name in names.iterator():
+                    if not name.startswith(PASSTHROUGH):
+                        references[name].append((model, field))
+        return references
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        references = self.referenced_names()
+        targets, sizes, missing = {}, {}, []
+        for name in sorted(references):
+            if not storage.exists(name):
+                missing.append(name)
+                continue
+            with storage.open(name, 'rb') as f:
+                targets[name] = content_name(file_digest(f), name)
+            sizes[name] = storage.size(name)
+
+        unique = {}
+        for name, target in targets.items():
+            unique.setdefault(target, sizes[name])
+        saved = sum(sizes.values()) - sum(unique.values())
+        self.stdout.write(
+            f"{len(targets)} fichiers référencés, {len(unique)} contenus distincts, "
+            f"{saved / 1024 / 1024:.1f} Mo récupérables, {len(missing)} introuvables."
+        )
+        for name in missing:
+            self.stderr.write(f"Introuvable : {name}")
+        if options['dry_run']:
+            return
+
+        for name, target in targets.items():
+            if not storage.exists(target):
+                with storage.open(name, 'rb') as f:
+                    storage.save(name, f)
+            with transaction.atomic():
+                for model, field in references[name]:
+                    changes = {field.attname: target}
+                    if any(f.name == 'updated_at' for f in model._meta.fields):
+                        changes['updated_at'] = Now()  # Nouvelle URL : renvoyée par la synchronisation
+                    model._base_manager.filter(**{field.attname: name}).update(**changes)
+                    bump_version(model)
+            storage.delete(name)
+            images.delete_derivatives(storage, name)
+
+        referenced, orphans = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(targets)} fichiers rangés par contenu ; {referenced} fichiers référencés, "
+            f"{orphans} orphelins supprimés."
+        ))
+        call_command('build_image_derivatives', stdout=self.stdout, stderr=self.stderr)
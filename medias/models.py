@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class MediaFile(models.Model):
+    """Fichier du stockage par contenu et nombre de champs qui le référencent (voir medias.storage)."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+    class Meta:
+        verbose_name = "Fichier média"
+        verbose_name_plural = "Fichiers médias"
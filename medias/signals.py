@@ -0,0 +1,169 @@
+"""
+Comptage des références aux fichiers du stockage par contenu.
+
+Pour chaque modèle ayant des champs fichier, le nom stocké de chaque champ est
+mémorisé au chargement ; à l'enregistrement, un nom qui change libère l'ancien
+fichier et référence le nouveau ; à la suppression, tous sont libérés. Un
+fichier dont le compteur tombe à zéro est supprimé après le commit, avec ses
+dérivés d'images.
+
+Le stockage prend la référence d'un fichier envoyé (`pin`) avant d'en rendre
+le nom, pour qu'une suppression concurrente ne le retire pas entre l'envoi et
+l'enregistrement de la ligne ; l'enregistrement reprend cette référence au
+lieu d'en ajouter une. Une référence prise pour un enregistrement qui échoue
+reste comptée jusqu'au prochain `recount` : le fichier est gardé, jamais
+supprimé à tort.
+"""
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, FileField
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from superM.images import delete_derivatives
+from .models import MediaFile
+from .storage import CAS_DIR, ContentAddressedStorage, is_content_addressed
+
+_pins = threading.local()  # Références prises par le stockage, pas encore reprises par un enregistrement
+
+
+def tracked_fields():
+    """{modèle: [champs fichier du stockage par contenu]} (hors dérivés d'images)."""
+    fields = {}
+    for model in apps.get_models():
+        model_fields = [
+            field for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+            and field.editable
+        ]
+        if model_fields:
+            fields[model] = model_fields
+    return fields
+
+
+def _name(value):
+    name = getattr(value, 'name', value)
+    return name if is_content_addressed(name) else None
+
+
+def acquire(name, storage):
+    if MediaFile.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaFile.objects.create(name=name, size=storage.size(name) if storage.exists(name) else 0, refcount=1)
+    except IntegrityError:
+        MediaFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def _pinned():
+    pins = getattr(_pins, 'names', None)
+    if pins is None:
+        pins = _pins.names = Counter()
+    return pins
+
+
+def pin(name, storage):
+    """Référence prise par le stockage à l'envoi d'un fichier, reprise par `update_references`."""
+    acquire(name, storage)
+    _pinned()[name] += 1
+
+
+def unpin(name):
+    """Vrai si le stockage a déjà pris la référence de `name` (elle est alors reprise)."""
+    pins = _pinned()
+    if not name or not pins[name]:
+        return False
+    pins[name] -= 1
+    return True
+
+
+def collect(name, storage):
+    """Supprime le fichier s'il n'est plus référencé ; le compteur est relu sous verrou, comme le prend `pin`."""
+    with transaction.atomic():
+        row = MediaFile.objects.select_for_update().filter(name=name).first()
+        if row is None or row.refcount > 0:
+            return
+        row.delete()
+        storage.delete(name)
+        delete_derivatives(storage, name)
+
+
+def release(name, storage):
+    MediaFile.objects.filter(name=name).update(refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: collect(name, storage))
+
+
+def recount():
+    """Recalcule tous les compteurs depuis les tables ; retourne (fichiers référencés, fichiers orphelins supprimés)."""
+    references = Counter()
+    storages = {}
+    for model, fields in tracked_fields().items():
+        for field in fields:
+            names = model._base_manager.filter(**{f'{field.attname}__startswith': f'{CAS_DIR}/'}).values_list(
+                field.attname, flat=True
+            )
+            for name in names.iterator():
+                references[name] += 1
+                storages[name] = field.storage
+    known = dict(MediaFile.objects.values_list('name', 'refcount'))
+    for name, count in references.items():
+        if name not in known:
+            storage = storages[name]
+            MediaFile.objects.create(name=name, size=storage.size(name) if storage.exists(name) else 0, refcount=count)
+        elif known[name] != count:
+            MediaFile.objects.filter(name=name).update(refcount=count)
+    orphans = [name for name in known if name not in references]
+    MediaFile.objects.filter(name__in=orphans).update(refcount=0)
+    for name in orphans:
+        collect(name, default_storage)
+    return len(references), len(orphans)
+
+
+def remember_names(sender, instance, **kwargs):
+    instance._media_names = {
+        field.attname: _name(instance.__dict__[field.attname])
+        for field in FIELDS[sender] if field.attname in instance.__dict__  # Champs différés ignorés
+    }
+
+
+def forget_pins(sender, instance, **kwargs):
+    # Références d'un envoi dont l'enregistrement a échoué : laissées au prochain `recount`, jamais reprises
+    _pinned().clear()
+
+
+def update_references(sender, instance, created, **kwargs):
+    before = {} if created else getattr(instance, '_media_names', {})
+    for field in FIELDS[sender]:
+        if field.attname not in instance.__dict__ or (not created and field.attname not in before):
+            continue
+        old, new = before.get(field.attname), _name(getattr(instance, field.attname))
+        pinned = unpin(new)
+        if old == new:
+            if pinned:
+                MediaFile.objects.filter(name=new).update(refcount=F('refcount') - 1)  # Même fichier renvoyé
+            continue
+        if new and not pinned:
+            acquire(new, field.storage)
+        if old:
+            release(old, field.storage)
+    remember_names(sender, instance)
+
+
+def release_references(sender, instance, **kwargs):
+    for field in FIELDS[sender]:
+        name = _name(instance.__dict__.get(field.attname))
+        if name:
+            release(name, field.storage)
+
+
+FIELDS = tracked_fields()
+for model in FIELDS:
+    uid = f'medias-{model._meta.label_lower}'
+    post_init.connect(remember_names, sender=model, dispatch_uid=uid)
+    pre_save.connect(forget_pins, sender=model, dispatch_uid=uid)
+    post_save.connect(update_references, sender=model, dispatch_uid=uid)
+    post_delete.connect(release_references, sender=model, dispatch_uid=uid)
@@ -0,0 +1,65 @@
+"""
+Stockage des médias par contenu.
+
+Un fichier envoyé est enregistré sous l'empreinte SHA-256 de son contenu
+(`cas/ab/cd/abcd….jpg`), quel que soit son nom ou son `upload_to` : la même
+photo envoyée pour plusieurs formats, ou renvoyée par plusieurs collecteurs,
+n'est écrite qu'une fois, et son URL ne change jamais.
+
+Les références sont comptées dans `MediaFile` (voir medias.signals) ; un
+fichier qui n'est plus référencé est supprimé après le commit. `save()` prend
+la référence avant de vérifier ou d'écrire le fichier : un nom rendu désigne
+toujours un fichier présent. Les noms hors
+`cas/` (fichiers antérieurs, dérivés d'images) sont enregistrés tels quels.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CAS_DIR = 'cas'
+PASSTHROUGH = ('derivatives/',)  # Noms déjà dérivés d'un contenu (superM.images)
+
+
+def file_digest(content):
+    content.seek(0)
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()[:10]
+    return f'{CAS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(f'{CAS_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage dont `save()` range les fichiers sous l'empreinte de leur contenu."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if name.startswith(PASSTHROUGH):
+            return super().save(name, content, max_length=max_length)
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        from .models import MediaFile
+        from .signals import pin
+        target = content_name(file_digest(content), name)
+        # Après `pin`, une suppression concurrente est terminée (fichier à réécrire) ou ne peut plus avoir lieu
+        pin(target, self)
+        if self.exists(target):
+            return target
+        saved = self._save(target, content)
+        if saved != target:
+            # Envoi simultané du même contenu : l'autre copie fait foi
+            self.delete(saved)
+        MediaFile.objects.filter(name=target, size=0).update(size=self.size(target))
+        return target
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from parametres.models import Category
+from superM.testing import png
+from .models import MediaFile
+from .signals import collect
+
+
+@override_settings(IMAGE_DERIVATIVES_ASYNC=False)
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create(self, name, color='red'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Category.objects.create(name=name, image=png(color))
+
+    def refcount(self, name):
+        return MediaFile.objects.values_list('refcount', flat=True).get(name=name)
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.create('Riz'), self.create('Huile')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('cas/'))
+        self.assertEqual(self.refcount(first.image.name), 2)
+        self.assertNotEqual(self.create('Sucre', 'blue').image.name, first.image.name)
+
+    def test_file_deleted_with_its_last_reference(self):
+        first, second = self.create('Riz'), self.create('Huile')
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image = None
+            second.save()
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_upload_takes_the_reference_before_returning(self):
+        category = self.create('Riz')
+        name = category.image.name
+        self.assertEqual(default_storage.save('autre.png', png('red')), name)
+        self.assertEqual(self.refcount(name), 2)  # Un `collect` concurrent ne peut plus supprimer le fichier
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Huile', image=png('red'))
+        self.assertEqual(self.refcount(name), 3)  # Référence prise par l'envoi, reprise par l'enregistrement
+
+    def test_collect_rechecks_the_count(self):
+        category = self.create('Riz')
+        name = category.image.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            category.delete()
+        self.assertEqual(self.refcount(name), 0)
+        default_storage.save('autre.png', png('red'))  # Même contenu renvoyé avant la suppression
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        MediaFile.objects.filter(name=name).update(refcount=0)
+        collect(name, default_storage)
+        self.assertFalse(default_storage.exists(name))
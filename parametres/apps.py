@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ParametresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'parametres'
+
+    def ready(self):
+        from superM import images
+        from superM.versions import track
+        from .cache import reference_models
+        track(*reference_models())
+        images.register(self.get_model('Category'))
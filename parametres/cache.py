@@ -0,0 +1,67 @@
+"""
+Cache des données de référence (tables parametres).
+
+Chaque table a un numéro de version (superM.versions), incrémenté à chaque
+écriture. Les réponses GET sont rendues une seule fois par version et
+gardées en mémoire avec leur ETag fort (empreinte du corps) : un client qui
+renvoie `If-None-Match` reçoit un 304 sans requête SQL ni sérialisation.
+"""
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+
+from superM.cache import LRUCache
+from superM.versions import get_versions
+
+response_cache = LRUCache(
+    maxsize=getattr(settings, 'REFERENCE_CACHE_MAXSIZE', 512),
+    ttl=getattr(settings, 'REFERENCE_CACHE_TTL', 300),
+)
+
+
+def reference_models():
+    return list(apps.get_app_config('parametres').get_models())
+
+
+def dependencies(model):
+    """La table et les tables parametres qu'elle référence (ex. Quartier -> Commune)."""
+    related = [
+        field.related_model for field in model._meta.get_fields()
+        if field.many_to_one and field.related_model._meta.app_label == 'parametres'
+    ]
+    return [model] + related
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return header.strip() == '*' or etag in [value.strip() for value in header.split(',')]
+
+
+def cached_response(request, key, models, build):
+    """
+    Retourne la réponse JSON mise en cache pour `key` et la version courante
+    de `models`, ou la construit avec `build()` (une Response DRF). Seules les
+    réponses 200 sont mises en cache. Les URLs des fichiers sont absolues :
+    l'hôte de la requête fait partie de la clé.
+    """
+    key = (key, request.build_absolute_uri('/'), get_versions(models))
+    entry = response_cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        body = JSONRenderer().render(response.data)
+        entry = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+        response_cache.set(key, entry)
+
+    body, etag = entry
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from superM import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcule les dérivés (image_thumb, image_medium) des images existantes qui n'en ont pas, "
+        "ou dont les dérivés ne correspondent plus à l'image. Exécution synchrone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Recalcule aussi les dérivés à jour")
+
+    def handle(self, *args, **options):
+        total = failed = 0
+        for model in images.registered:
+            rows = model.objects.exclude(Q(image__isnull=True) | Q(image='')).values_list(
+                'pk', 'image', *[f'image_{size}' for size in images.SIZES]
+            )
+            for pk, source_name, *derivatives in rows.iterator():
+                if not options['force'] and all(
+                    images.is_current(source_name, name, size) for name, size in zip(derivatives, images.SIZES)
+                ):
+                    continue
+                try:
+                    images.build_derivatives(model, pk)
+                    total += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model._meta.label} #{pk} ({source_name}) : {e}")
+        self.stdout.write(self.style.SUCCESS(f"{total} images traitées, {failed} en erreur."))
@@ -4,6 +4,7 @@ from django.core.validators import MinValueValidator
 class Commune(models.Model):
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(max_length=20, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -16,6 +17,7 @@ class Commune(models.Model):
 class Quartier(models.Model):
     name = models.CharField(max_length=100)
     commune = models.ForeignKey(Commune, on_delete=models.CASCADE, related_name='quartiers')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.commune.name})"
@@ -29,6 +31,7 @@ class Quartier(models.Model):
 class Zone(models.Model):
     name = models.CharField(max_length=100)
     commune = models.ForeignKey(Commune, on_delete=models.CASCADE, related_name='zones', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -41,6 +44,7 @@ class Zone(models.Model):
 class UserType(models.Model):
     name = models.CharField(max_length=20, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -54,7 +58,10 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='categorie/', blank=True, null=True)
+    image_thumb = models.ImageField(max_length=255, blank=True, null=True, editable=False)  # Dérivés, voir superM.images
+    image_medium = models.ImageField(max_length=255, blank=True, null=True, editable=False)
     app = models.CharField(max_length=50, blank=True, null=True)  # Ex: "products", "collecte"
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -67,6 +74,7 @@ class Category(models.Model):
 class Certification(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -79,6 +87,7 @@ class Certification(models.Model):
 class ShopType(models.Model):
     name = models.CharField(max_length=20, unique=True)
     code = models.CharField(max_length=20, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -91,6 +100,7 @@ class ShopType(models.Model):
 class TypeCommerce(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -102,6 +112,7 @@ class TypeCommerce(models.Model):
 
 class TailleShop(models.Model):
     name = models.CharField(max_length=20, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -114,6 +125,7 @@ class TailleShop(models.Model):
 class FrequenceApprovisionnement(models.Model):
     name = models.CharField(max_length=100, unique=True)
     days = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(0)])
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -127,6 +139,7 @@ class OrderStatus(models.Model):
     name = models.CharField(max_length=20, unique=True)
     code = models.CharField(max_length=20, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -138,6 +151,7 @@ class OrderStatus(models.Model):
 
 class Taille(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -150,6 +164,7 @@ class Taille(models.Model):
 class Couleur(models.Model):
     name = models.CharField(max_length=100, unique=True)
     hex_code = models.CharField(max_length=7, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -165,6 +180,7 @@ class Module(models.Model):
     icon = models.CharField(max_length=50)
     link = models.CharField(max_length=50)
     color = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
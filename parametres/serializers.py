@@ -35,7 +35,7 @@ class UserTypeSerializer(serializers.ModelSerializer):
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'image','app']
+        fields = ['id', 'name', 'description', 'image', 'image_thumb', 'image_medium', 'app']
 
 class CertificationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,3 +1,60 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from superM.testing import jwt_client, sample_data
+from .cache import response_cache
+from .models import Category, Commune
+
+
+class ReferenceCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+        Category.objects.filter(name='Riz').update(image='cas/ab/cd/riz.png')
+
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+        self.client = APIClient()
+
+    def test_bundle_etag_and_not_modified(self):
+        url = reverse('reference-bundle')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Commune.objects.create(name='Yopougon', code='YO')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Yopougon', [commune['name'] for commune in response.json()['communes']])
+
+    def test_bundle_uses_the_request_for_file_urls(self):
+        categories = {row['name']: row for row in self.client.get(reverse('reference-bundle')).json()['categories']}
+        self.assertEqual(categories['Riz']['image'], 'http://testserver/media/cas/ab/cd/riz.png')
+        other_host = self.client.get(reverse('reference-bundle'), HTTP_HOST='cdn.example.com').json()
+        self.assertEqual(
+            {row['name']: row['image'] for row in other_host['categories']}['Riz'],
+            'http://cdn.example.com/media/cas/ab/cd/riz.png'
+        )
+
+    def test_private_tables_only_when_authenticated(self):
+        anonymous = self.client.get(reverse('reference-bundle')).json()
+        self.assertNotIn('modules', anonymous)
+        self.assertNotIn('user_types', anonymous)
+        authenticated = jwt_client(self.data.admin).get(reverse('reference-bundle')).json()
+        self.assertIn('modules', authenticated)
+        self.assertIn('user_types', authenticated)
+
+    def test_list_etag(self):
+        url = reverse('category-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"autre", {etag}').status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"autre"').status_code, 200)
@@ -4,7 +4,8 @@ from .views import (
     CommuneViewSet, QuartierViewSet, ZoneViewSet, UserTypeViewSet,
     CategoryViewSet, CertificationViewSet, ShopTypeViewSet,
     TypeCommerceViewSet, TailleShopViewSet, FrequenceApprovisionnementViewSet,
-    OrderStatusViewSet, TailleViewSet, CouleurViewSet, ModuleViewSet
+    OrderStatusViewSet, TailleViewSet, CouleurViewSet, ModuleViewSet,
+    ReferenceBundleView
 )
 
 router = DefaultRouter()
@@ -25,4 +26,5 @@ router.register(r'modules', ModuleViewSet, basename='module')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('reference-bundle/', ReferenceBundleView.as_view(), name='reference-bundle'),
 ]
\ No newline at end of file
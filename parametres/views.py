@@ -1,7 +1,9 @@
 from rest_framework import viewsets
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
+from superM.pagination import CustomShopPagination, PaginatedListMixin
+from superM.prefetch import PrefetchPlanMixin
 from rest_framework.response import Response
 from .models import (
     Commune, Quartier, Zone, UserType, Category, Certification,
@@ -15,28 +17,7 @@ from .serializers import (
     OrderStatusSerializer, TailleSerializer, CouleurSerializer, ModuleSerializer
 )
 from rest_framework.renderers import JSONRenderer
-
-class CustomShopPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
-
-    def get_page_size(self, request):
-        try:
-            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
-            if limit <= 0:
-                return self.page_size
-            return min(limit, self.max_page_size)
-        except (ValueError, TypeError):
-            return self.page_size
-
-    def get_paginated_response(self, data):
-        return Response({
-            'total': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'data': data
-        })
+from .cache import cached_response, dependencies, reference_models
 
 class ReadOnlyOrAuthenticated(IsAuthenticated):
     def has_permission(self, request, view):
@@ -44,19 +25,27 @@ class ReadOnlyOrAuthenticated(IsAuthenticated):
             return True
         return super().has_permission(request, view)
 
-class BaseViewSet(viewsets.ModelViewSet):
-    pagination_class = CustomShopPagination
+class CachedReferenceMixin:
+    """Les GET (liste et détail) sont servis depuis parametres.cache, avec ETag et 304."""
+    def get_cache_models(self):
+        return dependencies(self.queryset.model)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            serializer = self.get_serializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        return Response(serializer.data)
+        build = super().list
+        return cached_response(
+            request, (self.basename, request.get_full_path()), self.get_cache_models(),
+            lambda: build(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        return cached_response(
+            request, (self.basename, request.get_full_path()), self.get_cache_models(),
+            lambda: build(request, *args, **kwargs)
+        )
+
+class BaseViewSet(CachedReferenceMixin, PrefetchPlanMixin, PaginatedListMixin, viewsets.ModelViewSet):
+    pagination_class = CustomShopPagination
 
 class CommuneViewSet(BaseViewSet):
     queryset = Commune.objects.all().order_by('name')
@@ -68,7 +57,7 @@ class CommuneViewSet(BaseViewSet):
     renderer_classes = [JSONRenderer]  # Forcer JSON
 
 class QuartierViewSet(BaseViewSet):
-    queryset = Quartier.objects.all().order_by('name')
+    queryset = Quartier.objects.select_related('commune').order_by('name')
     serializer_class = QuartierSerializer
     permission_classes = [ReadOnlyOrAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -77,7 +66,7 @@ class QuartierViewSet(BaseViewSet):
     renderer_classes = [JSONRenderer]  # Forcer JSON
 
 class ZoneViewSet(BaseViewSet):
-    queryset = Zone.objects.all().order_by('name')
+    queryset = Zone.objects.select_related('commune').order_by('name')
     serializer_class = ZoneSerializer
     permission_classes = [ReadOnlyOrAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -182,4 +171,41 @@ class ModuleViewSet(BaseViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['name', 'link']
     search_fields = ['name', 'description']
-    renderer_classes = [JSONRenderer]  # Forcer JSON
\ No newline at end of file
+    renderer_classes = [JSONRenderer]  # Forcer JSON
+
+class ReferenceBundleView(APIView):
+    """
+    Toutes les données de référence en une seule réponse, pour le démarrage
+    des applications. Les types d'utilisateur et modules ne sont inclus que
+    pour un utilisateur authentifié, comme sur leurs endpoints.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer]
+    viewsets = {
+        'communes': CommuneViewSet,
+        'quartiers': QuartierViewSet,
+        'zones': ZoneViewSet,
+        'user_types': UserTypeViewSet,
+        'categories': CategoryViewSet,
+        'certifications': CertificationViewSet,
+        'shop_types': ShopTypeViewSet,
+        'type_commerces': TypeCommerceViewSet,
+        'taille_shops': TailleShopViewSet,
+        'frequences_approvisionnement': FrequenceApprovisionnementViewSet,
+        'order_statuses': OrderStatusViewSet,
+        'tailles': TailleViewSet,
+        'couleurs': CouleurViewSet,
+        'modules': ModuleViewSet,
+    }
+    private = {'user_types', 'modules'}
+
+    def get(self, request):
+        authenticated = request.user.is_authenticated
+        return cached_response(
+            request, ('reference-bundle', authenticated), reference_models(),
+            lambda: Response({
+                name: viewset.serializer_class(viewset.queryset.all(), many=True, context={'request': request}).data
+                for name, viewset in self.viewsets.items()
+                if authenticated or name not in self.private
+            })
+        )
@@ -5,4 +5,5 @@ from .models import *
 admin.site.register(Product)
 admin.site.register(Order)
 admin.site.register(OrderItem)
-admin.site.register(ProductFormat)
\ No newline at end of file
+admin.site.register(ProductFormat)
+admin.site.register(ReorderItem)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from superM import images
+        from superM.versions import track
+        from .models import Product, ProductFormat, Order, OrderItem
+        track(Product, ProductFormat, Order, OrderItem)
+        images.register(Product, ProductFormat)
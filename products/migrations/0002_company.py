@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_company(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Product = apps.get_model('products', 'Product')
+    ProductFormat = apps.get_model('products', 'ProductFormat')
+    Order = apps.get_model('products', 'Order')
+    OrderItem = apps.get_model('products', 'OrderItem')
+    Product.objects.update(company_id=Subquery(User.objects.filter(pk=OuterRef('supplier_id')).values('company_id')[:1]))
+    ProductFormat.objects.update(company_id=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('company_id')[:1]))
+    Order.objects.update(company_id=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('company_id')[:1]))
+    OrderItem.objects.update(company_id=Subquery(ProductFormat.objects.filter(pk=OuterRef('product_format_id')).values('company_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_company_user_company'),
+        ('parametres', '0002_category_image'),
+        ('products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='productformat',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_formats', to='accounts.company'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['company', 'created_at'], name='products_or_company_466b46_idx'),
+        ),
+        migrations.RunPython(populate_company, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+from superM.search import normalize, trigram_index
+
+
+def populate_search_text(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    rows = list(Product.objects.select_related('category'))
+    for product in rows:
+        product.search_text = normalize(product.name, product.category.name)
+    Product.objects.bulk_update(rows, ['search_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_company'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        trigram_index('products_product'),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_search_text'),
+        ('parametres', '0003_updated_at'),
+        ('products', '0003_product_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='productformat',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='products_pr_updated_150263_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productformat',
+            index=models.Index(fields=['updated_at'], name='products_pr_updated_f12928_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_stock_alerts(apps, schema_editor):
+    ProductFormat = apps.get_model('products', 'ProductFormat')
+    ReorderItem = apps.get_model('products', 'ReorderItem')
+    ProductFormat.objects.filter(stock__lte=F('min_stock')).update(is_low_stock=True)
+    ReorderItem.objects.bulk_create([
+        ReorderItem(product_format_id=pk, stock=stock, min_stock=min_stock, supplier_id=supplier_id, company_id=company_id)
+        for pk, stock, min_stock, supplier_id, company_id in ProductFormat.objects.filter(is_low_stock=True).values_list(
+            'pk', 'stock', 'min_stock', 'product__supplier_id', 'company_id'
+        ).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_search_text'),
+        ('parametres', '0004_image_derivatives'),
+        ('products', '0005_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('min_stock', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Réapprovisionnement',
+                'verbose_name_plural': 'File de réapprovisionnement',
+            },
+        ),
+        migrations.AddField(
+            model_name='productformat',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productformat',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['company'], name='productformat_low_stock'),
+        ),
+        migrations.AddField(
+            model_name='reorderitem',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reorder_items', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='reorderitem',
+            name='product_format',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_item', to='products.productformat'),
+        ),
+        migrations.AddField(
+            model_name='reorderitem',
+            name='supplier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reorderitem',
+            index=models.Index(fields=['supplier', 'created_at'], name='products_re_supplie_ad3cf2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reorderitem',
+            index=models.Index(fields=['company', 'created_at'], name='products_re_company_8a302d_idx'),
+        ),
+        migrations.RunPython(populate_stock_alerts, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,52 @@
 from django.db import models
 from django.core.validators import MinValueValidator
-from accounts.models import User
+from django.db.models.functions import Now
+from accounts.models import User, Company, TenantQuerySet
 from parametres.models import Category, OrderStatus, Taille, Couleur
+from superM.search import normalize
+from superM.tracking import LoadedValuesMixin, saves_any
 
-class Product(models.Model):
+class Product(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     supplier = models.ForeignKey(User, related_name='products', on_delete=models.PROTECT)
     last_order = models.DateField()
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_thumb = models.ImageField(max_length=255, blank=True, null=True, editable=False)  # Dérivés, voir superM.images
+    image_medium = models.ImageField(max_length=255, blank=True, null=True, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')  # = supplier.company
+    search_text = models.TextField(blank=True, default='', editable=False)  # Voir superM.search
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return self.name if self.name else "Produit sans nom"
 
+    search_document_fields = ('name', 'category')  # Sources de search_text
+
+    def search_document(self):
+        return normalize(self.name, self.category.name)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        company_id = self.supplier.company_id
+        company_changed = self.pk is not None and company_id != self.company_id
+        self.company_id = company_id
+        owner_changed = not adding and self.has_changed('supplier_id', 'company_id')
+        update_fields = kwargs.get('update_fields')
+        if saves_any(update_fields, self.search_document_fields):
+            self.search_text = self.search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        super().save(*args, **kwargs)
+        self.remember_loaded_values(kwargs.get('update_fields'))
+        if company_changed:
+            ProductFormat.objects.filter(product=self).update(company_id=company_id, updated_at=Now())
+            OrderItem.objects.filter(product_format__product=self).update(company_id=company_id)
+        if owner_changed:
+            ReorderItem.objects.filter(product_format__product=self).update(supplier_id=self.supplier_id, company_id=company_id)
+
     class Meta:
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
@@ -20,20 +54,43 @@ class Product(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['supplier']),
             models.Index(fields=['last_order']),
+            models.Index(fields=['updated_at']),
         ]
 
-class ProductFormat(models.Model):
+class ProductFormat(LoadedValuesMixin, models.Model):
     product = models.ForeignKey(Product, related_name='formats', on_delete=models.CASCADE)
     taille = models.ForeignKey(Taille, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_formats')
     couleur = models.ForeignKey(Couleur, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_formats')
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_thumb = models.ImageField(max_length=255, blank=True, null=True, editable=False)  # Dérivés, voir superM.images
+    image_medium = models.ImageField(max_length=255, blank=True, null=True, editable=False)
     stock = models.IntegerField(validators=[MinValueValidator(0)])
     min_stock = models.IntegerField(validators=[MinValueValidator(0)])
+    is_low_stock = models.BooleanField(default=False, editable=False)  # = stock <= min_stock, voir products.stock
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_formats')  # = product.company
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.product.name} - {self.taille.name if self.taille else 'N/A'} - {self.couleur.name if self.couleur else 'N/A'}"
 
+    def save(self, *args, **kwargs):
+        from .stock import refresh_reorder_queue
+        adding = self._state.adding
+        self.company_id = self.product.company_id
+        self.is_low_stock = self.stock <= self.min_stock
+        # Nouveau format : pas encore de ligne dans la file ; sinon seulement si le stock ou la société change
+        queue_changed = self.is_low_stock if adding else self.has_changed('stock', 'min_stock', 'company_id')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and saves_any(update_fields, ('stock', 'min_stock')):
+            kwargs['update_fields'] = set(update_fields) | {'is_low_stock'}
+        super().save(*args, **kwargs)
+        self.remember_loaded_values(kwargs.get('update_fields'))
+        if queue_changed:
+            refresh_reorder_queue([self.pk])
+
     class Meta:
         verbose_name = "Format de produit"
         verbose_name_plural = "Formats de produits"
@@ -41,6 +98,31 @@ class ProductFormat(models.Model):
             models.Index(fields=['product']),
             models.Index(fields=['taille']),
             models.Index(fields=['couleur']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['company'], condition=models.Q(is_low_stock=True), name='productformat_low_stock'),
+        ]
+
+class ReorderItem(models.Model):
+    """File de réapprovisionnement : un format de produit passé sous son stock minimum (voir products.stock)."""
+    product_format = models.OneToOneField(ProductFormat, on_delete=models.CASCADE, related_name='reorder_item')
+    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reorder_items')  # = product.supplier
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='reorder_items')  # = product_format.company
+    stock = models.IntegerField()
+    min_stock = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Passage sous le minimum
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.product_format} : {self.stock}/{self.min_stock}"
+
+    class Meta:
+        verbose_name = "Réapprovisionnement"
+        verbose_name_plural = "File de réapprovisionnement"
+        indexes = [
+            models.Index(fields=['supplier', 'created_at']),
+            models.Index(fields=['company', 'created_at']),
         ]
 
 class Order(models.Model):
@@ -48,10 +130,17 @@ class Order(models.Model):
     status = models.ForeignKey(OrderStatus, on_delete=models.PROTECT, related_name='orders')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')  # = user.company
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"Commande #{self.id} - {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        self.company_id = self.user.company_id
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
@@ -59,6 +148,7 @@ class Order(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['company', 'created_at']),
         ]
 
 class OrderItem(models.Model):
@@ -66,10 +156,17 @@ class OrderItem(models.Model):
     product_format = models.ForeignKey(ProductFormat, on_delete=models.PROTECT, related_name='order_items')
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     price_at_order = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')  # = société du fournisseur
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.quantity}x {self.product_format.product.name} ({self.product_format.taille.name if self.product_format.taille else 'N/A'})"
 
+    def save(self, *args, **kwargs):
+        self.company_id = self.product_format.company_id
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Article de commande"
         verbose_name_plural = "Articles de commande"
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.db import transaction
-from .models import Product, ProductFormat, Order, OrderItem
+from .models import Product, ProductFormat, Order, OrderItem, ReorderItem
+from .stock import reserve_stock, apply_stock_deltas, quantities_by_format
+from superM.versions import bump_version
+from superM.statsfields import SparseSerializerMixin
 from parametres.models import Category, OrderStatus, Taille, Couleur
 from accounts.models import User
 
@@ -8,7 +11,7 @@ from rest_framework import serializers
 
 from rest_framework import serializers
 
-class OverviewSerializer(serializers.Serializer):
+class ProductOverviewSerializer(SparseSerializerMixin, serializers.Serializer):
     total_products = serializers.IntegerField()
     total_formats = serializers.IntegerField()
     low_stock_formats = serializers.IntegerField()
@@ -101,7 +104,7 @@ class ProductFormatSerializer(serializers.ModelSerializer):
         model = ProductFormat
         fields = [
             'id', 'product', 'product_name', 'taille', 'taille_id', 'couleur', 'couleur_id',
-            'price', 'image', 'stock', 'min_stock'
+            'price', 'image', 'image_thumb', 'image_medium', 'stock', 'min_stock', 'is_low_stock'
         ]
         read_only_fields = ['product_name']
 
@@ -119,7 +122,7 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'category', 'category_id', 'category_name', 'supplier', 'supplier_email',
-            'supplier_username', 'last_order', 'image', 'formats'
+            'supplier_username', 'last_order', 'image', 'image_thumb', 'image_medium', 'formats'
         ]
         read_only_fields = ['supplier_email', 'supplier_username']
 
@@ -181,7 +184,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
     def validate(self, data):
         product_format = data['product_format']
         quantity = data['quantity']
-        if quantity > product_format.stock:
+        order = getattr(getattr(self.parent, 'parent', None), 'instance', None)
+        # En modification de commande, seule la variation nette est réservée (voir OrderSerializer.update_items)
+        if order is None and quantity > product_format.stock:
             raise serializers.ValidationError(
                 f"La quantité commandée ({quantity}) dépasse le stock disponible ({product_format.stock})."
             )
@@ -202,17 +207,18 @@ class OrderSerializer(serializers.ModelSerializer):
         validated_data['user'] = self.context['request'].user
         order = Order.objects.create(**validated_data)
 
-        for item_data in items_data:
-            product_format = item_data['product_format']
-            quantity = item_data['quantity']
-            OrderItem.objects.create(
+        reserve_stock(items_data)
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
-                product_format=product_format,
-                quantity=quantity,
-                price_at_order=product_format.price
+                product_format=item_data['product_format'],
+                quantity=item_data['quantity'],
+                price_at_order=item_data['product_format'].price,
+                company_id=item_data['product_format'].company_id
             )
-            product_format.stock -= quantity
-            product_format.save()
+            for item_data in items_data
+        ])
+        bump_version(OrderItem)
 
         return order
 
@@ -223,28 +229,83 @@ class OrderSerializer(serializers.ModelSerializer):
         instance.save()
 
         if items_data is not None:
-            for item in instance.items.all():
-                item.product_format.stock += item.quantity
-                item.product_format.save()
-                item.delete()
-
-            for item_data in items_data:
-                product_format = item_data['product_format']
-                quantity = item_data['quantity']
-                OrderItem.objects.create(
-                    order=instance,
-                    product_format=product_format,
-                    quantity=quantity,
-                    price_at_order=product_format.price
-                )
-                product_format.stock -= quantity
-                product_format.save()
+            self.update_items(instance, items_data)
 
         return instance
+
+    def update_items(self, instance, items_data):
+        """
+        Compare les lignes existantes aux lignes demandées (par format de produit)
+        et n'applique que les différences : une mise à jour de stock nette, puis
+        au plus un bulk_create, un bulk_update et un delete.
+        """
+        formats = {item_data['product_format'].pk: item_data['product_format'] for item_data in items_data}
+        wanted = quantities_by_format(items_data)
+
+        existing = {}
+        merged = set()
+        stale_ids = []
+        for item in instance.items.all():
+            if item.product_format_id in existing:
+                # Doublon d'un même format : fusionné dans la première ligne
+                existing[item.product_format_id].quantity += item.quantity
+                merged.add(item.product_format_id)
+                stale_ids.append(item.pk)
+            else:
+                existing[item.product_format_id] = item
+
+        deltas = {
+            format_id: wanted.get(format_id, 0) - (existing[format_id].quantity if format_id in existing else 0)
+            for format_id in wanted.keys() | existing.keys()
+        }
+        apply_stock_deltas(deltas)
+
+        to_create, to_update = [], []
+        for format_id, quantity in wanted.items():
+            item = existing.get(format_id)
+            if item is None:
+                to_create.append(OrderItem(
+                    order=instance,
+                    product_format=formats[format_id],
+                    quantity=quantity,
+                    price_at_order=formats[format_id].price,
+                    company_id=formats[format_id].company_id
+                ))
+            elif item.quantity != quantity or format_id in merged:
+                item.quantity = quantity
+                to_update.append(item)
+        stale_ids += [item.pk for format_id, item in existing.items() if format_id not in wanted]
+
+        if stale_ids:
+            OrderItem.objects.filter(pk__in=stale_ids).delete()
+        if to_update:
+            OrderItem.objects.bulk_update(to_update, ['quantity'])
+        if to_create:
+            OrderItem.objects.bulk_create(to_create)
+        bump_version(OrderItem)
     
+class ReorderItemSerializer(serializers.ModelSerializer):
+    product_id = serializers.IntegerField(source='product_format.product_id', read_only=True)
+    product_name = serializers.CharField(source='product_format.product.name', read_only=True)
+    taille = serializers.CharField(source='product_format.taille.name', read_only=True, allow_null=True)
+    couleur = serializers.CharField(source='product_format.couleur.name', read_only=True, allow_null=True)
+    supplier_username = serializers.CharField(source='supplier.username', read_only=True)
+    shortfall = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReorderItem
+        fields = [
+            'id', 'product_format', 'product_id', 'product_name', 'taille', 'couleur', 'supplier',
+            'supplier_username', 'stock', 'min_stock', 'shortfall', 'created_at', 'updated_at'
+        ]
+
+    def get_shortfall(self, obj):
+        """Quantité manquante pour revenir au stock minimum."""
+        return max(obj.min_stock - obj.stock, 0)
+
 from rest_framework import serializers
 
-class OverviewSerializer(serializers.Serializer):
+class OverviewSerializer(SparseSerializerMixin, serializers.Serializer):
     total_orders = serializers.IntegerField()
     recent_orders = serializers.IntegerField()
     total_items = serializers.IntegerField()
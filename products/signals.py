@@ -0,0 +1,20 @@
+from django.db.models.functions import Now
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from accounts.models import User
+from superM.versions import bump_version
+from .models import Product, ProductFormat, Order, OrderItem, ReorderItem
+
+
+@receiver(post_save, sender=User)
+def propagate_user_company(sender, instance, **kwargs):
+    """Répercute un changement de société d'un utilisateur sur les lignes dénormalisées."""
+    if not getattr(instance, '_company_changed', False):
+        return
+    company_id = instance.company_id
+    Product.objects.filter(supplier=instance).update(company_id=company_id, updated_at=Now())
+    ProductFormat.objects.filter(product__supplier=instance).update(company_id=company_id, updated_at=Now())
+    OrderItem.objects.filter(product_format__product__supplier=instance).update(company_id=company_id)
+    Order.objects.filter(user=instance).update(company_id=company_id)
+    ReorderItem.objects.filter(supplier=instance).update(company_id=company_id)
+    bump_version(Product, ProductFormat, OrderItem, Order)
@@ -0,0 +1,104 @@
+"""
+Réservation de stock des formats de produit.
+
+Toutes les variations d'une commande sont appliquées par un seul
+`UPDATE ... SET stock = CASE ... END WHERE (id = x AND stock >= q) OR ...` :
+la condition est réévaluée par la base sous verrou de ligne, donc deux
+commandes concurrentes ne peuvent pas survendre un même format.
+
+Alertes de stock : `ProductFormat.is_low_stock` (stock <= min_stock) est tenu
+à jour par la même requête et par `ProductFormat.save()`, avec un index
+partiel sur les seuls formats en alerte ; `ReorderItem` garde une ligne par
+format en alerte (file de réapprovisionnement, par fournisseur).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, ExpressionWrapper, When, F, Q
+from django.db.models.functions import Now
+from rest_framework import serializers
+
+from superM.versions import bump_version
+from .models import ProductFormat, ReorderItem
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def quantities_by_format(items_data):
+    """Regroupe les quantités demandées par format : {format_id: quantité}."""
+    quantities = defaultdict(int)
+    for item_data in items_data:
+        quantities[item_data['product_format'].pk] += item_data['quantity']
+    return dict(quantities)
+
+
+def refresh_reorder_queue(format_ids):
+    """Aligne la file de réapprovisionnement sur `is_low_stock` des formats donnés."""
+    low = list(
+        ProductFormat.objects.filter(pk__in=format_ids, is_low_stock=True)
+        .values_list('pk', 'stock', 'min_stock', 'product__supplier_id', 'company_id')
+    )
+    ReorderItem.objects.filter(product_format_id__in=format_ids).exclude(
+        product_format_id__in=[row[0] for row in low]
+    ).delete()
+    if low:
+        ReorderItem.objects.bulk_create(
+            [
+                ReorderItem(product_format_id=pk, stock=stock, min_stock=min_stock, supplier_id=supplier_id,
+                            company_id=company_id)
+                for pk, stock, min_stock, supplier_id, company_id in low
+            ],
+            update_conflicts=True, unique_fields=['product_format'],
+            update_fields=['stock', 'min_stock', 'supplier', 'company', 'updated_at']
+        )
+
+
+def apply_stock_deltas(deltas):
+    """
+    Retire du stock les quantités {format_id: quantité} (une quantité négative
+    remet en stock) en une seule requête. Si un format n'a plus assez de stock,
+    rien n'est modifié et une ValidationError décrit les formats en rupture.
+    """
+    deltas = {pk: quantity for pk, quantity in deltas.items() if quantity}
+    if not deltas:
+        return
+
+    condition = Q()
+    for pk, quantity in deltas.items():
+        condition |= Q(pk=pk, stock__gte=quantity) if quantity > 0 else Q(pk=pk)
+
+    try:
+        with transaction.atomic():
+            updated = ProductFormat.objects.filter(condition).update(
+                stock=Case(
+                    *[When(pk=pk, then=F('stock') - quantity) for pk, quantity in deltas.items()],
+                    default=F('stock')
+                ),
+                is_low_stock=Case(
+                    *[
+                        When(pk=pk, then=ExpressionWrapper(
+                            Q(min_stock__gte=F('stock') - quantity), output_field=BooleanField()
+                        ))
+                        for pk, quantity in deltas.items()
+                    ],
+                    default=F('is_low_stock')
+                ),
+                updated_at=Now()
+            )
+            if updated != len(deltas):
+                raise InsufficientStock
+            refresh_reorder_queue(list(deltas))
+            bump_version(ProductFormat)
+    except InsufficientStock:
+        available = dict(ProductFormat.objects.filter(pk__in=deltas).values_list('pk', 'stock'))
+        raise serializers.ValidationError([
+            f"Stock insuffisant pour le format {pk} : {quantity} demandé(s), {available.get(pk, 0)} disponible(s)."
+            for pk, quantity in deltas.items()
+            if quantity > 0 and available.get(pk, 0) < quantity
+        ] or ["Un format de produit commandé n'existe plus."])
+
+
+def reserve_stock(items_data):
+    apply_stock_deltas(quantities_by_format(items_data))
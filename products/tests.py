@@ -1,3 +1,171 @@
+from datetime import date
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers
+
+from accounts.models import User
+from parametres.models import Category, UserType
+from superM.testing import jwt_client, sample_data
+from .models import OrderItem, Product, ProductFormat, ReorderItem
+from .stock import apply_stock_deltas
+
+
+class ReorderQueueSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_type = UserType.objects.create(name='Fournisseur')
+        cls.supplier = User.objects.create_user('s@x.com', 'supplier', 'pw', user_type=user_type, company_name='ACME')
+        cls.other = User.objects.create_user('o@x.com', 'other', 'pw', user_type=user_type, company_name='Autre')
+        product = Product.objects.create(
+            name='Riz', category=Category.objects.create(name='Céréales'), supplier=cls.supplier, last_order=date.today()
+        )
+        ProductFormat.objects.create(product=product, price=10, stock=2, min_stock=5)
+
+    def queue_queries(self, save):
+        with CaptureQueriesContext(connection) as queries:
+            save()
+        return [query['sql'] for query in queries if ReorderItem._meta.db_table in query['sql']]
+
+    def test_unchanged_saves_skip_the_queue(self):
+        product_format = ProductFormat.objects.select_related('product').get()
+        product_format.price = 12
+        self.assertEqual(self.queue_queries(product_format.save), [])
+        product = Product.objects.select_related('supplier').get()
+        product.name = 'Riz parfumé'
+        self.assertEqual(self.queue_queries(product.save), [])
+
+    def test_stock_and_supplier_changes_update_the_queue(self):
+        product_format = ProductFormat.objects.select_related('product').get()
+        self.assertTrue(ReorderItem.objects.filter(product_format=product_format).exists())
+        product_format.stock = 50
+        self.assertNotEqual(self.queue_queries(product_format.save), [])
+        self.assertFalse(ReorderItem.objects.filter(product_format=product_format).exists())
+
+        product_format.stock = 1
+        product_format.save()
+        product = Product.objects.get()
+        product.supplier = self.other
+        product.save()
+        item = ReorderItem.objects.get(product_format=product_format)
+        self.assertEqual((item.supplier_id, item.company_id), (self.other.pk, self.other.company_id))
+
+
+class StockDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        supplier = User.objects.create_user(
+            's@x.com', 'supplier', 'pw', user_type=UserType.objects.create(name='Fournisseur'), company_name='ACME'
+        )
+        product = Product.objects.create(
+            name='Riz', category=Category.objects.create(name='Céréales'), supplier=supplier, last_order=date.today()
+        )
+        cls.large = ProductFormat.objects.create(product=product, price=10, stock=100, min_stock=5)
+        cls.small = ProductFormat.objects.create(product=product, price=10, stock=2, min_stock=1)
+
+    def stocks(self):
+        return dict(ProductFormat.objects.values_list('pk', 'stock'))
+
+    def test_oversell_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            apply_stock_deltas({self.small.pk: 3})
+        self.assertIn('3 demandé(s), 2 disponible(s)', str(raised.exception.detail[0]))
+        self.assertEqual(self.stocks(), {self.large.pk: 100, self.small.pk: 2})
+
+    def test_one_short_format_reserves_nothing(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            apply_stock_deltas({self.large.pk: 5, self.small.pk: 3})
+        self.assertEqual(len(raised.exception.detail), 1)
+        self.assertIn(f'format {self.small.pk}', str(raised.exception.detail[0]))
+        self.assertEqual(self.stocks(), {self.large.pk: 100, self.small.pk: 2})
+
+    def test_deltas_apply_together_and_refresh_low_stock(self):
+        apply_stock_deltas({self.large.pk: 96, self.small.pk: -3, 0: 0})
+        self.assertEqual(self.stocks(), {self.large.pk: 4, self.small.pk: 5})
+        self.assertEqual(
+            dict(ProductFormat.objects.values_list('pk', 'is_low_stock')), {self.large.pk: True, self.small.pk: False}
+        )
+        self.assertEqual(list(ReorderItem.objects.values_list('product_format', 'stock')), [(self.large.pk, 4)])
+
+        apply_stock_deltas({self.large.pk: -10})
+        self.assertFalse(ProductFormat.objects.get(pk=self.large.pk).is_low_stock)
+        self.assertFalse(ReorderItem.objects.exists())
+
+
+class OrderItemsUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=2)
+        cls.order = cls.data.orders[0]  # Formats 0 et 1, une unité chacun
+
+    def update(self, *items):
+        return jwt_client(self.data.admin).patch(
+            reverse('order-detail', args=[self.order.pk]),
+            {'items': [{'product_format_id': f.pk, 'quantity': quantity} for f, quantity in items]},
+            format='json'
+        )
+
+    def items(self):
+        return {item.product_format_id: (item.pk, item.quantity) for item in OrderItem.objects.filter(order=self.order)}
+
+    def stock(self, product_format):
+        return ProductFormat.objects.values_list('stock', flat=True).get(pk=product_format.pk)
+
+    def test_added_removed_and_changed_items(self):
+        kept, removed, added = self.data.formats[:3]
+        before = self.items()
+        response = self.update((kept, 3), (added, 4))
+        self.assertEqual(response.status_code, 200)
+        after = self.items()
+        self.assertEqual(set(after), {kept.pk, added.pk})
+        self.assertEqual(after[kept.pk], (before[kept.pk][0], 3))  # Même ligne, quantité changée
+        self.assertEqual(after[added.pk][1], 4)
+        # Variations nettes : +2 réservés, 1 remis en stock, 4 réservés
+        self.assertEqual((self.stock(kept), self.stock(removed), self.stock(added)), (98, 101, 96))
+
+    def test_unchanged_items_keep_their_rows_and_stock(self):
+        first, second = self.data.formats[:2]
+        before = self.items()
+        self.assertEqual(self.update((first, 1), (second, 1)).status_code, 200)
+        self.assertEqual(self.items(), before)
+        self.assertEqual((self.stock(first), self.stock(second)), (100, 100))
+
+    def test_duplicate_formats_are_merged(self):
+        first, second = self.data.formats[:2]
+        self.assertEqual(self.update((first, 2), (first, 3), (second, 1)).status_code, 200)
+        self.assertEqual(self.items()[first.pk][1], 5)
+        self.assertEqual(self.stock(first), 96)
+
+    def test_oversell_changes_nothing(self):
+        first, second = self.data.formats[:2]
+        before = self.items()
+        response = self.update((first, 2), (second, 200))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.items(), before)
+        self.assertEqual((self.stock(first), self.stock(second)), (100, 100))
+
+
+class ProductSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def test_partial_save_writes_derived_fields_with_their_sources_only(self):
+        product = Product.objects.select_related('supplier').get()
+        with CaptureQueriesContext(connection) as queries:
+            product.last_order = date(2024, 1, 1)
+            product.save(update_fields=['last_order'])
+        self.assertEqual(len(queries), 1)  # Catégorie non relue
+        self.assertNotIn('search_text', queries[0]['sql'])
+
+        product.name = 'Maïs'
+        product.save(update_fields=['name'])
+        self.assertIn('mais', Product.objects.values_list('search_text', flat=True).get())
 
-# Create your tests here.
+        product_format = ProductFormat.objects.select_related('product').first()
+        with CaptureQueriesContext(connection) as queries:
+            product_format.price = 20
+            product_format.save(update_fields=['price'])
+        self.assertNotIn('is_low_stock', ' '.join(query['sql'] for query in queries))
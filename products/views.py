@@ -1,37 +1,23 @@
-from django.db.models import Count, Sum, Q, F, Avg
+from django.db.models import Count, Sum, Q, F, Avg, Min
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.pagination import PageNumberPagination
+from superM.pagination import CustomShopPagination, PaginatedListMixin
+from superM.prefetch import PrefetchPlanMixin
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from superM.search import SearchFilter
+from superM.exports import ExportMixin
+from superM.statscache import CachedStatsMixin
+from superM.statsfields import StatsFieldsMixin, select
+from parametres.models import Category, Commune, OrderStatus, TypeCommerce, UserType
 from rest_framework.renderers import JSONRenderer
 from datetime import datetime, timedelta
-from .models import Product, ProductFormat, Order, OrderItem
+from functools import cache
+from .models import Product, ProductFormat, Order, OrderItem, ReorderItem
 from shops.models import Shop
 from accounts.models import User
-from .serializers import ProductSerializer, ProductFormatSerializer, OrderSerializer, OrderItemSerializer, ProductStatsSerializer, ProductStatsSerializerShop
-
-class CustomShopPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
-
-    def get_page_size(self, request):
-        try:
-            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
-            if limit <= 0:
-                return self.page_size
-            return min(limit, self.max_page_size)
-        except (ValueError, TypeError):
-            return self.page_size
-
-    def get_paginated_response(self, data):
-        return Response({
-            'total': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'data': data
-        })
+from .serializers import ProductSerializer, ProductFormatSerializer, OrderSerializer, OrderItemSerializer, ProductStatsSerializer, ProductStatsSerializerShop, ReorderItemSerializer
 
 class ReadOnlyOrAuthenticated(IsAuthenticated):
     def has_permission(self, request, view):
@@ -39,114 +25,136 @@ class ReadOnlyOrAuthenticated(IsAuthenticated):
             return True
         return super().has_permission(request, view)
 
-class BaseViewSet(viewsets.ModelViewSet):
+class BaseViewSet(PrefetchPlanMixin, PaginatedListMixin, viewsets.ModelViewSet):
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            serializer = self.get_serializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        return Response(serializer.data)
-
-class ProductViewSet(BaseViewSet):
+class ProductViewSet(ExportMixin, BaseViewSet):
     queryset = Product.objects.all().select_related('category', 'supplier').prefetch_related('formats').order_by('name')
     serializer_class = ProductSerializer
     permission_classes = [ReadOnlyOrAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['category', 'supplier', 'name']
     search_fields = ['name', 'category__name']
+    export_filename = 'produits'
+    export_columns = [
+        ('id', 'id'), ('name', 'name'), ('category', 'category__name'), ('supplier', 'supplier__username'),
+        ('company', 'company__name'), ('last_order', 'last_order'),
+    ]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            if user.user_type.name == 'Super_admin':
-                print(user.user_type.name)
-                return super().get_queryset()
-            return Product.objects.filter(
-                supplier__company_name=user.company_name
-            ).select_related('category', 'supplier').prefetch_related('formats')
-        return Product.objects.none()
+        return super().get_queryset().for_tenant(self.request.user)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
-class ProductFormatViewSet(BaseViewSet):
+class ProductFormatViewSet(ExportMixin, BaseViewSet):
     queryset = ProductFormat.objects.all().select_related('product', 'taille', 'couleur').order_by('product__name')
     serializer_class = ProductFormatSerializer
     permission_classes = [ReadOnlyOrAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'taille', 'couleur']
     search_fields = ['product__name', 'taille__name', 'couleur__name']
+    export_filename = 'formats-produits'
+    export_columns = [
+        ('id', 'id'), ('product_id', 'product_id'), ('product', 'product__name'), ('taille', 'taille__name'),
+        ('couleur', 'couleur__name'), ('price', 'price'), ('stock', 'stock'), ('min_stock', 'min_stock'),
+    ]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            if user.user_type.name == 'Super_admin':
-                return super().get_queryset()
-            return ProductFormat.objects.filter(
-                product__supplier__company_name=user.company_name
-            ).select_related('product', 'taille', 'couleur')
-        return ProductFormat.objects.none()
+        return super().get_queryset().for_tenant(self.request.user)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
-class OrderViewSet(BaseViewSet):
+class OrderViewSet(ExportMixin, BaseViewSet):
     queryset = Order.objects.all().select_related('user', 'status').prefetch_related('items').order_by('-created_at')
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['user', 'status', 'created_at']
     search_fields = ['user__username']
+    export_filename = 'commandes'
+    export_columns = [
+        ('id', 'id'), ('user', 'user__username'), ('status', 'status__name'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            if user.user_type.name == 'Super_admin':
-                return super().get_queryset()
-            return Order.objects.filter(
-                user__company_name=user.company_name
-            ).select_related('user', 'status').prefetch_related('items')
-        return Order.objects.none()
+        return super().get_queryset().for_tenant(self.request.user)
 
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
-class OrderItemViewSet(BaseViewSet):
+class OrderItemViewSet(ExportMixin, BaseViewSet):
     queryset = OrderItem.objects.all().select_related('order', 'product_format').order_by('order__created_at')
     serializer_class = OrderItemSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['order', 'product_format']
     search_fields = ['product_format__product__name']
+    export_filename = 'articles-commandes'
+    export_columns = [
+        ('id', 'id'), ('order_id', 'order_id'), ('order_created_at', 'order__created_at'),
+        ('order_status', 'order__status__name'), ('product_format_id', 'product_format_id'),
+        ('product', 'product_format__product__name'), ('quantity', 'quantity'), ('price_at_order', 'price_at_order'),
+    ]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            if user.user_type.name == 'Super_admin':
-                return super().get_queryset()
-            return OrderItem.objects.filter(
-                product_format__product__supplier__company_name=user.company_name
-            ).select_related('order', 'product_format')
-        return OrderItem.objects.none()
+        return super().get_queryset().for_tenant(self.request.user)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
+class StockAlertViewSet(PrefetchPlanMixin, PaginatedListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Alertes de stock : la file de réapprovisionnement (formats sous leur stock
+    minimum), plus anciennes alertes d'abord. Toujours paginée (`?paginate=cursor`
+    pour le keyset) ; `?supplier=<id>` pour un fournisseur.
+    `suppliers/` : nombre d'alertes par fournisseur, paginé.
+    """
+    queryset = ReorderItem.objects.select_related(
+        'product_format__product', 'product_format__taille', 'product_format__couleur', 'supplier'
+    ).order_by('created_at', 'pk')
+    serializer_class = ReorderItemSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomShopPagination
+    renderer_classes = [JSONRenderer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['supplier']
+    cursor_ordering = ('created_at', 'pk')
+
+    def get_queryset(self):
+        return super().get_queryset().for_tenant(self.request.user)
+
+    def get_list_paginator(self, request):
+        return super().get_list_paginator(request) or self.pagination_class()
+
+    @action(detail=False, methods=['get'], url_path='suppliers')
+    def suppliers(self, request):
+        rows = self.filter_queryset(self.get_queryset()).values('supplier_id', 'supplier__username').annotate(
+            alerts=Count('id'), oldest_alert=Min('created_at')
+        ).order_by('-alerts', 'supplier_id')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response([
+            {
+                'supplier': row['supplier_id'],
+                'supplier_username': row['supplier__username'],
+                'alerts': row['alerts'],
+                'oldest_alert': row['oldest_alert'],
+            }
+            for row in page
+        ])
+
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -155,28 +163,22 @@ from rest_framework.renderers import JSONRenderer
 from django.db.models import Count, Sum, Avg, F
 from datetime import datetime, timedelta
 from .models import Product, ProductFormat, User
-from .serializers import ProductStatsSerializer, OverviewSerializer, CategoryStatsSerializer, SupplierStatsSerializer, CommerceStatsSerializer, CommuneStatsSerializer, UserTypeStatsSerializer
+from .serializers import ProductStatsSerializer, ProductOverviewSerializer, CategoryStatsSerializer, SupplierStatsSerializer, CommerceStatsSerializer, CommuneStatsSerializer, UserTypeStatsSerializer
 
 
-class ProductStatsView(viewsets.ViewSet):
+class ProductStatsView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    cache_scope = 'tenant'
+    cache_models = [Product, ProductFormat, User, Category, TypeCommerce, Commune, UserType]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
 
     def get_base_querysets(self, request):
         """Retourne les querysets filtrés selon le type d'utilisateur."""
         user = request.user
-        is_super_admin = user.user_type.name == 'Super_admin'
-
-        product_queryset = Product.objects.all()
-        product_format_queryset = ProductFormat.objects.all()
-        user_queryset = User.objects.all()
-
-        if not is_super_admin:
-            product_queryset = product_queryset.filter(supplier__company_name=user.company_name)
-            product_format_queryset = product_format_queryset.filter(product__supplier__company_name=user.company_name)
-            user_queryset = user_queryset.filter(company_name=user.company_name)
-
+        product_queryset = Product.objects.for_tenant(user)
+        product_format_queryset = ProductFormat.objects.for_tenant(user)
+        user_queryset = User.objects.for_tenant(user)
         return product_queryset, product_format_queryset, user_queryset
 
     def get_days(self, request):
@@ -196,22 +198,27 @@ class ProductStatsView(viewsets.ViewSet):
         product_queryset, product_format_queryset, user_queryset = self.get_base_querysets(request)
         days = self.get_days(request)
 
-        total_products = product_queryset.count()
-        total_formats = product_format_queryset.count()
-        low_stock_formats = product_format_queryset.filter(stock__lte=F('min_stock')).count()
-        total_suppliers = user_queryset.filter(products__isnull=False).distinct().count()
-        stock_out_rate = (low_stock_formats / total_formats * 100) if total_formats > 0 else 0
-
-        response_data = {
-            'total_products': total_products,
-            'total_formats': total_formats,
-            'low_stock_formats': low_stock_formats,
-            'total_suppliers': total_suppliers,
-            'stock_out_rate': round(stock_out_rate, 2),
-            'timeframe_days': days
-        }
-
-        serializer = OverviewSerializer(response_data)
+        @cache
+        def format_totals():
+            return product_format_queryset.aggregate(
+                total=Count('id'), low_stock=Count('id', filter=Q(is_low_stock=True))
+            )
+
+        def stock_out_rate():
+            total_formats, low_stock_formats = format_totals()['total'], format_totals()['low_stock']
+            return round((low_stock_formats / total_formats * 100) if total_formats > 0 else 0, 2)
+
+        # Seules les métriques demandées (`?fields=`) sont calculées
+        response_data = select({
+            'total_products': product_queryset.count,
+            'total_formats': lambda: format_totals()['total'],
+            'low_stock_formats': lambda: format_totals()['low_stock'],
+            'total_suppliers': lambda: user_queryset.filter(products__isnull=False).distinct().count(),
+            'stock_out_rate': stock_out_rate,
+            'timeframe_days': lambda: days,
+        }, self.fields)
+
+        serializer = ProductOverviewSerializer(response_data, context={'fields': self.fields})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='by-category')
@@ -316,40 +323,45 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Q, F
+from django.db.models import Sum, Count, Q, F, Exists, OuterRef
 from .serializers import (
     OverviewSerializer, OrderStatusStatsSerializer, OrderUserStatsSerializer,
     UserTypeStatsSerializer, SupplierStatsSerializer, TopProductsSerializer,
     OrdersByProductSerializer, OrdersByCategorySerializer, OrdersByCommuneSerializer
 )
 from .models import Order, OrderItem, Product, User
+from statistique.models import SupplierDailyStats, CategoryDailyStats, CommuneDailyStats, StatusDailyStats
+from statistique.rollups import rollup_total, ROLLUP_MODELS
 
 
-class ShopStatsView(viewsets.ViewSet):
+class ShopStatsView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    cache_scope = 'tenant'
+    cache_models = [Order, OrderItem, Product, ProductFormat, User, OrderStatus, Category, Commune, UserType, *ROLLUP_MODELS]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
 
     def get_base_querysets(self, request):
         """Retourne les querysets filtrés selon le type d'utilisateur."""
         user = request.user
-        is_super_admin = user.user_type.name == 'Super_admin'
-
-        order_queryset = Order.objects.all()
-        order_item_queryset = OrderItem.objects.all()
-        product_queryset = Product.objects.all()
-        user_queryset = User.objects.all()
-
-        if not is_super_admin:
-            order_queryset = order_queryset.filter(user__company_name=user.company_name)
-            order_item_queryset = order_item_queryset.filter(
-                product_format__product__supplier__company_name=user.company_name
-            )
-            product_queryset = product_queryset.filter(supplier__company_name=user.company_name)
-            user_queryset = user_queryset.filter(company_name=user.company_name)
-
+        order_queryset = Order.objects.for_tenant(user)
+        order_item_queryset = OrderItem.objects.for_tenant(user)
+        product_queryset = Product.objects.for_tenant(user)
+        user_queryset = User.objects.for_tenant(user)
         return order_queryset, order_item_queryset, product_queryset, user_queryset
 
+    def get_rollup_querysets(self, request):
+        """
+        Retourne les agrégats journaliers (fournisseur, catégorie, commune, statut)
+        filtrés selon le type d'utilisateur.
+        """
+        user = request.user
+        supplier_rollup = SupplierDailyStats.objects.for_tenant(user)
+        category_rollup = CategoryDailyStats.objects.for_tenant(user)
+        commune_rollup = CommuneDailyStats.objects.for_tenant(user)
+        status_rollup = StatusDailyStats.objects.for_tenant(user)
+        return supplier_rollup, category_rollup, commune_rollup, status_rollup
+
     def get_days_and_start_date(self, request):
         """Retourne le nombre de jours et la date de début."""
         days = int(request.query_params.get('days', 30))
@@ -366,42 +378,46 @@ class ShopStatsView(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='overview')
     def overview(self, request):
         """Statistiques générales des commandes."""
-        order_queryset, order_item_queryset, _, user_queryset = self.get_base_querysets(request)
+        _, _, _, user_queryset = self.get_base_querysets(request)
+        _, category_rollup, _, status_rollup = self.get_rollup_querysets(request)
         days, start_date = self.get_days_and_start_date(request)
 
-        total_orders = order_queryset.count()
-        recent_orders = order_queryset.filter(created_at__gte=start_date).count()
-        total_items = order_item_queryset.aggregate(total=Sum('quantity'))['total'] or 0
-        total_amount = order_item_queryset.aggregate(
-            total=Sum(F('quantity') * F('price_at_order'))
-        )['total'] or 0
-        total_order_users = user_queryset.filter(orders__isnull=False).distinct().count()
-        total_suppliers = user_queryset.filter(products__isnull=False).distinct().count()
-
-        response_data = {
-            'total_orders': total_orders,
-            'recent_orders': recent_orders,
-            'total_items': total_items,
-            'total_amount': float(total_amount) if total_amount else 0.0,
-            'total_order_users': total_order_users,
-            'total_suppliers': total_suppliers,
-            'timeframe_days': days
-        }
-
-        serializer = OverviewSerializer(response_data)
+        @cache
+        def order_totals():
+            return status_rollup.aggregate(
+                total=Sum('total_orders'),
+                recent=Sum('total_orders', filter=Q(date__gte=start_date.date()))
+            )
+
+        @cache
+        def item_totals():
+            return category_rollup.aggregate(items=Sum('total_items'), amount=Sum('total_amount'))
+
+        # Seules les métriques demandées (`?fields=`) sont calculées
+        response_data = select({
+            'total_orders': lambda: order_totals()['total'] or 0,
+            'recent_orders': lambda: order_totals()['recent'] or 0,
+            'total_items': lambda: item_totals()['items'] or 0,
+            'total_amount': lambda: float(item_totals()['amount']) if item_totals()['amount'] else 0.0,
+            'total_order_users': lambda: user_queryset.filter(orders__isnull=False).distinct().count(),
+            'total_suppliers': lambda: user_queryset.filter(products__isnull=False).distinct().count(),
+            'timeframe_days': lambda: days,
+        }, self.fields)
+
+        serializer = OverviewSerializer(response_data, context={'fields': self.fields})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='by-order-status')
     def by_order_status(self, request):
         """Statistiques par statut de commande."""
-        order_queryset, _, _, _ = self.get_base_querysets(request)
+        _, _, _, status_rollup = self.get_rollup_querysets(request)
         days, start_date = self.get_days_and_start_date(request)
 
-        order_status_stats = order_queryset.values('status__name').annotate(
-            total=Count('id'),
-            recent=Count('id', filter=Q(created_at__gte=start_date)),
-            total_items=Sum('items__quantity'),
-            total_amount=Sum(F('items__quantity') * F('items__price_at_order'))
+        order_status_stats = status_rollup.values('status__name').annotate(
+            total=Sum('total_orders'),
+            recent=Sum('total_orders', filter=Q(date__gte=start_date.date()), default=0),
+            total_items=Sum('total_items'),
+            total_amount=Sum('total_amount')
         ).order_by('status__name')
 
         order_status_stats, paginator = self.paginate_if_needed(list(order_status_stats), request)
@@ -461,12 +477,14 @@ class ShopStatsView(viewsets.ViewSet):
         """Statistiques par fournisseur."""
         _, _, _, user_queryset = self.get_base_querysets(request)
 
-        supplier_stats = user_queryset.filter(products__isnull=False).values(
-            'username', 'email', 'user_type__name'
+        supplier_stats = user_queryset.filter(
+            Exists(Product.objects.filter(supplier=OuterRef('pk')))
         ).annotate(
-            total_sales=Sum('products__formats__order_items__quantity'),
-            total_orders=Count('products__formats__order_items__order', distinct=True),
-            total_amount=Sum(F('products__formats__order_items__quantity') * F('products__formats__order_items__price_at_order'))
+            total_sales=rollup_total(SupplierDailyStats, 'supplier', 'total_items'),
+            total_orders=rollup_total(SupplierDailyStats, 'supplier', 'total_orders', default=0),
+            total_amount=rollup_total(SupplierDailyStats, 'supplier', 'total_amount')
+        ).values(
+            'username', 'email', 'user_type__name', 'total_sales', 'total_orders', 'total_amount'
         ).order_by('-total_orders')
 
         supplier_stats, paginator = self.paginate_if_needed(list(supplier_stats), request)
@@ -517,14 +535,14 @@ class ShopStatsView(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='by-category')
     def orders_by_category(self, request):
         """Commandes par catégorie de produit."""
-        _, order_item_queryset, _, _ = self.get_base_querysets(request)
+        _, category_rollup, _, _ = self.get_rollup_querysets(request)
 
-        orders_by_category = order_item_queryset.values(
-            'product_format__product__category__name'
+        orders_by_category = category_rollup.values(
+            product_format__product__category__name=F('category__name')
         ).annotate(
-            total_orders=Count('order', distinct=True),
-            total_items=Sum('quantity'),
-            total_amount=Sum(F('quantity') * F('price_at_order'))
+            total_orders=Sum('total_orders'),
+            total_items=Sum('total_items'),
+            total_amount=Sum('total_amount')
         ).order_by('-total_orders')
 
         orders_by_category, paginator = self.paginate_if_needed(list(orders_by_category), request)
@@ -537,14 +555,14 @@ class ShopStatsView(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='by-commune')
     def orders_by_commune(self, request):
         """Commandes par commune."""
-        order_queryset, _, _, _ = self.get_base_querysets(request)
+        _, _, commune_rollup, _ = self.get_rollup_querysets(request)
 
-        orders_by_commune = order_queryset.values(
-            'user__commune__name'
+        orders_by_commune = commune_rollup.values(
+            user__commune__name=F('commune__name')
         ).annotate(
-            total_orders=Count('id'),
-            total_items=Sum('items__quantity'),
-            total_amount=Sum(F('items__quantity') * F('items__price_at_order'))
+            total_orders=Sum('total_orders'),
+            total_items=Sum('total_items'),
+            total_amount=Sum('total_amount')
         ).order_by('-total_orders')[:10]
 
         orders_by_commune, paginator = self.paginate_if_needed(list(orders_by_commune), request)
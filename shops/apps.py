@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ShopsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shops'
+
+    def ready(self):
+        from superM import images
+        from superM.versions import track
+        from . import signals  # noqa: F401
+        track(self.get_model('Shop'))
+        images.register(self.get_model('Shop'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+from superM.geo import encode_geohash
+
+
+def populate_geohash(apps, schema_editor):
+    Shop = apps.get_model('shops', 'Shop')
+    shops = list(Shop.objects.only('id', 'latitude', 'longitude'))
+    for shop in shops:
+        shop.geohash = encode_geohash(shop.latitude, shop.longitude)
+    Shop.objects.bulk_update(shops, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parametres', '0002_category_image'),
+        ('shops', '0002_shop_commune_shop_quartier_shop_zone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['latitude', 'longitude'], name='shops_shop_latitud_e4840a_idx'),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
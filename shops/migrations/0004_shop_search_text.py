@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+from superM.search import normalize, trigram_index
+
+
+def populate_search_text(apps, schema_editor):
+    Shop = apps.get_model('shops', 'Shop')
+    rows = list(Shop.objects.all())
+    for shop in rows:
+        shop.search_text = normalize(shop.name, shop.brand, shop.owner_name, shop.address)
+    Shop.objects.bulk_update(rows, ['search_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0003_shop_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        trigram_index('shops_shop'),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parametres', '0003_updated_at'),
+        ('shops', '0004_shop_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['updated_at'], name='shops_shop_updated_dcc75b_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0005_shop_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, max_length=255, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='image_thumb',
+            field=models.ImageField(blank=True, editable=False, max_length=255, null=True, upload_to=''),
+        ),
+    ]
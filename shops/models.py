@@ -1,12 +1,17 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from accounts.models import User
+from superM.geo import encode_geohash
+from superM.search import normalize
+from superM.tracking import LoadedValuesMixin, saves_any
 from parametres.models import ShopType, TypeCommerce, TailleShop, FrequenceApprovisionnement,Commune,Quartier,Zone
 
-class Shop(models.Model):
+class Shop(LoadedValuesMixin, models.Model):
     owner = models.ForeignKey(User, related_name='shops', on_delete=models.PROTECT)
     name = models.CharField(max_length=100)
     image = models.ImageField(upload_to='shops/', blank=True, null=True)
+    image_thumb = models.ImageField(max_length=255, blank=True, null=True, editable=False)  # Dérivés, voir superM.images
+    image_medium = models.ImageField(max_length=255, blank=True, null=True, editable=False)
     type = models.ForeignKey(ShopType, on_delete=models.PROTECT)
     typecommerce = models.ForeignKey(TypeCommerce, on_delete=models.SET_NULL, null=True, blank=True)
     taille = models.ForeignKey(TailleShop, on_delete=models.SET_NULL, null=True, blank=True)
@@ -18,16 +23,38 @@ class Shop(models.Model):
     zone = models.ForeignKey(Zone, on_delete=models.SET_NULL, null=True, blank=True, related_name='shop')
     latitude = models.FloatField()
     longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)  # Calculé depuis latitude/longitude
     owner_name = models.CharField(max_length=100)
     owner_gender = models.CharField(max_length=10)
     owner_phone = models.CharField(max_length=15)
     owner_email = models.EmailField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_text = models.TextField(blank=True, default='', editable=False)  # Voir superM.search
 
     def __str__(self):
         return self.name
 
+    search_document_fields = ('name', 'brand', 'owner_name', 'address')  # Sources de search_text
+
+    def search_document(self):
+        return normalize(*(getattr(self, name) for name in self.search_document_fields))
+
+    def save(self, *args, **kwargs):
+        # Champs calculés enregistrés seulement avec leurs sources
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        if saves_any(update_fields, ('latitude', 'longitude')):
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+            derived.add('geohash')
+        if saves_any(update_fields, self.search_document_fields):
+            self.search_text = self.search_document()
+            derived.add('search_text')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | derived
+        super().save(*args, **kwargs)
+        self.remember_loaded_values(kwargs.get('update_fields'))
+
     class Meta:
         verbose_name = "Boutique"
         verbose_name_plural = "Boutiques"
@@ -37,4 +64,6 @@ class Shop(models.Model):
             models.Index(fields=['type']),
             models.Index(fields=['typecommerce']),
             models.Index(fields=['taille']),
+            models.Index(fields=['latitude', 'longitude']),
+            models.Index(fields=['updated_at']),
         ]
\ No newline at end of file
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Shop
 from accounts.models import User
 from parametres.models import ShopType, TypeCommerce, TailleShop, FrequenceApprovisionnement
+from superM.statsfields import SparseSerializerMixin
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -30,13 +31,21 @@ class ShopSerializer(serializers.ModelSerializer):
     class Meta:
         model = Shop
         fields = [
-            'id', 'owner', 'name', 'image', 'type', 'type_id', 'typecommerce', 'typecommerce_id',
+            'id', 'owner', 'name', 'image', 'image_thumb', 'image_medium', 'type', 'type_id',
+            'typecommerce', 'typecommerce_id',
             'taille', 'taille_id', 'brand', 'frequence_appr', 'frequence_appr_id', 'address',
             'latitude', 'longitude', 'owner_name', 'owner_gender', 'owner_phone', 'owner_email',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['owner', 'created_at', 'updated_at']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        distance = getattr(instance, 'distance', None)
+        if distance is not None:  # Annotée par les filtres de localisation (km)
+            data['distance'] = round(distance, 3)
+        return data
+
 class ShopSerializerSupplier(serializers.ModelSerializer):
     class Meta:
         model = Shop
@@ -54,18 +63,33 @@ class ShopStatsByBrandSerializer(serializers.Serializer):
 class ShopStatsByDateSerializer(serializers.Serializer):
     date = serializers.DateField()
     total = serializers.IntegerField()
+    cumulative = serializers.IntegerField()
 
 class ShopStatsByMonthSerializer(serializers.Serializer):
     month = serializers.CharField()  # Format: YYYY-MM
     total = serializers.IntegerField()
+    cumulative = serializers.IntegerField()
 
 class ShopStatsByYearSerializer(serializers.Serializer):
     year = serializers.CharField()  # Format: YYYY
     total = serializers.IntegerField()
+    cumulative = serializers.IntegerField()
+
+class ShopGrowthSerializer(serializers.Serializer):
+    period = serializers.DateField()  # Premier jour de la période
+    total = serializers.IntegerField()
+    cumulative = serializers.IntegerField()
 
 from rest_framework import serializers
 
-class OverviewSerializer(serializers.Serializer):
+class ShopClusterSerializer(serializers.Serializer):
+    cell = serializers.CharField()  # Préfixe geohash de la grappe
+    count = serializers.IntegerField()
+    latitude = serializers.FloatField()  # Barycentre des boutiques
+    longitude = serializers.FloatField()
+    dominant_type = serializers.CharField(allow_null=True)
+
+class OverviewSerializer(SparseSerializerMixin, serializers.Serializer):
     total_shops = serializers.IntegerField()
     recent_shops = serializers.IntegerField()
     total_suppliers = serializers.IntegerField()
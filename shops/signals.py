@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from superM.versions import bump_version
+from .models import Shop
+
+# Les créations ne touchent que la période ouverte des séries de croissance ;
+# seules les modifications et suppressions changent les périodes closes en cache.
+HISTORY_VERSION = 'shops.shop:history'
+
+
+@receiver(post_save, sender=Shop)
+def shop_updated(sender, instance, created, **kwargs):
+    if not created:
+        bump_version(HISTORY_VERSION)
+
+
+@receiver(post_delete, sender=Shop)
+def shop_deleted(sender, instance, **kwargs):
+    bump_version(HISTORY_VERSION)
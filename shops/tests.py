@@ -1,3 +1,60 @@
+import time
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from superM.geo import cell_count, covering_cells, encode_geohash
+from superM.testing import jwt_client, sample_data
+from .models import Shop
+
+
+class ClusterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()
+
+    def setUp(self):
+        self.client = jwt_client(self.data.admin)
+
+    def test_cell_count_matches_covering_cells(self):
+        for bbox in ((-90, -180, 90, 180), (5.3, -4.1, 5.5, -3.9), (-10, 170, 10, -170), (89, 0, 90, 1)):
+            for precision in range(4):
+                with self.subTest(bbox=bbox, precision=precision):
+                    self.assertEqual(cell_count(*bbox, precision), len(covering_cells(*bbox, precision)))
+
+    def test_large_bbox_at_high_zoom_stays_bounded(self):
+        url = reverse('shop-clusters')
+        for params in ({'zoom': 12}, {'zoom': 20, 'bbox': '5,5,6,6'}, {'zoom': 20, 'bbox': '-4.1,5.3,-3.9,5.5'}):
+            with self.subTest(params=params):
+                started = time.monotonic()
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(sum(cluster['count'] for cluster in response.json()['clusters']), len(self.data.shops))
+
+
+class ShopSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def update_sql(self, shop, fields):
+        with CaptureQueriesContext(connection) as queries:
+            shop.save(update_fields=fields)
+        return ' '.join(query['sql'] for query in queries)
+
+    def test_partial_save_writes_derived_fields_with_their_sources_only(self):
+        shop = Shop.objects.get()
+        sql = self.update_sql(shop, ['owner_phone'])
+        self.assertNotIn('search_text', sql)
+        self.assertNotIn('geohash', sql)
 
-# Create your tests here.
+        shop.name, shop.latitude = 'Épicerie Awa', 6.0
+        sql = self.update_sql(shop, ['name', 'latitude'])
+        self.assertIn('search_text', sql)
+        self.assertIn('geohash', sql)
+        shop.refresh_from_db()
+        self.assertIn('epicerie awa', shop.search_text)
+        self.assertEqual(shop.geohash, encode_geohash(6.0, shop.longitude))
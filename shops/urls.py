@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ShopViewSet, ShopViewSetSupplier, ShopStatsByTypeView, ShopStatsByBrandView,
-    ShopStatsByDateView, ShopStatsByMonthView, ShopStatsByYearView, ShopStatsView
+    ShopStatsByDateView, ShopStatsByMonthView, ShopStatsByYearView, ShopStatsView,
+    ShopGrowthView
 )
 
 router = DefaultRouter()
@@ -13,6 +14,7 @@ router.register(r'stats-shops-by-brand', ShopStatsByBrandView, basename='stats-s
 router.register(r'stats-shops-by-date', ShopStatsByDateView, basename='stats-shops-by-date')
 router.register(r'stats-shops-by-month', ShopStatsByMonthView, basename='stats-shops-by-month')
 router.register(r'stats-shops-by-year', ShopStatsByYearView, basename='stats-shops-by-year')
+router.register(r'stats-shops-growth', ShopGrowthView, basename='stats-shops-growth')
 router.register(r'shop-stats', ShopStatsView, basename='stats-shops')
 
 urlpatterns = [
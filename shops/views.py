@@ -1,77 +1,74 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.pagination import PageNumberPagination
+from superM.pagination import CustomShopPagination, PaginatedListMixin
+from superM.prefetch import PrefetchPlanMixin
 from django_filters.rest_framework import DjangoFilterBackend
+from superM.search import SearchFilter
+from superM.exports import ExportMixin
+from superM.statscache import CachedStatsMixin
+from superM.statsfields import StatsFieldsMixin, select
 from django.db.models import Count
-from django.db.models.functions import TruncDate, TruncMonth, TruncYear
 from rest_framework.renderers import JSONRenderer
 from django.db.models import Count, Sum, Q, F, Avg
 from datetime import datetime, timedelta
+import functools
 from .models import Shop
 from .serializers import (
     ShopSerializer, ShopSerializerSupplier, ShopStatsByTypeSerializer,
     ShopStatsByDateSerializer, ShopStatsByMonthSerializer, ShopStatsByYearSerializer,
-    ShopStatsByBrandSerializer, ShopStatsSerializer
+    ShopStatsByBrandSerializer, ShopStatsSerializer, ShopGrowthSerializer, ShopClusterSerializer
+)
+from django.conf import settings
+from django.core.cache import cache
+from .signals import HISTORY_VERSION
+from superM.geo import (
+    filter_location, parse_bbox, parse_zoom, precision_for_zoom, covering_cells, cluster_cells, tile_precision
 )
-from parametres.models import Module
+from superM.timeseries import parse_series_params, bucket_series
+from superM.versions import get_versions
+from parametres.models import Module, ShopType, TypeCommerce, TailleShop, FrequenceApprovisionnement, Commune, Quartier, Zone
 from accounts.models import User
 
-class CustomShopPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
-
-    def get_page_size(self, request):
-        try:
-            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
-            if limit <= 0:
-                return self.page_size
-            return min(limit, self.max_page_size)
-        except (ValueError, TypeError):
-            return self.page_size
-
-    def get_paginated_response(self, data):
-        return Response({
-            'total': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'data': data
-        })
-
 class ReadOnlyOrAuthenticated(IsAuthenticated):
     def has_permission(self, request, view):
         if request.method in ['GET', 'HEAD', 'OPTIONS']:
             return True
         return super().has_permission(request, view)
 
-class BaseViewSet(viewsets.ModelViewSet):
+class BaseViewSet(PrefetchPlanMixin, PaginatedListMixin, viewsets.ModelViewSet):
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            serializer = self.get_serializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        return Response(serializer.data)
-
-class ShopViewSet(BaseViewSet):
+class ShopViewSet(ExportMixin, BaseViewSet):
     serializer_class = ShopSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['type', 'typecommerce', 'taille', 'brand']
     search_fields = ['name', 'address', 'owner_name']
     module_name = 'Shops'
+    max_cluster_tiles = 64
+    export_filename = 'boutiques'
+    export_columns = [
+        ('id', 'id'), ('name', 'name'), ('owner', 'owner__username'), ('type', 'type__name'),
+        ('typecommerce', 'typecommerce__name'), ('taille', 'taille__name'), ('brand', 'brand'),
+        ('frequence_appr', 'frequence_appr__name'), ('address', 'address'), ('commune', 'commune__name'),
+        ('quartier', 'quartier__name'), ('zone', 'zone__name'), ('latitude', 'latitude'), ('longitude', 'longitude'),
+        ('owner_name', 'owner_name'), ('owner_gender', 'owner_gender'), ('owner_phone', 'owner_phone'),
+        ('owner_email', 'owner_email'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ('list', 'export'):
+            queryset = filter_location(queryset, self.request.query_params)
+        return queryset
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            if user.user_type.name.lower() == 'super_admin':
+            if user.is_super_admin:
                 return Shop.objects.all().select_related('owner', 'type', 'typecommerce', 'taille', 'frequence_appr')
             return Shop.objects.filter(
                 owner=user
@@ -81,6 +78,50 @@ class ShopViewSet(BaseViewSet):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    @action(detail=False, methods=['get'], url_path='clusters')
+    def clusters(self, request):
+        """
+        Grappes de boutiques pour la carte : `?bbox=min_lng,min_lat,max_lng,max_lat&zoom=`.
+        Les boutiques sont regroupées par cellule geohash (taille selon le zoom) ;
+        les grappes sont calculées et mises en cache par tuile (cellule parente),
+        jusqu'à la prochaine écriture sur les boutiques.
+        """
+        zoom = parse_zoom(request.query_params)
+        bbox = parse_bbox(request.query_params['bbox']) if request.query_params.get('bbox') else (-90, -180, 90, 180)
+        precision = precision_for_zoom(zoom)
+        # Précision des tuiles choisie avant d'énumérer les cellules : un grand cadre à fort zoom reste borné
+        tiles = covering_cells(*bbox, tile_precision(*bbox, precision - 1, self.max_cluster_tiles))
+
+        user = request.user
+        scope = 'all' if user.is_super_admin else f'owner:{user.pk}'
+        version = '.'.join(map(str, get_versions([Shop, ShopType])))
+        prefix = f'shops:clusters:{scope}:{version}:{precision}:'
+        cached = cache.get_many([prefix + tile for tile in tiles])
+        found = {key[len(prefix):]: value for key, value in cached.items()}
+        missing = tiles - found.keys()
+        if missing:
+            computed = cluster_cells(self.get_queryset(), precision, missing, 'type__name')
+            cache.set_many(
+                {prefix + tile: value for tile, value in computed.items()},
+                getattr(settings, 'SHOP_CLUSTER_CACHE_TIMEOUT', 3600)
+            )
+            found.update(computed)
+
+        min_lat, min_lng, max_lat, max_lng = bbox
+        crosses = min_lng > max_lng
+        clusters = [
+            cluster for tile in sorted(found) for cluster in found[tile]
+            if min_lat <= cluster['latitude'] <= max_lat
+            and ((cluster['longitude'] >= min_lng or cluster['longitude'] <= max_lng) if crosses
+                 else min_lng <= cluster['longitude'] <= max_lng)
+        ]
+        return Response({
+            'zoom': zoom,
+            'precision': precision,
+            'total': sum(cluster['count'] for cluster in clusters),
+            'clusters': ShopClusterSerializer(clusters, many=True).data
+        })
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
@@ -97,7 +138,7 @@ class ShopViewSetSupplier(BaseViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            if user.user_type.name.lower() == 'super_admin':
+            if user.is_super_admin:
                 return Shop.objects.all().only('id', 'name')
             return Shop.objects.filter(
                 owner=user
@@ -109,15 +150,16 @@ class ShopViewSetSupplier(BaseViewSet):
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
-class ShopStatsByTypeView(viewsets.ViewSet):
+class ShopStatsByTypeView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    cache_models = [Shop]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
     module_name = 'Shops'
 
     def list(self, request):
         user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
+        is_super_admin = user.is_super_admin
         shop_queryset = Shop.objects.all()
 
         if not is_super_admin:
@@ -138,15 +180,16 @@ class ShopStatsByTypeView(viewsets.ViewSet):
         serializer = ShopStatsByTypeSerializer(shop_stats, many=True)
         return Response(serializer.data)
 
-class ShopStatsByBrandView(viewsets.ViewSet):
+class ShopStatsByBrandView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    cache_models = [Shop]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
     module_name = 'Shops'
 
     def list(self, request):
         user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
+        is_super_admin = user.is_super_admin
         shop_queryset = Shop.objects.all()
 
         if not is_super_admin:
@@ -167,95 +210,95 @@ class ShopStatsByBrandView(viewsets.ViewSet):
         serializer = ShopStatsByBrandSerializer(shop_stats, many=True)
         return Response(serializer.data)
 
-class ShopStatsByDateView(viewsets.ViewSet):
+class ShopGrowthView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
+    """
+    Croissance du nombre de boutiques : `?granularity=day|week|month|year&start=&end=`
+    (dates AAAA-MM-JJ). Toutes les périodes sont renvoyées, y compris vides,
+    avec le cumul ; les périodes closes sont servies depuis le cache.
+    """
     permission_classes = [IsAuthenticated]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
+    serializer_class = ShopGrowthSerializer
     module_name = 'Shops'
+    granularity = None  # Imposée par les routes historiques par jour/mois/année
+    cache_models = [Shop]
+    full_history = False  # Sans `start`, couvrir toute l'histoire plutôt que les dernières périodes
 
-    def list(self, request):
-        user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
+    def get_queryset(self):
+        user = self.request.user
         shop_queryset = Shop.objects.all()
-
-        if not is_super_admin:
+        if not user.is_super_admin:
             shop_queryset = shop_queryset.filter(owner=user)
+        return shop_queryset
 
-        shop_stats = (
-            shop_queryset.annotate(date=TruncDate('created_at'))
-            .values('date')
-            .annotate(total=Count('id'))
-            .order_by('date')
-        )
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(shop_stats, request)
-            serializer = ShopStatsByDateSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-
-        serializer = ShopStatsByDateSerializer(shop_stats, many=True)
-        return Response(serializer.data)
-
-class ShopStatsByMonthView(viewsets.ViewSet):
-    permission_classes = [IsAuthenticated]
-    pagination_class = CustomShopPagination
-    renderer_classes = [JSONRenderer]
-    module_name = 'Shops'
+    def get_series_cache_key(self):
+        user = self.request.user
+        scope = 'all' if user.is_super_admin else f'owner:{user.pk}'
+        return f'shops:{scope}:{get_versions([HISTORY_VERSION])[0]}'
+
+    def get_series(self, request):
+        shop_queryset = self.get_queryset()
+        params = request.query_params.copy()
+        if self.granularity:
+            params['granularity'] = self.granularity
+        granularity, start, end = parse_series_params(params, shop_queryset if self.full_history else None)
+        series = bucket_series(shop_queryset, granularity, start, end, cache_key=self.get_series_cache_key())
+        return granularity, start, end, series
 
     def list(self, request):
-        user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
-        shop_queryset = Shop.objects.all()
+        granularity, start, end, series = self.get_series(request)
+        serializer = self.serializer_class(series, many=True)
+        return Response({
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'total': sum(row['total'] for row in series),
+            'data': serializer.data
+        })
 
-        if not is_super_admin:
-            shop_queryset = shop_queryset.filter(owner=user)
+class LegacyShopGrowthView(ShopGrowthView):
+    """Anciennes routes par jour/mois/année : une liste de périodes, paginable avec `?paginate=true`."""
+    full_history = True
+    period_key = None
+    period_format = None
 
-        shop_stats = (
-            shop_queryset.annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(total=Count('id'))
-            .order_by('month')
-        )
+    def list(self, request):
+        _, _, _, series = self.get_series(request)
+        rows = [
+            {
+                self.period_key: row['period'].strftime(self.period_format) if self.period_format else row['period'],
+                'total': row['total'],
+                'cumulative': row['cumulative']
+            }
+            for row in series
+        ]
 
         if request.query_params.get('paginate') == 'true':
             paginator = self.pagination_class()
-            page = paginator.paginate_queryset(shop_stats, request)
-            serializer = ShopStatsByMonthSerializer(page, many=True)
+            page = paginator.paginate_queryset(rows, request)
+            serializer = self.serializer_class(page, many=True)
             return paginator.get_paginated_response(serializer.data)
 
-        serializer = ShopStatsByMonthSerializer(shop_stats, many=True)
+        serializer = self.serializer_class(rows, many=True)
         return Response(serializer.data)
 
-class ShopStatsByYearView(viewsets.ViewSet):
-    permission_classes = [IsAuthenticated]
-    pagination_class = CustomShopPagination
-    renderer_classes = [JSONRenderer]
-    module_name = 'Shops'
+class ShopStatsByDateView(LegacyShopGrowthView):
+    serializer_class = ShopStatsByDateSerializer
+    granularity = 'day'
+    period_key = 'date'
 
-    def list(self, request):
-        user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
-        shop_queryset = Shop.objects.all()
-
-        if not is_super_admin:
-            shop_queryset = shop_queryset.filter(owner=user)
-
-        shop_stats = (
-            shop_queryset.annotate(year=TruncYear('created_at'))
-            .values('year')
-            .annotate(total=Count('id'))
-            .order_by('year')
-        )
-
-        if request.query_params.get('paginate') == 'true':
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(shop_stats, request)
-            serializer = ShopStatsByYearSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+class ShopStatsByMonthView(LegacyShopGrowthView):
+    serializer_class = ShopStatsByMonthSerializer
+    granularity = 'month'
+    period_key = 'month'
+    period_format = '%Y-%m'
 
-        serializer = ShopStatsByYearSerializer(shop_stats, many=True)
-        return Response(serializer.data)
+class ShopStatsByYearView(LegacyShopGrowthView):
+    serializer_class = ShopStatsByYearSerializer
+    granularity = 'year'
+    period_key = 'year'
+    period_format = '%Y'
 
 from rest_framework import viewsets
 from rest_framework.decorators import action
@@ -263,24 +306,40 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from datetime import datetime, timedelta
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, Sum, Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from .serializers import (
     OverviewSerializer, ShopStatsSerializer, TypeCommerceStatsSerializer,
     ShopTypeStatsSerializer, TailleStatsSerializer, FrequenceApprStatsSerializer,
     OwnerStatsSerializer, CommuneStatsSerializer, QuartierStatsSerializer, ZoneStatsSerializer
 )
 from .models import Shop
+from products.models import Product
+from statistique.models import ShopDailyStats, SupplierDailyStats
+from statistique.rollups import rollup_total, ROLLUP_MODELS
 
 
-class ShopStatsView(viewsets.ViewSet):
+def product_count(outer_ref):
+    """Nombre de produits du fournisseur référencé, sans jointure dans la requête principale."""
+    return Coalesce(Subquery(
+        Product.objects.filter(supplier=OuterRef(outer_ref)).values('supplier')
+        .annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+class ShopStatsView(StatsFieldsMixin, CachedStatsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    cache_models = [
+        Shop, User, Product, ShopType, TypeCommerce, TailleShop, FrequenceApprovisionnement,
+        Commune, Quartier, Zone, *ROLLUP_MODELS
+    ]
     pagination_class = CustomShopPagination
     renderer_classes = [JSONRenderer]
 
     def get_base_querysets(self, request):
         """Retourne les querysets filtrés selon le type d'utilisateur."""
         user = request.user
-        is_super_admin = user.user_type.name.lower() == 'super_admin'
+        is_super_admin = user.is_super_admin
 
         shop_queryset = Shop.objects.all()
         user_queryset = User.objects.all()
@@ -291,6 +350,14 @@ class ShopStatsView(viewsets.ViewSet):
 
         return shop_queryset, user_queryset
 
+    def with_rollups(self, shop_queryset):
+        """Annote chaque boutique avec ses produits et ventes issus des agrégats journaliers."""
+        return shop_queryset.annotate(
+            shop_products=product_count('owner'),
+            shop_sales=rollup_total(ShopDailyStats, 'shop', 'total_items'),
+            shop_orders=rollup_total(ShopDailyStats, 'shop', 'total_orders', default=0)
+        )
+
     def get_days_and_start_date(self, request):
         """Retourne le nombre de jours et la date de début."""
         days = int(request.query_params.get('days', 30))
@@ -310,18 +377,19 @@ class ShopStatsView(viewsets.ViewSet):
         shop_queryset, user_queryset = self.get_base_querysets(request)
         days, start_date = self.get_days_and_start_date(request)
 
-        total_shops = shop_queryset.count()
-        recent_shops = shop_queryset.filter(created_at__gte=start_date).count()
-        total_suppliers = user_queryset.filter(shops__isnull=False).distinct().count()
+        @functools.cache
+        def shop_totals():
+            return shop_queryset.aggregate(total=Count('id'), recent=Count('id', filter=Q(created_at__gte=start_date)))
 
-        response_data = {
-            'total_shops': total_shops,
-            'recent_shops': recent_shops,
-            'total_suppliers': total_suppliers,
-            'timeframe_days': days
-        }
+        # Seules les métriques demandées (`?fields=`) sont calculées
+        response_data = select({
+            'total_shops': lambda: shop_totals()['total'],
+            'recent_shops': lambda: shop_totals()['recent'],
+            'total_suppliers': lambda: user_queryset.filter(shops__isnull=False).distinct().count(),
+            'timeframe_days': lambda: days,
+        }, self.fields)
 
-        serializer = OverviewSerializer(response_data)
+        serializer = OverviewSerializer(response_data, context={'fields': self.fields})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='by-shop')
@@ -329,12 +397,12 @@ class ShopStatsView(viewsets.ViewSet):
         """Statistiques par boutique."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        shop_stats = shop_queryset.values(
+        shop_stats = self.with_rollups(shop_queryset).values(
             'name', 'owner__username', 'type__name', 'typecommerce__name', 'taille__name', 'frequence_appr__name'
         ).annotate(
-            total_products=Count('owner__products'),
-            total_sales=Sum('owner__products__formats__order_items__quantity'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_sales=Sum('shop_sales'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total_products')
 
         shop_stats, paginator = self.paginate_if_needed(list(shop_stats), request)
@@ -349,10 +417,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par type de commerce."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        shop_by_typecommerce = shop_queryset.values('typecommerce__name').annotate(
+        shop_by_typecommerce = self.with_rollups(shop_queryset).values('typecommerce__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         shop_by_typecommerce, paginator = self.paginate_if_needed(list(shop_by_typecommerce), request)
@@ -367,10 +435,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par type de boutique."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        shop_by_type = shop_queryset.values('type__name').annotate(
+        shop_by_type = self.with_rollups(shop_queryset).values('type__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         shop_by_type, paginator = self.paginate_if_needed(list(shop_by_type), request)
@@ -385,10 +453,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par taille."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        shop_by_taille = shop_queryset.values('taille__name').annotate(
+        shop_by_taille = self.with_rollups(shop_queryset).values('taille__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         shop_by_taille, paginator = self.paginate_if_needed(list(shop_by_taille), request)
@@ -403,10 +471,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par fréquence d'approvisionnement."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        shop_by_frequence_appr = shop_queryset.values('frequence_appr__name').annotate(
+        shop_by_frequence_appr = self.with_rollups(shop_queryset).values('frequence_appr__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         shop_by_frequence_appr, paginator = self.paginate_if_needed(list(shop_by_frequence_appr), request)
@@ -425,9 +493,9 @@ class ShopStatsView(viewsets.ViewSet):
             'username', 'email', 'user_type__name'
         ).annotate(
             total_shops=Count('shops'),
-            total_products=Count('products'),
-            total_sales=Sum('products__formats__order_items__quantity'),
-            total_orders=Count('products__formats__order_items__order', distinct=True)
+            total_products=product_count('pk'),
+            total_sales=rollup_total(SupplierDailyStats, 'supplier', 'total_items'),
+            total_orders=rollup_total(SupplierDailyStats, 'supplier', 'total_orders', default=0)
         ).order_by('-total_shops')
 
         owner_stats, paginator = self.paginate_if_needed(list(owner_stats), request)
@@ -442,10 +510,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par commune."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        commune_stats = shop_queryset.values('commune__name').annotate(
+        commune_stats = self.with_rollups(shop_queryset).values('commune__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         commune_stats, paginator = self.paginate_if_needed(list(commune_stats), request)
@@ -460,10 +528,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par quartier."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        quartier_stats = shop_queryset.values('quartier__name', 'commune__name').annotate(
+        quartier_stats = self.with_rollups(shop_queryset).values('quartier__name', 'commune__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         quartier_stats, paginator = self.paginate_if_needed(list(quartier_stats), request)
@@ -478,10 +546,10 @@ class ShopStatsView(viewsets.ViewSet):
         """Boutiques par zone."""
         shop_queryset, _ = self.get_base_querysets(request)
 
-        zone_stats = shop_queryset.values('zone__name', 'commune__name').annotate(
+        zone_stats = self.with_rollups(shop_queryset).values('zone__name', 'commune__name').annotate(
             total=Count('id'),
-            total_products=Count('owner__products'),
-            total_orders=Count('owner__products__formats__order_items__order', distinct=True)
+            total_products=Sum('shop_products'),
+            total_orders=Sum('shop_orders')
         ).order_by('-total')
 
         zone_stats, paginator = self.paginate_if_needed(list(zone_stats), request)
@@ -2,4 +2,5 @@ from django.contrib import admin
 from .models import *
 # Register your models here.
 
-admin.site.register(ProductCollecte)
\ No newline at end of file
+admin.site.register(ProductCollecte)
+admin.site.register(ImportBatch)
\ No newline at end of file
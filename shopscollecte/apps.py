@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ShopscollecteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shopscollecte'
+
+    def ready(self):
+        from superM import images
+        from superM.versions import track
+        track(self.get_model('ProductCollecte'))
+        images.register(self.get_model('ProductCollecte'))
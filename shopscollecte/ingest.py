@@ -0,0 +1,192 @@
+"""
+Import par lot de produits collectés (API `products-collecte/bulk/` et
+commande `import_products_collecte`).
+
+Les catégories, fréquences d'approvisionnement et boutiques référencées sont
+chargées une seule fois par lot ; chaque ligne est validée contre ces tables
+en mémoire, puis les lignes valides sont insérées par `bulk_create` par
+paquets. Le résultat indique le sort de chaque ligne (créée, doublon, erreur).
+
+Idempotence, pour les renvois depuis un réseau mobile instable :
+- une clé de lot (`Idempotency-Key`) : le résultat est enregistré et rejoué
+  tel quel si la même clé est renvoyée ;
+- un `client_id` par ligne : une ligne déjà importée par le même
+  utilisateur n'est pas recréée.
+"""
+import csv
+import io
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from parametres.models import Category, FrequenceApprovisionnement
+from shops.models import Shop
+from superM.search import normalize
+from superM.versions import bump_version
+from .models import ProductCollecte, ImportBatch
+
+
+class CSVParser(BaseParser):
+    """Corps `text/csv` (en-têtes en première ligne) -> liste de dicts (voir `read_csv`)."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return read_csv(io.StringIO(stream.read().decode('utf-8-sig')))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ParseError(f"CSV invalide : {e}")
+
+
+def read_csv(text_stream):
+    """Une ligne par dict ; les cellules vides sont omises pour que les valeurs par défaut s'appliquent."""
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in csv.DictReader(text_stream)
+    ]
+
+
+class ProductCollecteRowSerializer(serializers.Serializer):
+    client_id = serializers.CharField(max_length=64, required=False, allow_null=True, allow_blank=True)
+    name = serializers.CharField(max_length=100)
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+    category = serializers.CharField(required=False, allow_null=True)  # Nom, si category_id est absent
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    stock = serializers.IntegerField(min_value=0)
+    min_stock = serializers.IntegerField(min_value=0, required=False, default=0)
+    frequence_appr_id = serializers.IntegerField(required=False, allow_null=True)
+    frequence_appr = serializers.CharField(required=False, allow_null=True)  # Nom, si frequence_appr_id est absent
+    reorder_frequency = serializers.IntegerField(min_value=0, max_value=365)
+    supplier_id = serializers.IntegerField()
+
+
+class ReferenceMaps:
+    """Tables de référence d'un lot, chargées une fois : par identifiant et par nom normalisé."""
+    def __init__(self, rows):
+        categories = list(Category.objects.only('id', 'name'))
+        frequences = list(FrequenceApprovisionnement.objects.only('id', 'name'))
+        self.categories = {item.pk: item for item in categories}
+        self.category_names = {normalize(item.name): item for item in categories}
+        self.frequences = {item.pk: item for item in frequences}
+        self.frequence_names = {normalize(item.name): item for item in frequences}
+        supplier_ids = set()
+        for row in rows:
+            try:
+                supplier_ids.add(int(row.get('supplier_id')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        self.shops = Shop.objects.in_bulk(supplier_ids) if supplier_ids else {}
+
+    @staticmethod
+    def _lookup(by_id, by_name, pk, name):
+        if pk is not None:
+            return by_id.get(pk)
+        return by_name.get(normalize(name)) if name else None
+
+    def resolve(self, data):
+        """Retourne (category, frequence_appr, supplier, erreurs)."""
+        errors = {}
+        category = self._lookup(self.categories, self.category_names, data.get('category_id'), data.get('category'))
+        if category is None:
+            errors['category_id'] = "Catégorie inconnue."
+        frequence = None
+        if data.get('frequence_appr_id') is not None or data.get('frequence_appr'):
+            frequence = self._lookup(
+                self.frequences, self.frequence_names, data.get('frequence_appr_id'), data.get('frequence_appr')
+            )
+            if frequence is None:
+                errors['frequence_appr_id'] = "Fréquence d'approvisionnement inconnue."
+        supplier = self.shops.get(data['supplier_id'])
+        if supplier is None:
+            errors['supplier_id'] = "Boutique inconnue."
+        return category, frequence, supplier, errors
+
+
+def _summary(results):
+    counts = {'created': 0, 'duplicate': 0, 'error': 0}
+    for row in results:
+        counts[row['status']] += 1
+    return {'created': counts['created'], 'duplicates': counts['duplicate'], 'errors': counts['error'], 'rows': results}
+
+
+def ingest(rows, owner, key=None, chunk_size=None):
+    """
+    Importe `rows` (liste de dicts) pour `owner`. Retourne
+    {'created', 'duplicates', 'errors', 'rows': [{'index', 'status', 'id'|'errors'}], 'replayed'}.
+    """
+    max_rows = getattr(settings, 'COLLECTE_IMPORT_MAX_ROWS', 5000)
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise serializers.ValidationError({'rows': "Liste d'objets attendue."})
+    if len(rows) > max_rows:
+        raise serializers.ValidationError({'rows': f"{max_rows} lignes au maximum par lot."})
+    if key and len(key) > 64:
+        raise serializers.ValidationError({'key': "64 caractères au maximum."})
+    if key:
+        stored = ImportBatch.objects.filter(owner=owner, key=key).values_list('result', flat=True).first()
+        if stored is not None:
+            return {**stored, 'replayed': True}
+
+    maps = ReferenceMaps(rows)
+    results = [None] * len(rows)
+    pending = []  # (index, instance)
+    seen_client_ids = {}
+    for index, row in enumerate(rows):
+        serializer = ProductCollecteRowSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+            continue
+        data = serializer.validated_data
+        category, frequence, supplier, errors = maps.resolve(data)
+        if errors:
+            results[index] = {'index': index, 'status': 'error', 'errors': errors}
+            continue
+        client_id = data.get('client_id') or None
+        if client_id in seen_client_ids:
+            results[index] = {'index': index, 'status': 'duplicate', 'of': seen_client_ids[client_id]}
+            continue
+        if client_id:
+            seen_client_ids[client_id] = index
+        instance = ProductCollecte(
+            owner=owner, name=data['name'], category=category, price=data['price'], stock=data['stock'],
+            min_stock=data['min_stock'], frequence_appr=frequence, reorder_frequency=data['reorder_frequency'], supplier=supplier,
+            client_id=client_id
+        )
+        instance.search_text = instance.search_document()  # bulk_create n'appelle pas save()
+        instance.is_low_stock = instance.stock <= instance.min_stock
+        pending.append((index, instance))
+
+    existing = dict(
+        ProductCollecte.objects.filter(owner=owner, client_id__in=list(seen_client_ids))
+        .values_list('client_id', 'pk')
+    ) if seen_client_ids else {}
+    to_create = []
+    for index, instance in pending:
+        if instance.client_id in existing:
+            results[index] = {'index': index, 'status': 'duplicate', 'id': existing[instance.client_id]}
+        else:
+            to_create.append((index, instance))
+
+    chunk_size = chunk_size or getattr(settings, 'COLLECTE_IMPORT_CHUNK_SIZE', 500)
+    try:
+        with transaction.atomic():
+            for start in range(0, len(to_create), chunk_size):
+                ProductCollecte.objects.bulk_create([instance for _, instance in to_create[start:start + chunk_size]])
+            for index, instance in to_create:
+                results[index] = {'index': index, 'status': 'created', 'id': instance.pk}
+            if to_create:
+                bump_version(ProductCollecte)
+            summary = _summary(results)
+            if key:
+                ImportBatch.objects.create(owner=owner, key=key, result=summary)
+    except IntegrityError:
+        # Lot concurrent portant la même clé ou les mêmes client_id : on rejoue son résultat
+        stored = ImportBatch.objects.filter(owner=owner, key=key).values_list('result', flat=True).first() if key else None
+        if stored is None:
+            raise serializers.ValidationError(
+                {'rows': "Conflit avec un import simultané des mêmes lignes, renvoyer le lot."}
+            )
+        return {**stored, 'replayed': True}
+    return {**summary, 'replayed': False}
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import User
+from shopscollecte.ingest import ingest, read_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un lot de produits collectés depuis un fichier JSON (liste d'objets) ou CSV "
+        "(mêmes colonnes que l'API products-collecte/bulk/). Les lignes invalides sont listées, "
+        "les autres sont importées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .json ou .csv")
+        parser.add_argument('--owner', required=True, help="Email de l'utilisateur propriétaire des lignes")
+        parser.add_argument('--key', help="Clé d'idempotence du lot")
+        parser.add_argument('--chunk-size', type=int, help="Lignes par insertion")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"Utilisateur inconnu : {options['owner']}")
+        try:
+            with path.open(encoding='utf-8-sig', newline='') as f:
+                rows = read_csv(f) if path.suffix.lower() == '.csv' else json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Lecture impossible de {path} : {e}")
+
+        try:
+            result = ingest(rows, owner, key=options['key'], chunk_size=options['chunk_size'])
+        except ValidationError as e:
+            raise CommandError(str(e.detail))
+
+        for row in result['rows']:
+            if row['status'] == 'error':
+                self.stderr.write(f"Ligne {row['index'] + 1} : {json.dumps(row['errors'], ensure_ascii=False)}")
+        if result['replayed']:
+            self.stdout.write("Lot déjà importé avec cette clé, résultat précédent :")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} créées, {result['duplicates']} doublons, {result['errors']} erreurs."
+        ))
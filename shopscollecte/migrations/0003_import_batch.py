@@ -0,0 +1,49 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parametres', '0002_category_image'),
+        ('shops', '0004_shop_search_text'),
+        ('shopscollecte', '0002_productcollecte_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Import de produits collectés',
+                'verbose_name_plural': 'Imports de produits collectés',
+            },
+        ),
+        migrations.AddField(
+            model_name='productcollecte',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='productcollecte',
+            constraint=models.UniqueConstraint(fields=('owner', 'client_id'), name='unique_collecte_owner_client_id'),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collecte_imports', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='importbatch',
+            constraint=models.UniqueConstraint(fields=('owner', 'key'), name='unique_collecte_import_owner_key'),
+        ),
+    ]
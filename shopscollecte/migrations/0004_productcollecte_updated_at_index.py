@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parametres', '0003_updated_at'),
+        ('shops', '0005_shop_updated_at_index'),
+        ('shopscollecte', '0003_import_batch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productcollecte',
+            index=models.Index(fields=['updated_at'], name='shopscollec_updated_359a4d_idx'),
+        ),
+    ]
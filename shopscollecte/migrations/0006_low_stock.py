@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:56
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_low_stock(apps, schema_editor):
+    ProductCollecte = apps.get_model('shopscollecte', 'ProductCollecte')
+    ProductCollecte.objects.filter(stock__lte=F('min_stock')).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parametres', '0004_image_derivatives'),
+        ('shops', '0006_image_derivatives'),
+        ('shopscollecte', '0005_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcollecte',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productcollecte',
+            name='min_stock',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddIndex(
+            model_name='productcollecte',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['supplier'], name='collecte_low_stock'),
+        ),
+        migrations.RunPython(populate_low_stock, migrations.RunPython.noop),
+    ]
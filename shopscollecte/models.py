@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
 from shops.models import Shop
 from parametres.models import Category, FrequenceApprovisionnement
+from superM.search import normalize
+from superM.tracking import saves_any
 
 class ProductCollecte(models.Model):
     owner = models.ForeignKey(User, related_name='shopscollecte', on_delete=models.PROTECT)
@@ -10,7 +12,11 @@ class ProductCollecte(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    image_thumb = models.ImageField(max_length=255, blank=True, null=True, editable=False)  # Dérivés, voir superM.images
+    image_medium = models.ImageField(max_length=255, blank=True, null=True, editable=False)
     stock = models.IntegerField(validators=[MinValueValidator(0)])
+    min_stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    is_low_stock = models.BooleanField(default=False, editable=False)  # = stock <= min_stock
     frequence_appr = models.ForeignKey(FrequenceApprovisionnement, on_delete=models.SET_NULL, null=True, blank=True)
     reorder_frequency = models.IntegerField(
         validators=[MinValueValidator(0), MaxValueValidator(365)],
@@ -19,10 +25,31 @@ class ProductCollecte(models.Model):
     supplier = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_text = models.TextField(blank=True, default='', editable=False)  # Voir superM.search
+    client_id = models.CharField(max_length=64, null=True, blank=True)  # Identifiant attribué par l'appareil de collecte (import par lot)
 
     def __str__(self):
         return self.name
 
+    search_document_fields = ('name', 'category', 'supplier')  # Sources de search_text
+
+    def search_document(self):
+        return normalize(self.name, self.category.name, self.supplier.name)
+
+    def save(self, *args, **kwargs):
+        # Champs calculés enregistrés seulement avec leurs sources (ni requête ni écriture inutiles sinon)
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        if saves_any(update_fields, self.search_document_fields):
+            self.search_text = self.search_document()
+            derived.add('search_text')
+        if saves_any(update_fields, ('stock', 'min_stock')):
+            self.is_low_stock = self.stock <= self.min_stock
+            derived.add('is_low_stock')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | derived
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Produit collecté"
         verbose_name_plural = "Produits collectés"
@@ -31,6 +58,29 @@ class ProductCollecte(models.Model):
             models.Index(fields=['supplier']),
             models.Index(fields=['created_at']),
             models.Index(fields=['category']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['supplier'], condition=models.Q(is_low_stock=True), name='collecte_low_stock'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'client_id'], name='unique_collecte_owner_client_id'),
+        ]
+
+
+class ImportBatch(models.Model):
+    """Résultat d'un import par lot, rejoué tel quel si la même clé d'idempotence est renvoyée."""
+    owner = models.ForeignKey(User, related_name='collecte_imports', on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Import {self.key}"
+
+    class Meta:
+        verbose_name = "Import de produits collectés"
+        verbose_name_plural = "Imports de produits collectés"
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='unique_collecte_import_owner_key'),
         ]
 
 
@@ -30,19 +30,19 @@ class ProductCollecteSerializer(serializers.ModelSerializer):
         model = ProductCollecte
         fields = [
             'id', 'owner', 'name', 'category', 'category_id', 'category_name', 'price', 'image',
-            'stock', 'frequence_appr', 'frequence_appr_id', 'reorder_frequency', 'supplier',
-            'supplier_id', 'supplier_name', 'created_at', 'updated_at'
+            'image_thumb', 'image_medium', 'stock', 'min_stock', 'is_low_stock', 'frequence_appr',
+            'frequence_appr_id', 'reorder_frequency', 'supplier', 'supplier_id', 'supplier_name', 'created_at', 'updated_at'
         ]
         read_only_fields = ['owner', 'created_at', 'updated_at', 'category_name', 'supplier_name']
 
 from rest_framework import serializers
 
 class ProductCollecteStatsSerializer(serializers.Serializer):
-    overview = serializers.DictField()
-    by_owner = serializers.ListField()
-    by_supplier = serializers.ListField()
-    by_category = serializers.ListField()
-    by_frequence_appr = serializers.ListField()
+    overview = serializers.DictField(required=False)
+    by_owner = serializers.ListField(required=False)
+    by_supplier = serializers.ListField(required=False)
+    by_category = serializers.ListField(required=False)
+    by_frequence_appr = serializers.ListField(required=False)
 
     class Meta:
         fields = [
@@ -0,0 +1,121 @@
+"""
+Statistiques des produits collectés (API `stats-collecte/`).
+
+Toutes les sections sont calculées sur la table des produits collectés, une
+ligne par produit : les jointures vers le propriétaire, la boutique, la
+catégorie et la fréquence suivent des clés étrangères et ne multiplient pas
+les lignes, la moyenne de `reorder_frequency` porte donc bien sur les
+produits.
+
+- `overview` : un seul `aggregate()`, avec des agrégats conditionnels
+  (`filter=`) et `Count(distinct=True)`.
+- répartitions : sur PostgreSQL, toutes les répartitions demandées sont
+  calculées par une seule requête `GROUP BY GROUPING SETS` ; ailleurs, une
+  requête `values().annotate()` par répartition.
+"""
+from django.db import connection
+from django.db.models import Avg, Count, F, Q, Sum
+
+from .models import ProductCollecte
+
+# Répartition -> (clé de regroupement, {champ de la réponse: chemin ORM})
+BREAKDOWNS = {
+    'by_owner': ('owner_id', {
+        'username': 'owner__username', 'email': 'owner__email', 'user_type__name': 'owner__user_type__name',
+    }),
+    'by_supplier': ('supplier_id', {
+        'name': 'supplier__name', 'owner__username': 'supplier__owner__username',
+        'typecommerce__name': 'supplier__typecommerce__name',
+    }),
+    'by_category': ('category_id', {'category__name': 'category__name'}),
+    'by_frequence_appr': ('frequence_appr_id', {'frequence_appr__name': 'frequence_appr__name'}),
+}
+WITH_REORDER_FREQUENCY = {'by_owner', 'by_supplier'}
+GROUPING_SETS_VENDORS = {'postgresql'}
+
+
+def overview(start_date):
+    totals = ProductCollecte.objects.aggregate(
+        total_products=Count('id'),
+        recent_products=Count('id', filter=Q(created_at__gte=start_date)),
+        total_stock=Sum('stock'),
+        total_value=Sum(F('stock') * F('price')),
+        total_owners=Count('owner', distinct=True),
+        total_suppliers=Count('supplier', distinct=True),
+    )
+    totals['total_stock'] = totals['total_stock'] or 0
+    totals['total_value'] = float(totals['total_value']) if totals['total_value'] else 0.0
+    return totals
+
+
+def breakdowns(sections):
+    """{répartition: lignes triées par nombre de produits décroissant} pour les répartitions de `sections`."""
+    names = [name for name in BREAKDOWNS if name in sections]
+    if len(names) > 1 and connection.vendor in GROUPING_SETS_VENDORS:
+        return _grouping_sets(names)
+    return {name: _breakdown(name) for name in names}
+
+
+def _breakdown(name):
+    key, labels = BREAKDOWNS[name]
+    metrics = {
+        'total_products': Count('id'),
+        'total_stock': Sum('stock'),
+        'total_value': Sum(F('stock') * F('price')),
+    }
+    if name in WITH_REORDER_FREQUENCY:
+        metrics['avg_reorder_frequency'] = Avg('reorder_frequency')
+    rows = ProductCollecte.objects.values(key, *labels.values()).annotate(**metrics).order_by('-total_products')
+    return [
+        {**{field: row[path] for field, path in labels.items()}, **{metric: row[metric] for metric in metrics}}
+        for row in rows
+    ]
+
+
+def _grouping_sets(names):
+    """Toutes les répartitions `names` en une requête : `GROUPING(clé) = 0` désigne la répartition d'une ligne."""
+    columns = {}  # Chemin ORM -> alias de colonne de la sous-requête
+    for name in names:
+        key, labels = BREAKDOWNS[name]
+        for path in (key, *labels.values()):
+            columns.setdefault(path, f'c{len(columns)}')
+    for path in ('stock', 'price', 'reorder_frequency'):
+        columns.setdefault(path, f'c{len(columns)}')
+    rows_sql, params = ProductCollecte.objects.order_by().values(
+        **{alias: F(path) for path, alias in columns.items()}
+    ).query.sql_with_params()
+
+    qn = connection.ops.quote_name
+    col = {path: qn(alias) for path, alias in columns.items()}
+    groups = [[col[BREAKDOWNS[name][0]], *(col[path] for path in BREAKDOWNS[name][1].values())] for name in names]
+    grouped = [column for group in groups for column in group]
+    sets = ', '.join('(%s)' % ', '.join(group) for group in groups)
+    sql = (
+        f"SELECT {', '.join(f'GROUPING({group[0]})' for group in groups)}, {', '.join(grouped)}, "
+        f"COUNT(*), SUM({col['stock']}), SUM({col['stock']} * {col['price']}), AVG({col['reorder_frequency']}) "
+        f"FROM ({rows_sql}) AS collecte "
+        f"GROUP BY GROUPING SETS ({sets})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    offsets = {}
+    position = len(names)
+    for name, group in zip(names, groups):
+        offsets[name] = position
+        position += len(group)
+    result = {name: [] for name in names}
+    for row in rows:
+        name = names[row[:len(names)].index(0)]
+        labels = BREAKDOWNS[name][1]
+        start = offsets[name] + 1  # Après la clé de regroupement
+        total_products, total_stock, total_value, avg_reorder_frequency = row[position:]
+        entry = dict(zip(labels, row[start:start + len(labels)]))
+        entry.update(total_products=total_products, total_stock=total_stock, total_value=total_value)
+        if name in WITH_REORDER_FREQUENCY:
+            entry['avg_reorder_frequency'] = avg_reorder_frequency
+        result[name].append(entry)
+    for entries in result.values():
+        entries.sort(key=lambda entry: -entry['total_products'])
+    return result
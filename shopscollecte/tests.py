@@ -1,3 +1,176 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from superM.testing import jwt_client, sample_data
+from . import stats
+from .ingest import ingest
+from .models import ProductCollecte
+
+
+def normalized(rows):
+    """Lignes comparables entre moteurs : nombres en float, ordre indépendant des égalités de tri."""
+    rows = [{key: float(value) if isinstance(value, Decimal) else value for key, value in row.items()} for row in rows]
+    return sorted(rows, key=lambda row: sorted(map(str, row.items())))
+
+
+class CollecteStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()  # Stocks 0..4, prix 100..104, une boutique fournisseur par produit
+
+    def test_overview(self):
+        totals = stats.overview(timezone.now() - timedelta(days=1))
+        self.assertEqual(totals, {
+            'total_products': 5, 'recent_products': 5, 'total_stock': 10, 'total_value': 1030.0,
+            'total_owners': 1, 'total_suppliers': 5,
+        })
+        self.assertEqual(stats.overview(timezone.now() + timedelta(days=1))['recent_products'], 0)
+
+    def test_fallback_breakdowns(self):
+        # Une requête par répartition, quel que soit le moteur
+        with mock.patch.object(stats, 'GROUPING_SETS_VENDORS', set()), self.assertNumQueries(2):
+            result = stats.breakdowns({'by_category', 'by_owner'})
+        self.assertEqual(
+            [(row['category__name'], row['total_products'], row['total_stock']) for row in result['by_category']],
+            [('Riz', 3, 6), ('Huile', 2, 4)]
+        )
+        self.assertEqual(normalized(result['by_owner']), [{
+            'username': 'supplier', 'email': 'supplier@x.com', 'user_type__name': 'Fournisseur',
+            'total_products': 5, 'total_stock': 10, 'total_value': 1030.0, 'avg_reorder_frequency': 2.0,
+        }])
+
+    @skipUnless(connection.vendor in stats.GROUPING_SETS_VENDORS, "GROUPING SETS : PostgreSQL seulement")
+    def test_grouping_sets_match_fallback(self):
+        with self.assertNumQueries(1):
+            grouped = stats.breakdowns(set(stats.BREAKDOWNS))
+        for name in stats.BREAKDOWNS:
+            with self.subTest(breakdown=name):
+                self.assertEqual(normalized(grouped[name]), normalized(stats._breakdown(name)))
+                self.assertEqual(
+                    [row['total_products'] for row in grouped[name]],
+                    [row['total_products'] for row in stats._breakdown(name)]
+                )
+
+
+class ProductCollecteSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def test_partial_save_writes_derived_fields_with_their_sources_only(self):
+        product = ProductCollecte.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            product.reorder_frequency = 30
+            product.save(update_fields=['reorder_frequency'])
+        self.assertEqual(len(queries), 1)  # Ni catégorie ni boutique relues pour search_text
+        self.assertNotIn('search_text', queries[0]['sql'])
+        self.assertNotIn('is_low_stock', queries[0]['sql'])
+
+        product.stock = 10
+        product.save(update_fields=['stock'])
+        product.refresh_from_db()
+        self.assertFalse(product.is_low_stock)
+        product.name = 'Sucre'
+        product.save(update_fields=['name'])
+        self.assertIn('sucre', ProductCollecte.objects.values_list('search_text', flat=True).get())
+
+
+class IngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+        cls.shop = cls.data.shops[0]
+
+    def setUp(self):
+        self.client = jwt_client(self.data.admin)
+
+    def row(self, client_id=None, **values):
+        return {
+            'client_id': client_id, 'name': 'Riz 5kg', 'category': 'riz', 'price': '2500', 'stock': 3,
+            'reorder_frequency': 7, 'supplier_id': self.shop.pk, **values
+        }
+
+    def post(self, body, key=None, **kwargs):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(reverse('products-collecte-bulk'), body, **headers, **kwargs)
+
+    def imported(self):
+        return ProductCollecte.objects.filter(owner=self.data.admin)
+
+    def test_idempotency_key_replays_the_result(self):
+        response = self.post([self.row('a'), self.row('b')], key='lot-1', format='json')
+        self.assertEqual(response.status_code, 201)
+        first = response.json()
+        self.assertEqual((first['created'], first['replayed']), (2, False))
+
+        response = self.post([self.row('c')], key='lot-1', format='json')  # Corps ignoré : résultat enregistré
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {**first, 'replayed': True})
+        self.assertEqual(self.imported().count(), 2)
+
+        other = ingest([self.row('a')], self.data.supplier, key='lot-1')  # Clé propre à chaque utilisateur
+        self.assertEqual((other['created'], other['replayed']), (1, False))
+
+    def test_client_id_dedupe_within_and_across_batches(self):
+        result = ingest([self.row('a'), self.row('a', name='Autre'), self.row(), self.row(), self.row('')], self.data.admin)
+        self.assertEqual((result['created'], result['duplicates']), (4, 1))
+        self.assertEqual(result['rows'][1], {'index': 1, 'status': 'duplicate', 'of': 0})
+        first_id = result['rows'][0]['id']
+
+        result = ingest([self.row('b'), self.row('a'), self.row('b')], self.data.admin)
+        self.assertEqual(
+            [row['status'] for row in result['rows']], ['created', 'duplicate', 'duplicate']
+        )
+        self.assertEqual(result['rows'][1]['id'], first_id)
+        self.assertEqual(result['rows'][2]['of'], 0)
+        self.assertEqual(self.imported().count(), 5)
+        self.assertEqual(self.imported().get(client_id='a').name, 'Riz 5kg')
+
+    def test_csv_body(self):
+        body = (
+            '\ufeffclient_id,name,category,price,stock,min_stock,reorder_frequency,supplier_id\n'
+            f'x1, Huile 1L ,HUILE,1200.50,0,,3,{self.shop.pk}\n'
+            f',Sucre,Inconnue,900,4,1,3,{self.shop.pk}\n'
+            f'x2,Riz,riz,800,-1,0,3,{self.shop.pk},colonne en trop\n'
+        )
+        response = self.post(body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        rows = response.json()['rows']
+        self.assertEqual([row['status'] for row in rows], ['created', 'error', 'error'])
+        product = self.imported().get(client_id='x1')
+        self.assertEqual((product.name, product.category.name, product.price), ('Huile 1L', 'Huile', Decimal('1200.50')))
+        self.assertEqual((product.min_stock, product.is_low_stock), (0, True))
+        self.assertIn('huile', product.search_text)
+        self.assertEqual(list(rows[1]['errors']), ['category_id'])
+        self.assertEqual(list(rows[2]['errors']), ['stock'])
+
+        response = self.post(b'\xff\xfe', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+    def test_row_errors_do_not_block_valid_rows(self):
+        rows = [
+            self.row('ok'),
+            self.row('prix', price='-1'),
+            self.row('boutique', supplier_id=0),
+            self.row('freq', frequence_appr='Jamais'),
+            self.row('cat', category=None, category_id=10 ** 6),
+            {'name': 'Incomplet'},
+        ]
+        result = ingest(rows, self.data.admin)
+        self.assertEqual((result['created'], result['errors']), (1, 5))
+        errors = [set(row.get('errors', ())) for row in result['rows']]
+        self.assertEqual(errors[1:5], [{'price'}, {'supplier_id'}, {'frequence_appr_id'}, {'category_id'}])
+        self.assertTrue({'price', 'stock', 'reorder_frequency', 'supplier_id'} <= errors[5])
+        self.assertEqual(list(self.imported().values_list('client_id', flat=True)), ['ok'])
+
+        for body in ({'rows': 'x'}, ['x'], [self.row()] * 3):
+            with self.subTest(body=body), override_settings(COLLECTE_IMPORT_MAX_ROWS=2):
+                self.assertEqual(self.post(body, format='json').status_code, 400)
+        self.assertEqual(self.post([self.row()], key='k' * 65, format='json').status_code, 400)
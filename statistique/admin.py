@@ -1,3 +1,9 @@
 from django.contrib import admin
-
+from .models import *
 # Register your models here.
+
+admin.site.register(SupplierDailyStats)
+admin.site.register(CategoryDailyStats)
+admin.site.register(CommuneDailyStats)
+admin.site.register(StatusDailyStats)
+admin.site.register(ShopDailyStats)
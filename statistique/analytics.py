@@ -0,0 +1,150 @@
+"""
+Analyses stock / commandes des formats de produit, vectorisées avec NumPy.
+
+Les données sont lues en une seule requête `values_list` (une ligne par
+format), converties en tableaux, puis toutes les mesures sont calculées
+sur ces tableaux :
+
+- corrélation de Pearson entre stock et quantités commandées ;
+- élasticité-prix de la demande (pente de log(quantité) sur log(prix)) ;
+- percentiles de couverture de stock, en jours de demande récente ;
+- répartition par catégorie (np.bincount).
+
+Le résultat est mis en cache par périmètre (société ou fournisseur) et par
+version des tables produits / commandes (superM.versions) : une écriture
+invalide le résultat, les lectures suivantes le réutilisent.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product, ProductFormat, Order, OrderItem
+from superM.versions import get_versions
+
+DEMAND_WINDOW_DAYS = 90
+COVER_PERCENTILES = (10, 25, 50, 75, 90)
+DATA_MODELS = (Product, ProductFormat, Order, OrderItem)
+
+
+def fetch_arrays(queryset, window_days=DEMAND_WINDOW_DAYS):
+    """Une ligne par format des produits de `queryset` : stock, prix, catégorie, quantités commandées."""
+    since = timezone.now() - timedelta(days=window_days)
+    rows = list(
+        ProductFormat.objects.filter(product__in=queryset).values_list(
+            'id', 'stock', 'price', 'product__category__name'
+        ).annotate(
+            ordered=Coalesce(Sum('order_items__quantity'), 0),
+            recent=Coalesce(Sum('order_items__quantity', filter=Q(order_items__order__created_at__gte=since)), 0)
+        ).order_by()
+    )
+    if not rows:
+        return None
+    _, stock, price, category, ordered, recent = zip(*rows)
+    return {
+        'stock': np.asarray(stock, dtype=float),
+        'price': np.asarray(price, dtype=float),
+        'category': np.asarray([name or 'Inconnu' for name in category], dtype=object),
+        'ordered': np.asarray(ordered, dtype=float),
+        'recent': np.asarray(recent, dtype=float),
+    }
+
+
+def _rounded(value):
+    return round(float(value), 2) if np.isfinite(value) else None
+
+
+def pearson(x, y):
+    if x.size < 2 or x.std() == 0 or y.std() == 0:
+        return 0.0
+    return round(float(np.corrcoef(x, y)[0, 1]), 2)
+
+
+def price_elasticity(price, quantity):
+    """Pente de la régression log-log quantité / prix, sur les formats vendus."""
+    mask = (price > 0) & (quantity > 0)
+    if mask.sum() < 2:
+        return None
+    log_price, log_quantity = np.log(price[mask]), np.log(quantity[mask])
+    variance = log_price.var()
+    if variance == 0:
+        return None
+    return _rounded(((log_price - log_price.mean()) * (log_quantity - log_quantity.mean())).mean() / variance)
+
+
+def compute(arrays, window_days=DEMAND_WINDOW_DAYS):
+    stock, price, ordered = arrays['stock'], arrays['price'], arrays['ordered']
+    daily_demand = arrays['recent'] / window_days
+    has_demand = daily_demand > 0
+    cover = np.divide(stock, daily_demand, out=np.full_like(stock, np.inf), where=has_demand)
+
+    names, index = np.unique(arrays['category'], return_inverse=True)
+    size = len(names)
+    counts = np.bincount(index, minlength=size)
+    stock_totals = np.bincount(index, weights=stock, minlength=size)
+    ordered_totals = np.bincount(index, weights=ordered, minlength=size)
+    price_totals = np.bincount(index, weights=price, minlength=size)
+    demand_counts = np.bincount(index[has_demand], minlength=size)
+    cover_totals = np.bincount(index[has_demand], weights=cover[has_demand], minlength=size)
+
+    return {
+        'formats': int(stock.size),
+        'stock_order_correlation': pearson(stock, ordered),
+        'price_elasticity': price_elasticity(price, ordered),
+        'stock_cover_days': {
+            'window_days': window_days,
+            'formats_without_demand': int((~has_demand).sum()),
+            'percentiles': {
+                f'p{p}': _rounded(value)
+                for p, value in zip(COVER_PERCENTILES, np.percentile(cover[has_demand], COVER_PERCENTILES))
+            } if has_demand.any() else {f'p{p}': None for p in COVER_PERCENTILES},
+        },
+        'by_category': [
+            {
+                'category': names[i],
+                'formats': int(counts[i]),
+                'total_stock': int(stock_totals[i]),
+                'total_ordered': int(ordered_totals[i]),
+                'avg_price': _rounded(price_totals[i] / counts[i]),
+                'avg_cover_days': _rounded(cover_totals[i] / demand_counts[i]) if demand_counts[i] else None,
+            }
+            for i in np.argsort(-ordered_totals, kind='stable')
+        ],
+    }
+
+
+def empty_result(window_days=DEMAND_WINDOW_DAYS):
+    return {
+        'formats': 0,
+        'stock_order_correlation': 0.0,
+        'price_elasticity': None,
+        'stock_cover_days': {
+            'window_days': window_days,
+            'formats_without_demand': 0,
+            'percentiles': {f'p{p}': None for p in COVER_PERCENTILES},
+        },
+        'by_category': [],
+    }
+
+
+def product_analytics(queryset, scope=None):
+    """
+    Analyses des formats des produits de `queryset`. Avec `scope` (identifiant
+    du périmètre de données du queryset), le résultat est mis en cache.
+    """
+    def build():
+        arrays = fetch_arrays(queryset)
+        return compute(arrays) if arrays is not None else empty_result()
+
+    if scope is None:
+        return build()
+    key = f'statistique:analytics:{scope}:' + '.'.join(map(str, get_versions(DATA_MODELS)))
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 600))
+    return result
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StatistiqueConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'statistique'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,392 @@
+"""
+Moteur des tableaux de bord statistique.
+
+Chaque section calcule ses métriques ensemble : une requête groupée
+(agrégats conditionnels) par table de base, puis les répartitions et totaux
+sont dérivés en Python des mêmes lignes. Le nombre de requêtes d'une section
+est donc fixe, quel que soit le volume de données :
+
+    users 1, shops 3, products 4, products_collecte 3, orders 2, modules 3
+
+Les requêtes ne sont exécutées que pour les métriques demandées (`fields`,
+voir superM.statsfields) : chaque source est une fonction mémorisée,
+partagée par les métriques qui la lisent.
+
+Les analyses NumPy des produits (statistique.analytics) sont mises en cache :
+la 4e requête des produits n'a lieu qu'après une écriture.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import cache
+
+from django.db.models import Count, Sum, Avg, F, Q, Exists, OuterRef
+from django.utils import timezone
+
+from accounts.models import User, ModulePermission
+from shops.models import Shop
+from products.models import Product, ProductFormat, Order, OrderItem
+from shopscollecte.models import ProductCollecte
+from parametres.models import Module
+from superM.statsfields import ALL, select
+from .analytics import product_analytics
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else 0.0
+
+
+def _breakdown(rows, key, label, measure='count'):
+    """Regroupe des lignes sur `key` en [{label: ..., measure: total}], triées par total décroissant."""
+    totals = defaultdict(int)
+    for row in rows:
+        totals[row[key] or 'Inconnu'] += row[measure]
+    return [
+        {label: name, measure: total}
+        for name, total in sorted(totals.items(), key=lambda item: -item[1])
+    ]
+
+
+def user_metrics(queryset=None, fields=ALL):
+    queryset = User.objects.all() if queryset is None else queryset
+    threshold = timezone.now() - timedelta(days=30)
+
+    @cache
+    def rows():
+        return list(
+            queryset.values('user_type__name').annotate(
+                count=Count('id', distinct=True),
+                shops_count=Count('shops'),
+                active=Count('id', distinct=True, filter=(
+                    Q(Exists(Shop.objects.filter(owner=OuterRef('pk'), created_at__gte=threshold)))
+                    | Q(Exists(Product.objects.filter(supplier=OuterRef('pk'), last_order__gte=threshold)))
+                    | Q(Exists(Order.objects.filter(user=OuterRef('pk'), created_at__gte=threshold)))
+                ))
+            ).order_by()
+        )
+
+    def total(measure='count'):
+        return sum(row[measure] for row in rows())
+
+    return select({
+        'total_users': total,
+        'users_by_type': lambda: _breakdown(rows(), 'user_type__name', 'user_type'),
+        'avg_shops_per_user': lambda: round(total('shops_count') / total(), 2) if total() else 0.0,
+        'active_users': lambda: {'active': total('active'), 'inactive': total() - total('active')},
+    }, fields)
+
+
+def shop_metrics(queryset=None, fields=ALL):
+    queryset = Shop.objects.all() if queryset is None else queryset
+
+    @cache
+    def rows():
+        return list(
+            queryset.values('type__name', 'typecommerce__name', 'taille__name').annotate(
+                count=Count('id', distinct=True),
+                products_count=Count('products')
+            ).order_by()
+        )
+
+    def total(measure='count'):
+        return sum(row[measure] for row in rows())
+
+    def avg_revenue():
+        return _round(OrderItem.objects.filter(
+            product_format__product__in=Product.objects.filter(supplier__shops__in=queryset)
+        ).aggregate(avg_revenue=Avg(F('price_at_order') * F('quantity')))['avg_revenue'])
+
+    def low_stock_shops():
+        low_stock = ProductCollecte.objects.filter(
+            supplier__in=queryset, is_low_stock=True
+        ).values('supplier__name').annotate(count=Count('id')).order_by('-count')[:5]
+        return [
+            {'shop': item['supplier__name'], 'low_stock_products': item['count']}
+            for item in low_stock
+        ]
+
+    return select({
+        'total_shops': total,
+        'shops_by_type': lambda: _breakdown(rows(), 'type__name', 'type'),
+        'shops_by_commerce': lambda: _breakdown(rows(), 'typecommerce__name', 'typecommerce'),
+        'shops_by_taille': lambda: _breakdown(rows(), 'taille__name', 'taille'),
+        'avg_products_per_shop': lambda: round(total('products_count') / total(), 2) if total() else 0.0,
+        'avg_revenue_per_shop': avg_revenue,
+        'low_stock_shops': low_stock_shops,
+    }, fields)
+
+
+def product_metrics(queryset=None, scope=None, fields=ALL):
+    queryset = Product.objects.all() if queryset is None else queryset
+
+    @cache
+    def analytics():
+        return product_analytics(queryset, scope)
+
+    @cache
+    def category_rows():
+        return list(
+            queryset.values('category__name', 'category__app').annotate(count=Count('id')).order_by('-count')
+        )
+
+    @cache
+    def formats():
+        # Une ligne par format : stock et prix
+        return list(
+            ProductFormat.objects.filter(product__in=queryset).values(
+                'stock', 'min_stock', 'price', 'product__name', 'taille__name',
+                'couleur__name', 'product__category__name'
+            )
+        )
+
+    def stock_by_format():
+        totals = defaultdict(lambda: {'total_stock': 0, 'min_stock': 0})
+        for row in formats():
+            entry = totals[(row['product__name'], row['taille__name'], row['couleur__name'])]
+            entry['total_stock'] += row['stock']
+            entry['min_stock'] += row['min_stock']
+        return [
+            {
+                'product': product or 'Inconnu',
+                'taille': taille or 'N/A',
+                'couleur': couleur or 'N/A',
+                **entry
+            }
+            for (product, taille, couleur), entry in sorted(totals.items(), key=lambda item: -item[1]['total_stock'])
+        ]
+
+    def avg_price_per_category():
+        prices_by_category = defaultdict(list)
+        for row in formats():
+            prices_by_category[row['product__category__name']].append(row['price'])
+        return sorted([
+            {'category': category or 'Inconnu', 'avg_price': _round(sum(prices) / len(prices))}
+            for category, prices in prices_by_category.items()
+        ], key=lambda item: -item['avg_price'])
+
+    @cache
+    def ordered():
+        # Une ligne par format commandé : quantité et chiffre d'affaires
+        return list(
+            OrderItem.objects.filter(product_format__product__in=queryset).values(
+                'product_format__product__name', 'product_format__taille__name', 'product_format__couleur__name'
+            ).annotate(
+                total_ordered=Sum('quantity'),
+                total_revenue=Sum(F('price_at_order') * F('quantity'))
+            ).order_by()
+        )
+
+    def top_products_ordered():
+        top_ordered = defaultdict(int)
+        for row in ordered():
+            top_ordered[(row['product_format__product__name'], row['product_format__taille__name'],
+                         row['product_format__couleur__name'])] += row['total_ordered']
+        return [
+            {
+                'product': product or 'Inconnu',
+                'taille': taille or 'N/A',
+                'couleur': couleur or 'N/A',
+                'total_ordered': total
+            }
+            for (product, taille, couleur), total in sorted(top_ordered.items(), key=lambda item: -item[1])[:5]
+        ]
+
+    def most_profitable_products():
+        revenue_by_product = defaultdict(int)
+        for row in ordered():
+            revenue_by_product[row['product_format__product__name']] += row['total_revenue']
+        return [
+            {'product': product or 'Inconnu', 'total_revenue': _round(revenue)}
+            for product, revenue in sorted(revenue_by_product.items(), key=lambda item: -item[1])[:5]
+        ]
+
+    return select({
+        'total_products': lambda: sum(row['count'] for row in category_rows()),
+        'products_by_category': lambda: [
+            {
+                'category': row['category__name'] or 'Inconnu',
+                'app': row['category__app'] or 'Inconnu',
+                'count': row['count']
+            }
+            for row in category_rows()
+        ],
+        'total_stock': lambda: sum(row['stock'] for row in formats()),
+        'top_products_ordered': top_products_ordered,
+        'stock_by_format': stock_by_format,
+        'avg_price_per_category': avg_price_per_category,
+        'stock_order_correlation': lambda: analytics()['stock_order_correlation'],
+        'most_profitable_products': most_profitable_products,
+        'analytics': analytics,
+    }, fields)
+
+
+def product_collecte_metrics(queryset=None, fields=ALL):
+    queryset = ProductCollecte.objects.all() if queryset is None else queryset
+
+    @cache
+    def category_rows():
+        return list(
+            queryset.values('category__name').annotate(
+                count=Count('id'), total_stock=Sum('stock'), avg_price=Avg('price')
+            ).order_by('-count')
+        )
+
+    @cache
+    def supplier_rows():
+        return list(
+            queryset.values('supplier__name').annotate(
+                total_stock=Sum('stock'), total_value=Sum(F('price') * F('stock'))
+            ).order_by('-total_stock')
+        )
+
+    def reorder_alerts():
+        alerts = queryset.filter(
+            is_low_stock=True,
+            reorder_frequency__gt=0
+        ).order_by('stock', 'pk').values('name', 'supplier__name', 'stock', 'reorder_frequency')[:5]
+        return [
+            {
+                'product': item['name'],
+                'supplier': item['supplier__name'] or 'Inconnu',
+                'stock': item['stock'],
+                'reorder_frequency': item['reorder_frequency']
+            }
+            for item in alerts
+        ]
+
+    return select({
+        'total_products_collecte': lambda: sum(row['count'] for row in category_rows()),
+        'products_by_category': lambda: [
+            {'category': row['category__name'] or 'Inconnu', 'count': row['count']}
+            for row in category_rows()
+        ],
+        'total_stock': lambda: sum(row['total_stock'] or 0 for row in category_rows()),
+        'avg_price_per_category': lambda: sorted([
+            {'category': row['category__name'] or 'Inconnu', 'avg_price': _round(row['avg_price'])}
+            for row in category_rows()
+        ], key=lambda item: -item['avg_price']),
+        'stock_by_supplier': lambda: [
+            {'supplier': row['supplier__name'] or 'Inconnu', 'total_stock': row['total_stock']}
+            for row in supplier_rows()
+        ],
+        'reorder_alerts': reorder_alerts,
+        'top_suppliers': lambda: [
+            {'supplier': row['supplier__name'] or 'Inconnu', 'total_value': _round(row['total_value'])}
+            for row in sorted(supplier_rows(), key=lambda row: -(row['total_value'] or 0))[:5]
+        ],
+    }, fields)
+
+
+def order_metrics(queryset=None, fields=ALL):
+    queryset = Order.objects.all() if queryset is None else queryset
+
+    @cache
+    def status_rows():
+        return list(queryset.values('status__name').annotate(count=Count('id')).order_by('-count'))
+
+    @cache
+    def user_rows():
+        return list(
+            queryset.values('user__username').annotate(
+                count=Count('id', distinct=True),
+                items_count=Count('items'),
+                total_value=Sum(F('items__price_at_order') * F('items__quantity'))
+            ).order_by('-count')
+        )
+
+    def total():
+        return sum(row['count'] for row in status_rows())
+
+    @cache
+    def by_status():
+        return {row['status__name']: row['count'] for row in status_rows()}
+
+    def total_value():
+        return sum(row['total_value'] or 0 for row in user_rows())
+
+    def avg_order_value():
+        items_count = sum(row['items_count'] for row in user_rows())
+        return _round(total_value() / items_count) if items_count else 0.0
+
+    return select({
+        'total_orders': total,
+        'orders_by_status': lambda: [
+            {'status': row['status__name'] or 'Inconnu', 'count': row['count']}
+            for row in status_rows()
+        ],
+        'total_order_value': lambda: _round(total_value()),
+        'orders_by_user': lambda: [
+            {
+                'user': row['user__username'] or 'Inconnu',
+                'count': row['count'],
+                'total_value': _round(row['total_value'])
+            }
+            for row in user_rows()
+        ],
+        'avg_order_value': avg_order_value,
+        'conversion_rate': lambda: round((by_status().get('Terminé', 0) / total() * 100) if total() else 0.0, 2),
+        'abandoned_orders': lambda: [
+            {'status': name, 'count': by_status()[name]}
+            for name in ['Annulé', 'En attente'] if name in by_status()
+        ],
+    }, fields)
+
+
+def module_metrics(queryset=None, fields=ALL):
+    queryset = Module.objects.all() if queryset is None else queryset
+
+    @cache
+    def modules():
+        return list(
+            queryset.values('name').annotate(
+                permissions_count=Count('module_permissions'),
+                create_count=Count('module_permissions', filter=Q(module_permissions__can_create=True)),
+                read_count=Count('module_permissions', filter=Q(module_permissions__can_read=True)),
+                update_count=Count('module_permissions', filter=Q(module_permissions__can_update=True)),
+                delete_count=Count('module_permissions', filter=Q(module_permissions__can_delete=True))
+            ).order_by('-create_count')
+        )
+
+    def users_by_permission():
+        user_rows = ModulePermission.objects.values('user__username').annotate(
+            modules_count=Count('module'),
+            create_count=Count('id', filter=Q(can_create=True)),
+            read_count=Count('id', filter=Q(can_read=True))
+        ).order_by('-modules_count')
+        return [
+            {
+                'user': row['user__username'] or 'Inconnu',
+                'modules_count': row['modules_count'],
+                'create_count': row['create_count'],
+                'read_count': row['read_count']
+            }
+            for row in user_rows
+        ]
+
+    def permission_usage():
+        total_users = User.objects.count()
+
+        def usage(field):
+            return round(sum(row[field] for row in modules()) / total_users * 100, 2) if total_users else 0.0
+
+        return {
+            'create': usage('create_count'),
+            'read': usage('read_count'),
+            'update': usage('update_count'),
+            'delete': usage('delete_count'),
+        }
+
+    return select({
+        'total_modules': lambda: len(modules()),
+        'permissions_by_module': lambda: [
+            {
+                'module': row['name'] or 'Inconnu',
+                'create_count': row['create_count'],
+                'read_count': row['read_count'],
+                'update_count': row['update_count'],
+                'delete_count': row['delete_count']
+            }
+            for row in modules() if row['permissions_count']
+        ],
+        'users_by_permission': users_by_permission,
+        'permission_usage': permission_usage,
+    }, fields)
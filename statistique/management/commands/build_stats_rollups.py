@@ -0,0 +1,28 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from statistique.rollups import refresh_range, ROLLUP_MODELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit les tables d'agrégats journaliers (fournisseur, catégorie, commune, statut, boutique). "
+        "Sans option, tout l'historique est recalculé ; à relancer après une modification massive "
+        "des fournisseurs, catégories ou sociétés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Première date à recalculer (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Dernière date à recalculer (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f"Date invalide : {e}")
+
+        refresh_range(start, end)
+
+        for model in ROLLUP_MODELS:
+            self.stdout.write(f"{model._meta.verbose_name_plural} : {model.objects.count()} lignes")
+        self.stdout.write(self.style.SUCCESS("Agrégats reconstruits."))
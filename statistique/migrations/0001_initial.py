@@ -0,0 +1,104 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('parametres', '0002_category_image'),
+        ('shops', '0002_shop_commune_shop_quartier_shop_zone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('company_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='parametres.category')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière catégorie',
+                'verbose_name_plural': 'Statistiques journalières catégories',
+                'indexes': [models.Index(fields=['date'], name='statistique_date_5e2b90_idx'), models.Index(fields=['company_name', 'date'], name='statistique_company_649a3e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CommuneDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('company_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('commune', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='parametres.commune')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière commune',
+                'verbose_name_plural': 'Statistiques journalières communes',
+                'indexes': [models.Index(fields=['date'], name='statistique_date_fb747b_idx'), models.Index(fields=['company_name', 'date'], name='statistique_company_525e2d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='shops.shop')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière boutique',
+                'verbose_name_plural': 'Statistiques journalières boutiques',
+                'indexes': [models.Index(fields=['shop', 'date'], name='statistique_shop_id_805ce3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'shop'), name='unique_shop_daily_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatusDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('company_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='parametres.orderstatus')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière statut',
+                'verbose_name_plural': 'Statistiques journalières statuts',
+                'indexes': [models.Index(fields=['date'], name='statistique_date_d4a3c3_idx'), models.Index(fields=['company_name', 'date'], name='statistique_company_e999db_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supplier_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière fournisseur',
+                'verbose_name_plural': 'Statistiques journalières fournisseurs',
+                'indexes': [models.Index(fields=['supplier', 'date'], name='statistique_supplie_10cccb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'supplier'), name='unique_supplier_daily_stats')],
+            },
+        ),
+    ]
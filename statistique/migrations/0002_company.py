@@ -0,0 +1,76 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_company(apps, schema_editor):
+    Company = apps.get_model('accounts', 'Company')
+    for model_name in ['CategoryDailyStats', 'CommuneDailyStats', 'StatusDailyStats']:
+        model = apps.get_model('statistique', model_name)
+        model.objects.update(company_id=Subquery(Company.objects.filter(name=OuterRef('company_name')).values('id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_company_user_company'),
+        ('parametres', '0002_category_image'),
+        ('statistique', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorydailystats',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='communedailystats',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.company'),
+        ),
+        migrations.AddField(
+            model_name='statusdailystats',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.company'),
+        ),
+        migrations.RunPython(populate_company, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='categorydailystats',
+            name='statistique_company_649a3e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='communedailystats',
+            name='statistique_company_525e2d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='statusdailystats',
+            name='statistique_company_e999db_idx',
+        ),
+        migrations.RemoveField(
+            model_name='categorydailystats',
+            name='company_name',
+        ),
+        migrations.RemoveField(
+            model_name='communedailystats',
+            name='company_name',
+        ),
+        migrations.RemoveField(
+            model_name='statusdailystats',
+            name='company_name',
+        ),
+        migrations.AddIndex(
+            model_name='categorydailystats',
+            index=models.Index(fields=['company', 'date'], name='statistique_company_05c4d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communedailystats',
+            index=models.Index(fields=['company', 'date'], name='statistique_company_16c111_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statusdailystats',
+            index=models.Index(fields=['company', 'date'], name='statistique_company_d3dcc2_idx'),
+        ),
+    ]
@@ -1,3 +1,79 @@
 from django.db import models
+from accounts.models import User, Company, TenantQuerySet
+from shops.models import Shop
+from parametres.models import Category, Commune, OrderStatus
 
-# Create your models here.
+class DailyStats(models.Model):
+    """Agrégats journaliers des commandes, reconstruits par statistique.rollups."""
+    date = models.DateField()
+    total_orders = models.PositiveIntegerField(default=0)
+    total_items = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = TenantQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+class SupplierDailyStats(DailyStats):
+    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='supplier_daily_stats')
+
+    tenant_field = 'supplier__company'
+
+    class Meta:
+        verbose_name = "Statistique journalière fournisseur"
+        verbose_name_plural = "Statistiques journalières fournisseurs"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'supplier'], name='unique_supplier_daily_stats')
+        ]
+        indexes = [models.Index(fields=['supplier', 'date'])]
+
+class CategoryDailyStats(DailyStats):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='+')  # Société du fournisseur
+
+    class Meta:
+        verbose_name = "Statistique journalière catégorie"
+        verbose_name_plural = "Statistiques journalières catégories"
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['company', 'date']),
+        ]
+
+class CommuneDailyStats(DailyStats):
+    commune = models.ForeignKey(Commune, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='+')  # Société du client
+
+    class Meta:
+        verbose_name = "Statistique journalière commune"
+        verbose_name_plural = "Statistiques journalières communes"
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['company', 'date']),
+        ]
+
+class StatusDailyStats(DailyStats):
+    status = models.ForeignKey(OrderStatus, on_delete=models.CASCADE, related_name='daily_stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='+')  # Société du client
+
+    class Meta:
+        verbose_name = "Statistique journalière statut"
+        verbose_name_plural = "Statistiques journalières statuts"
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['company', 'date']),
+        ]
+
+class ShopDailyStats(DailyStats):
+    """Ventes journalières des produits du propriétaire de la boutique."""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_stats')
+
+    tenant_field = 'shop__owner__company'
+
+    class Meta:
+        verbose_name = "Statistique journalière boutique"
+        verbose_name_plural = "Statistiques journalières boutiques"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'shop'], name='unique_shop_daily_stats')
+        ]
+        indexes = [models.Index(fields=['shop', 'date'])]
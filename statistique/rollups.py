@@ -0,0 +1,248 @@
+"""
+Tables d'agrégats journaliers (rollups) alimentant les tableaux de bord.
+
+Les faits sont partitionnés par jour de création de la commande : une écriture
+sur une commande ne recalcule que la journée concernée, et la commande
+`build_stats_rollups` reconstruit l'historique complet ou une plage de dates.
+
+Le recalcul d'une journée (ou des ventes d'une boutique créée ou qui change
+de propriétaire) a lieu après le commit, hors de la requête, dans un
+thread unique (ou tout de suite si STATS_ROLLUPS_ASYNC est faux). Un échec
+est journalisé sans jamais faire échouer l'écriture de la commande ; une
+reconstruction concurrente de la même journée (autre processus) est relancée.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Sum, F, OuterRef, Subquery
+from django.db.models.functions import TruncDate, Coalesce
+from django.utils import timezone
+
+from products.models import Order, OrderItem
+from superM.versions import bump_version
+from shops.models import Shop
+from .models import (
+    SupplierDailyStats, CategoryDailyStats, CommuneDailyStats,
+    StatusDailyStats, ShopDailyStats
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MODELS = [SupplierDailyStats, CategoryDailyStats, CommuneDailyStats, StatusDailyStats, ShopDailyStats]
+REFRESH_ATTEMPTS = 3
+
+_pending = threading.local()
+_executor = None
+
+
+def _bounds(start=None, end=None):
+    """Convertit une plage de dates (incluses) en bornes datetime [début, fin[."""
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.combine(start, time.min), tz) if start else None
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz) if end else None
+    return lower, upper
+
+
+def _filter_range(queryset, field, start=None, end=None):
+    lower, upper = _bounds(start, end)
+    if lower:
+        queryset = queryset.filter(**{f'{field}__gte': lower})
+    if upper:
+        queryset = queryset.filter(**{f'{field}__lt': upper})
+    return queryset
+
+
+def _item_facts(start, end, *dimensions):
+    items = _filter_range(OrderItem.objects.all(), 'order__created_at', start, end)
+    return items.annotate(day=TruncDate('order__created_at')).values('day', *dimensions).annotate(
+        total_orders=Count('order', distinct=True),
+        total_items=Sum('quantity'),
+        total_amount=Sum(F('quantity') * F('price_at_order'))
+    ).order_by()
+
+
+def _order_facts(start, end, *dimensions):
+    orders = _filter_range(Order.objects.all(), 'created_at', start, end)
+    return orders.annotate(day=TruncDate('created_at')).values('day', *dimensions).annotate(
+        total_orders=Count('id', distinct=True),
+        total_items=Sum('items__quantity'),
+        total_amount=Sum(F('items__quantity') * F('items__price_at_order'))
+    ).order_by()
+
+
+def _measures(row):
+    return {
+        'date': row['day'],
+        'total_orders': row['total_orders'],
+        'total_items': row['total_items'] or 0,
+        'total_amount': row['total_amount'] or 0,
+    }
+
+
+def refresh_range(start=None, end=None):
+    """
+    Reconstruit toutes les tables d'agrégats sur la plage [start, end]
+    (dates incluses). Sans bornes, l'historique complet est reconstruit.
+    """
+    with transaction.atomic():
+        for model in ROLLUP_MODELS:
+            rows = model.objects.all()
+            if start:
+                rows = rows.filter(date__gte=start)
+            if end:
+                rows = rows.filter(date__lte=end)
+            rows.delete()
+
+        supplier_rows = [
+            SupplierDailyStats(supplier_id=row['product_format__product__supplier_id'], **_measures(row))
+            for row in _item_facts(start, end, 'product_format__product__supplier_id')
+        ]
+        SupplierDailyStats.objects.bulk_create(supplier_rows, batch_size=1000)
+
+        CategoryDailyStats.objects.bulk_create([
+            CategoryDailyStats(
+                category_id=row['product_format__product__category_id'],
+                company_id=row['company_id'],
+                **_measures(row)
+            )
+            for row in _item_facts(start, end, 'product_format__product__category_id', 'company_id')
+        ], batch_size=1000)
+
+        CommuneDailyStats.objects.bulk_create([
+            CommuneDailyStats(commune_id=row['user__commune_id'], company_id=row['company_id'], **_measures(row))
+            for row in _order_facts(start, end, 'user__commune_id', 'company_id')
+        ], batch_size=1000)
+
+        StatusDailyStats.objects.bulk_create([
+            StatusDailyStats(status_id=row['status_id'], company_id=row['company_id'], **_measures(row))
+            for row in _order_facts(start, end, 'status_id', 'company_id')
+        ], batch_size=1000)
+
+        shops_by_owner = {}
+        for shop_id, owner_id in Shop.objects.filter(
+            owner_id__in={row.supplier_id for row in supplier_rows}
+        ).values_list('id', 'owner_id'):
+            shops_by_owner.setdefault(owner_id, []).append(shop_id)
+        ShopDailyStats.objects.bulk_create([
+            ShopDailyStats(
+                shop_id=shop_id, date=row.date, total_orders=row.total_orders,
+                total_items=row.total_items, total_amount=row.total_amount
+            )
+            for row in supplier_rows
+            for shop_id in shops_by_owner.get(row.supplier_id, [])
+        ], batch_size=1000)
+        bump_version(*ROLLUP_MODELS)
+
+
+def refresh_shop(shop_id):
+    """Recopie les ventes du propriétaire sur une boutique (création ou changement de propriétaire)."""
+    with transaction.atomic():
+        ShopDailyStats.objects.filter(shop_id=shop_id).delete()
+        bump_version(ShopDailyStats)
+        owner_id = Shop.objects.filter(pk=shop_id).values_list('owner_id', flat=True).first()
+        if owner_id is None:
+            return
+        ShopDailyStats.objects.bulk_create([
+            ShopDailyStats(shop_id=shop_id, **values)
+            for values in SupplierDailyStats.objects.filter(supplier_id=owner_id).values(
+                'date', 'total_orders', 'total_items', 'total_amount'
+            )
+        ], batch_size=1000)
+
+
+def _pending_set(name):
+    values = getattr(_pending, name, None)
+    if values is None:
+        values = set()
+        setattr(_pending, name, values)
+    return values
+
+
+def schedule_refresh(day=None, order_id=None, shop_id=None):
+    """
+    Marque une journée (ou la journée d'une commande), ou les ventes d'une
+    boutique, comme à recalculer. Le recalcul a lieu une seule fois, après le commit.
+    """
+    if day is not None:
+        _pending_set('days').add(day)
+    if order_id is not None:
+        _pending_set('orders').add(order_id)
+    if shop_id is not None:
+        _pending_set('shops').add(shop_id)
+    transaction.on_commit(flush_pending)
+
+
+def flush_pending():
+    global _executor
+    pending_sets = [_pending_set(name) for name in ('days', 'orders', 'shops')]
+    if not any(pending_sets):
+        return
+    pending = [set(values) for values in pending_sets]
+    for values in pending_sets:
+        values.clear()
+    if not getattr(settings, 'STATS_ROLLUPS_ASYNC', True):
+        refresh_days(*pending)
+        return
+    if _executor is None:
+        # Un seul thread : les recalculs d'un processus ne se concurrencent pas
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stats-rollups')
+    _executor.submit(_run, *pending)
+
+
+def _attempt(subject, refresh, *args):
+    """Appelle `refresh`, relancé si une reconstruction concurrente le fait échouer ; un échec est journalisé."""
+    for attempt in range(1, REFRESH_ATTEMPTS + 1):
+        try:
+            refresh(*args)
+            return
+        except IntegrityError:
+            # Mêmes lignes reconstruites en parallèle : le recalcul complet est idempotent
+            if attempt == REFRESH_ATTEMPTS:
+                logger.exception("Recalcul des agrégats %s impossible", subject)
+        except Exception:
+            logger.exception("Recalcul des agrégats %s impossible", subject)
+            return
+
+
+def refresh_days(days, order_ids=(), shop_ids=()):
+    """
+    Recalcule les journées données, celles des commandes `order_ids` et les
+    ventes des boutiques `shop_ids` ; un échec est journalisé.
+    """
+    try:
+        days = set(days) | {
+            timezone.localtime(created_at).date()
+            for created_at in Order.objects.filter(id__in=order_ids).values_list('created_at', flat=True)
+        }
+    except Exception:
+        logger.exception("Journées des commandes %s introuvables", sorted(order_ids))
+    for day in sorted(days):
+        _attempt(f'du {day}', refresh_range, day, day)
+    for shop_id in sorted(shop_ids):
+        _attempt(f'de la boutique {shop_id}', refresh_shop, shop_id)
+
+
+def _run(days, order_ids, shop_ids):
+    try:
+        refresh_days(days, order_ids, shop_ids)
+    finally:
+        close_old_connections()
+
+
+def rollup_total(model, ref_field, field, outer_ref='pk', default=None, **filters):
+    """
+    Sous-requête sommant `field` d'une table d'agrégats pour la ligne courante,
+    à utiliser dans `annotate()` sans multiplier les lignes par des jointures.
+    """
+    total = Subquery(
+        model.objects.filter(**{ref_field: OuterRef(outer_ref)}, **filters)
+        .values(ref_field).annotate(total=Sum(field)).values('total'),
+        output_field=model._meta.get_field(field)
+    )
+    if default is None:
+        return total
+    return Coalesce(total, default, output_field=model._meta.get_field(field))
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from products.models import Order, OrderItem
+from shops.models import Shop
+from .rollups import schedule_refresh
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    if instance.created_at:
+        schedule_refresh(day=timezone.localtime(instance.created_at).date())
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    schedule_refresh(order_id=instance.order_id)
+
+
+@receiver(post_save, sender=Shop)
+def shop_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Ventes recopiées depuis le propriétaire : seulement à la création ou au changement de propriétaire
+    # (le signal part avant `remember_loaded_values`, `has_changed` compare encore à la valeur lue)
+    owner_saved = update_fields is None or {'owner', 'owner_id'} & set(update_fields)
+    if created or (owner_saved and instance.has_changed('owner_id')):
+        schedule_refresh(shop_id=instance.pk)
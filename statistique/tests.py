@@ -1,3 +1,181 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from parametres.models import Category, OrderStatus, ShopType, UserType
+from products.models import Order, OrderItem, Product, ProductFormat
+from shops.models import Shop
+from superM.testing import jwt_client, sample_data
+from . import analytics, rollups
+from .models import ShopDailyStats, SupplierDailyStats
+from .views import DashboardView, SectionStatsView, ShopStatsView
+
+
+@override_settings(STATS_ROLLUPS_ASYNC=False)
+class RollupRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_type = UserType.objects.create(name='Fournisseur')
+        cls.supplier = User.objects.create_user('s@x.com', 'supplier', 'pw', user_type=user_type, company_name='ACME')
+        product = Product.objects.create(
+            name='Riz', category=Category.objects.create(name='Céréales'), supplier=cls.supplier, last_order=date.today()
+        )
+        cls.product_format = ProductFormat.objects.create(product=product, price=10, stock=100, min_stock=5)
+        cls.status = OrderStatus.objects.create(name='En attente', code='EA')
+
+    def create_order(self):
+        order = Order.objects.create(user=self.supplier, status=self.status)
+        OrderItem.objects.create(order=order, product_format=self.product_format, quantity=2, price_at_order=10)
+        return order
+
+    def test_order_write_refreshes_day_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_order()
+        row = SupplierDailyStats.objects.get(supplier=self.supplier)
+        self.assertEqual((row.total_orders, row.total_items, row.total_amount), (1, 2, 20))
+
+    def test_concurrent_rebuild_is_retried(self):
+        with mock.patch.object(rollups, 'refresh_range', side_effect=[IntegrityError, None]) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_order()
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_rollup_failure_does_not_fail_the_write(self):
+        with mock.patch.object(rollups, 'refresh_range', side_effect=IntegrityError), \
+                self.assertLogs('statistique.rollups', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                order = self.create_order()
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+
+
+    def create_shop(self):
+        return Shop.objects.create(
+            owner=self.supplier, name='Boutique', type=ShopType.objects.create(name='Boutique', code='BO'),
+            address='Rue 1', latitude=5.35, longitude=-4.0, owner_name='Awa', owner_gender='F',
+            owner_phone='0102030405', owner_email='awa@x.com'
+        )
+
+    def test_shop_refreshed_on_create_and_owner_change_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            shop = self.create_shop()
+        self.assertEqual(ShopDailyStats.objects.get(shop=shop).total_amount, 20)
+
+        with mock.patch.object(rollups, 'refresh_shop') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                shop.name = 'Boutique Awa'
+                shop.save()
+                Shop.objects.get(pk=shop.pk).save(update_fields=['name'])
+            refresh.assert_not_called()
+            other = User.objects.create_user('o@x.com', 'other', 'pw', user_type=self.supplier.user_type)
+            with self.captureOnCommitCallbacks(execute=True):
+                shop.owner = other
+                shop.save()
+            refresh.assert_called_once_with(shop.pk)
+
+    def test_shop_refresh_failure_is_logged(self):
+        with mock.patch.object(rollups, 'refresh_shop', side_effect=[IntegrityError, ValueError]) as refresh, \
+                self.assertLogs('statistique.rollups', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                shop = self.create_shop()
+        self.assertEqual(refresh.call_count, 2)
+        self.assertTrue(Shop.objects.filter(pk=shop.pk).exists())
+
+
+@override_settings(STATS_CACHE_ENABLED=False)
+class DashboardTests(TestCase):
+    # Requêtes par section (voir statistique.dashboard) ; analyses des produits recalculées, cache vide
+    expected_queries = {'users': 1, 'shops': 3, 'products': 4, 'products_collecte': 3, 'orders': 2, 'modules': 3}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()
+
+    def test_section_queries(self):
+        self.assertEqual(set(self.expected_queries), set(DashboardView.sections))
+        for name, view in DashboardView.sections.items():
+            with self.subTest(section=name):
+                cache.clear()
+                with self.assertNumQueries(self.expected_queries[name]):
+                    view.get_data(self.data.admin)
+
+    def test_section_queries_do_not_grow_with_rows(self):
+        copies = [Shop(**{
+            field.attname: getattr(self.data.shops[0], field.attname)
+            for field in Shop._meta.concrete_fields if not field.primary_key
+        }) for _ in range(10)]
+        Shop.objects.bulk_create(copies)
+        cache.clear()
+        with self.assertNumQueries(self.expected_queries['shops']):
+            ShopStatsView.get_data(self.data.admin)
+
+    def test_dashboard_is_scoped_to_the_user(self):
+        response = jwt_client(self.data.admin).get(reverse('dashboard'), {'sections': 'shops,modules'})
+        self.assertEqual(set(response.json()), {'shops', 'modules'})
+        self.assertEqual(ShopStatsView.get_queryset(self.data.admin).count(), len(self.data.shops))
+        self.assertEqual(ShopStatsView.get_queryset(self.data.supplier).count(), len(self.data.shops))
+        self.assertEqual(ShopStatsView.get_queryset(User(pk=0, is_staff=False)).count(), 0)
+
+    def test_section_must_declare_its_model(self):
+        with self.assertRaises(ImproperlyConfigured):
+            class IncompleteStatsView(SectionStatsView):
+                serializer_class = ShopStatsView.serializer_class
+
+
+class AnalyticsComputeTests(SimpleTestCase):
+    def arrays(self, stock, price, ordered, recent=None, category=None):
+        return {
+            'stock': np.asarray(stock, dtype=float),
+            'price': np.asarray(price, dtype=float),
+            'category': np.asarray(category or ['Riz'] * len(stock), dtype=object),
+            'ordered': np.asarray(ordered, dtype=float),
+            'recent': np.asarray(recent if recent is not None else ordered, dtype=float),
+        }
+
+    def test_correlation(self):
+        self.assertEqual(analytics.compute(self.arrays([1, 2, 3, 4], [1] * 4, [2, 4, 6, 8]))['stock_order_correlation'], 1.0)
+        self.assertEqual(analytics.compute(self.arrays([1, 2, 3, 4], [1] * 4, [8, 6, 4, 2]))['stock_order_correlation'], -1.0)
+        self.assertEqual(analytics.compute(self.arrays([5, 5, 5], [1] * 3, [1, 2, 3]))['stock_order_correlation'], 0.0)
+
+    def test_price_elasticity(self):
+        price = [1, 2, 4, 8]
+        result = analytics.compute(self.arrays([1] * 4, price, [100 * p ** -2 for p in price]))
+        self.assertEqual(result['price_elasticity'], -2.0)
+        # Un seul format vendu, ou un prix unique : pas de pente
+        self.assertIsNone(analytics.compute(self.arrays([1, 1], [1, 2], [3, 0]))['price_elasticity'])
+        self.assertIsNone(analytics.compute(self.arrays([1, 1], [2, 2], [3, 4]))['price_elasticity'])
+
+    def test_stock_cover_percentiles(self):
+        result = analytics.compute(
+            self.arrays([10, 20, 30, 40, 50, 7], [1] * 6, [0] * 6, recent=[10] * 5 + [0]), window_days=10
+        )
+        cover = result['stock_cover_days']
+        self.assertEqual(cover['formats_without_demand'], 1)
+        self.assertEqual(cover['percentiles'], {'p10': 14.0, 'p25': 20.0, 'p50': 30.0, 'p75': 40.0, 'p90': 46.0})
+
+    def test_by_category(self):
+        result = analytics.compute(self.arrays(
+            [10, 20, 30], [2, 4, 6], [1, 5, 5], recent=[0, 90, 90], category=['Riz', 'Huile', 'Huile']
+        ))
+        self.assertEqual(result['formats'], 3)
+        self.assertEqual(result['by_category'], [
+            {'category': 'Huile', 'formats': 2, 'total_stock': 50, 'total_ordered': 10, 'avg_price': 5.0,
+             'avg_cover_days': 25.0},
+            {'category': 'Riz', 'formats': 1, 'total_stock': 10, 'total_ordered': 1, 'avg_price': 2.0,
+             'avg_cover_days': None},
+        ])
+
+
+class AnalyticsEmptyTests(TestCase):
+    def test_empty_input(self):
+        self.assertIsNone(analytics.fetch_arrays(Product.objects.none()))
+        self.assertEqual(analytics.product_analytics(Product.objects.all()), analytics.empty_result())
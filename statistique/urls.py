@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     UserStatsView, ShopStatsView, ProductStatsView,
-    OrderStatsView, ProductCollecteStatsView, ModuleStatsView
+    OrderStatsView, ProductCollecteStatsView, ModuleStatsView,
+    DashboardView
 )
 
 urlpatterns = [
@@ -11,4 +12,5 @@ urlpatterns = [
     path('products-collecte-stat/', ProductCollecteStatsView.as_view(), name='product-collecte-stats'),
     path('orders-stat/', OrderStatsView.as_view(), name='order-stats'),
     path('modules-stat/', ModuleStatsView.as_view(), name='module-stats'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
 ]
\ No newline at end of file
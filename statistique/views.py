@@ -2,16 +2,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.core.exceptions import ImproperlyConfigured
 from .serializers import (
     UserStatsSerializer, ShopStatsSerializer, ProductStatsSerializer,
     OrderStatsSerializer, ProductCollecteStatsSerializer, ModuleStatsSerializer
 )
-from accounts.models import User
+from accounts.models import User, ModulePermission
 from shops.models import Shop
-from products.models import Product, Order
+from products.models import Product, ProductFormat, Order, OrderItem
 from shopscollecte.models import ProductCollecte
-from parametres.models import Module
-from accounts.models import ModulePermission
+from parametres.models import Module, UserType, ShopType, TypeCommerce, TailleShop, Category, OrderStatus
+from superM.statscache import CachedStatsMixin
+from superM.statsfields import ALL, StatsFieldsMixin
 
 
 class ModulePermissionRequired:
@@ -21,11 +23,8 @@ class ModulePermissionRequired:
         module_name = getattr(view, 'module_name', None)
         if not module_name:
             return False
-        try:
-            permission = ModulePermission.objects.get(user=request.user, module__name=module_name)
-            return permission.can_read
-        except ModulePermission.DoesNotExist:
-            return False
+        permission = request.user.module_permissions.get(module_name)
+        return bool(permission and permission['can_read'])
 
     def has_object_permission(self, request, view, obj):
         # Since views are list-based and don't require object-level checks,
@@ -33,83 +32,133 @@ class ModulePermissionRequired:
         return self.has_permission(request, view)
 
 
-class BaseStatsView(APIView):
+class BaseStatsView(StatsFieldsMixin, CachedStatsMixin, APIView):
     permission_classes = [IsAuthenticated, ModulePermissionRequired]
     module_name = 'Statistiques'
 
+    @classmethod
+    def get_scope(cls, user):
+        """Identifie le périmètre des données de `get_queryset`, pour les caches."""
+        return 'all' if user.is_staff else f'user:{user.pk}'
+
+    def get_cache_scope(self, request):
+        return self.get_scope(request.user)
+
+
+class SectionStatsView(BaseStatsView):
+    """
+    Une section du tableau de bord : les lignes de `model`, restreintes à
+    l'utilisateur par `owner_field` (toutes pour le staff ; sans `owner_field`,
+    les mêmes pour tous). `model` et `serializer_class` sont obligatoires.
+    """
+    model = None
+    owner_field = None
+    serializer_class = None
+    staff_only = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in ('model', 'serializer_class') if getattr(cls, name) is None]
+        if missing:
+            raise ImproperlyConfigured(f"{cls.__name__} doit déclarer {', '.join(missing)}.")
+
+    @classmethod
+    def get_queryset(cls, user):
+        queryset = cls.model.objects.all()
+        if cls.owner_field and not user.is_staff:
+            queryset = queryset.filter(**{cls.owner_field: user.pk})
+        return queryset
+
+    @classmethod
+    def get_data(cls, user, fields=ALL):
+        serializer = cls.serializer_class(
+            cls.get_queryset(user), context={'scope': cls.get_scope(user), 'fields': fields}
+        )
+        return serializer.data
 
-class UserStatsView(BaseStatsView):
     def get(self, request):
+        if self.staff_only and not request.user.is_staff:
+            return Response(
+                {"error": "Only admin users can access module statistics."},
+                status=status.HTTP_403_FORBIDDEN
+            )
         try:
-            queryset = User.objects.all()
-            if not request.user.is_staff:
-                queryset = queryset.filter(id=request.user.id)
-            serializer = UserStatsSerializer(queryset)
-            data = serializer.data
-            return Response(data)
+            return Response(self.get_data(request.user, self.fields))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ShopStatsView(BaseStatsView):
-    def get(self, request):
-        try:
-            queryset = Shop.objects.all()
-            if not request.user.is_staff:
-                queryset = queryset.filter(owner=request.user)
-            serializer = ShopStatsSerializer(queryset)
-            data = serializer.data
-            return Response(data)
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class UserStatsView(SectionStatsView):
+    model = User
+    owner_field = 'pk'
+    serializer_class = UserStatsSerializer
+    cache_models = [User, UserType, Shop, Product, Order]
 
 
-class ProductStatsView(BaseStatsView):
-    def get(self, request):
-        try:
-            queryset = Product.objects.all()
-            if not request.user.is_staff:
-                queryset = queryset.filter(supplier=request.user)
-            serializer = ProductStatsSerializer(queryset)
-            data = serializer.data
-            return Response(data)
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class ShopStatsView(SectionStatsView):
+    model = Shop
+    owner_field = 'owner'
+    serializer_class = ShopStatsSerializer
+    cache_models = [Shop, ShopType, TypeCommerce, TailleShop, Product, OrderItem, ProductCollecte]
 
 
-class ProductCollecteStatsView(BaseStatsView):
-    def get(self, request):
-        try:
-            queryset = ProductCollecte.objects.all()
-            if not request.user.is_staff:
-                queryset = queryset.filter(owner=request.user)
-            serializer = ProductCollecteStatsSerializer(queryset)
-            data = serializer.data
-            return Response(data)
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class ProductStatsView(SectionStatsView):
+    model = Product
+    owner_field = 'supplier'
+    serializer_class = ProductStatsSerializer
+    cache_models = [Product, ProductFormat, OrderItem, Category]
 
 
-class OrderStatsView(BaseStatsView):
-    def get(self, request):
-        try:
-            queryset = Order.objects.all()
-            if not request.user.is_staff:
-                queryset = queryset.filter(user=request.user)
-            serializer = OrderStatsSerializer(queryset)
-            data = serializer.data
-            return Response(data)
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class ProductCollecteStatsView(SectionStatsView):
+    model = ProductCollecte
+    owner_field = 'owner'
+    serializer_class = ProductCollecteStatsSerializer
+    cache_models = [ProductCollecte, Category, Shop]
 
 
-class ModuleStatsView(BaseStatsView):
+class OrderStatsView(SectionStatsView):
+    model = Order
+    owner_field = 'user'
+    serializer_class = OrderStatsSerializer
+    cache_models = [Order, OrderItem, OrderStatus, User]
+
+
+class ModuleStatsView(SectionStatsView):
+    model = Module
+    serializer_class = ModuleStatsSerializer
+    staff_only = True
+    cache_models = [Module, ModulePermission, User]
+
+
+class DashboardView(BaseStatsView):
+    """
+    Toutes les sections en une réponse : `?sections=users,orders` limite le
+    calcul aux sections demandées, `?fields=users.total_users` aux métriques
+    demandées d'une section. Le nombre de requêtes est fixe par section (voir
+    statistique.dashboard).
+    """
+    sections = {
+        'users': UserStatsView,
+        'shops': ShopStatsView,
+        'products': ProductStatsView,
+        'products_collecte': ProductCollecteStatsView,
+        'orders': OrderStatsView,
+        'modules': ModuleStatsView,
+    }
+    cache_models = list(dict.fromkeys(model for view in sections.values() for model in view.cache_models))
+
     def get(self, request):
-        if not request.user.is_staff:
+        names = [name for name in self.sections if name in self.fields]
+        unknown = sorted(self.fields.names() - self.sections.keys())
+        if unknown:
             return Response(
-                {"error": "Only admin users can access module statistics."},
-                status=status.HTTP_403_FORBIDDEN
+                {"error": f"Sections inconnues : {', '.join(unknown)}. Valeurs possibles : {', '.join(self.sections)}."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        serializer = ModuleStatsSerializer(None)
-        data = serializer.data
-        return Response(data)
\ No newline at end of file
+        data = {}
+        for name in names:
+            view = self.sections[name]
+            if view.staff_only and not request.user.is_staff:
+                continue
+            data[name] = view.get_data(request.user, self.fields[name])
+        return Response(data)
@@ -0,0 +1,209 @@
+"""
+Exports en flux (CSV, NDJSON, XLSX).
+
+Les lignes sont lues avec `values_list(...).iterator(chunk_size=...)` :
+curseur côté serveur sur Postgres, sans instancier de modèles ni passer par
+les serializers. Chaque morceau est encodé et envoyé aussitôt par une
+`StreamingHttpResponse` : la mémoire reste constante, quelle que soit la
+taille de l'export.
+
+Le XLSX est écrit sans dépendance : une archive zip en flux (zipfile sur un
+tampon non positionnable) dont la feuille contient des chaînes en ligne.
+
+Dans les tableurs (CSV, XLSX), une chaîne qui commencerait une formule
+(`=`, `+`, `-`, `@`, tabulation, retour chariot) est préfixée d'une apostrophe :
+une valeur saisie par un utilisateur n'est jamais évaluée à l'ouverture.
+"""
+import csv
+import json
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.decorators import action
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_FORMULA_START = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _cell_text(value):
+    """Texte d'une cellule de tableur : une chaîne lue comme une formule est neutralisée."""
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_START):
+        return "'" + text
+    return text
+
+
+class _Buffer:
+    """Tampon d'écriture vidé à chaque morceau envoyé (non positionnable)."""
+    def __init__(self, empty):
+        self.empty = empty
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.empty.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(header, rows, chunk_size):
+    buffer = _Buffer('')
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM : accents lisibles dans Excel
+    writer.writerow([_cell_text(title) for title in header])
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows([_cell_text(value) for value in row] for row in chunk)
+        yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_ndjson(header, rows, chunk_size):
+    def jsonable(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(header, map(jsonable, row))), ensure_ascii=False) + '\n' for row in chunk
+        )
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_INVALID.sub("", _cell_text(value)))}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(header, rows, chunk_size):
+    buffer = _Buffer(b'')
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(header)
+            ).encode())
+            for chunk in _chunks(rows, chunk_size):
+                sheet.write(''.join(_xlsx_row(row) for row in chunk).encode())
+                yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+STREAMS = {'csv': stream_csv, 'ndjson': stream_ndjson, 'xlsx': stream_xlsx}
+
+
+def export_response(queryset, columns, output, filename):
+    """
+    Réponse en flux des `columns` ([(en-tête, chemin de champ), ...]) du
+    queryset, au format `output` (csv, ndjson ou xlsx).
+    """
+    content_type, extension = FORMATS[output]
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    header = [title for title, _ in columns]
+    rows = queryset.prefetch_related(None).values_list(*[path for _, path in columns]).iterator(chunk_size=chunk_size)
+    response = StreamingHttpResponse(STREAMS[output](header, rows, chunk_size), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+class ExportMixin:
+    """
+    Action `export` des vues de liste : `GET <liste>/export/?output=csv|ndjson|xlsx`,
+    avec les mêmes filtres et le même périmètre que la liste. Les colonnes
+    sont déclarées par `export_columns`. (`?format=` est réservé par DRF.)
+    """
+    export_columns = ()
+    export_filename = 'export'
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            raise serializers.ValidationError({'output': f"Valeurs possibles : {', '.join(FORMATS)}."})
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, self.export_columns, output, self.export_filename)
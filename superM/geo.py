@@ -0,0 +1,291 @@
+"""
+Recherche spatiale sans PostGIS.
+
+Chaque ligne porte son geohash (colonne indexée) : les points proches
+partagent un préfixe, donc une zone se filtre par quelques `LIKE 'prefixe%'`
+sur l'index. Le filtre grossier par cellules est complété par un cadre
+latitude/longitude, puis affiné par la distance de haversine calculée en
+SQL (fonctions trigonométriques disponibles sur Postgres et, via Django,
+sur SQLite).
+"""
+import math
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt, Substr
+from rest_framework import serializers
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_RADIUS_KM = 500
+MAX_NEAREST = 100
+MAX_ZOOM = 20
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180  # Même sphère que `haversine`
+GEOHASH_PRECISION = 9  # Cellules d'environ 5 m
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """Dimensions d'une cellule en degrés : (latitude, longitude)."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def cell_min_km(precision, latitude):
+    """Plus petite dimension d'une cellule, en km, à la latitude donnée."""
+    lat_span, lng_span = cell_size(precision)
+    return min(lat_span * KM_PER_DEGREE, lng_span * KM_PER_DEGREE * math.cos(math.radians(latitude)))
+
+
+def neighborhood(latitude, longitude, precision):
+    """La cellule du point et ses 8 voisines (moins près des pôles et de l'antiméridien)."""
+    lat_span, lng_span = cell_size(precision)
+    cells = set()
+    for dlat in (-1, 0, 1):
+        lat = latitude + dlat * lat_span
+        if not -90 <= lat <= 90:
+            continue
+        for dlng in (-1, 0, 1):
+            lng = (longitude + dlng * lng_span + 180) % 360 - 180
+            cells.add(encode_geohash(lat, lng, precision))
+    return cells
+
+
+def precision_for_radius(latitude, radius_km):
+    """
+    Précision la plus fine dont les cellules couvrent le rayon (le voisinage
+    contient alors le cercle). Largeur prise à la latitude la plus éloignée
+    de l'équateur que le cercle atteint : les cellules y sont les plus étroites.
+    """
+    edge = min(abs(latitude) + radius_km / KM_PER_DEGREE, 90)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if cell_min_km(precision, edge) >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, precision):
+    """Cellules de la précision donnée qui recouvrent le cadre (traverse l'antiméridien si min_lng > max_lng)."""
+    if precision == 0:
+        return {''}
+    lat_span, lng_span = cell_size(precision)
+    width = max_lng - min_lng if min_lng <= max_lng else max_lng - min_lng + 360
+    west = min_lng - (min_lng + 180) % lng_span  # Bord ouest de la première cellule
+    cells = set()
+    lat = math.floor(min_lat / lat_span) * lat_span
+    while lat <= max_lat and lat < 90:
+        step = 0.0
+        while west + step <= min_lng + width:
+            lng = (west + step + lng_span / 2 + 180) % 360 - 180
+            cells.add(encode_geohash(lat + lat_span / 2, lng, precision))
+            step += lng_span
+        lat += lat_span
+    return cells
+
+
+def cell_count(min_lat, min_lng, max_lat, max_lng, precision):
+    """Nombre de cellules de `covering_cells`, calculé sans les énumérer."""
+    if precision == 0:
+        return 1
+    lat_span, lng_span = cell_size(precision)
+    width = max_lng - min_lng if min_lng <= max_lng else max_lng - min_lng + 360
+    rows = min(math.floor(max_lat / lat_span), math.ceil(90 / lat_span) - 1) - math.floor(min_lat / lat_span) + 1
+    columns = math.floor((min_lng + width + 180) / lng_span) - math.floor((min_lng + 180) / lng_span) + 1
+    return max(rows, 0) * min(columns, round(360 / lng_span))
+
+
+def tile_precision(min_lat, min_lng, max_lat, max_lng, precision, max_tiles):
+    """Précision la plus fine, au plus `precision`, dont le cadre tient en `max_tiles` cellules."""
+    while precision > 0 and cell_count(min_lat, min_lng, max_lat, max_lng, precision) > max_tiles:
+        precision -= 1
+    return precision
+
+
+def precision_for_zoom(zoom):
+    """Précision dont les cellules font environ le quart d'une tuile de carte au niveau `zoom`."""
+    return min(max(math.ceil(2 * (zoom + 2) / 5), 1), GEOHASH_PRECISION - 1)
+
+
+def cluster_cells(queryset, precision, cells, category, field='geohash'):
+    """
+    Regroupe les lignes des `cells` (préfixes plus courts que `precision`) par
+    cellule de `precision` caractères, en une requête groupée par cellule et
+    catégorie. Retourne {préfixe de `cells`: [grappe, ...]} avec, pour chaque
+    grappe : cellule, nombre de lignes, barycentre et catégorie dominante.
+    """
+    rows = (
+        queryset.filter(in_cells(cells, field))
+        .annotate(cell=Substr(field, 1, precision))
+        .values_list('cell', category)
+        .annotate(count=Count('pk'), lat_sum=Sum('latitude'), lng_sum=Sum('longitude'))
+        .order_by()
+    )
+    grouped = {}
+    for cell, name, count, lat_sum, lng_sum in rows:
+        cluster = grouped.setdefault(cell, {'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0, 'categories': {}})
+        cluster['count'] += count
+        cluster['lat_sum'] += lat_sum
+        cluster['lng_sum'] += lng_sum
+        cluster['categories'][name] = count
+
+    tiles = {cell: [] for cell in cells}
+    prefix_length = len(next(iter(cells), ''))
+    for cell, cluster in sorted(grouped.items()):
+        tiles[cell[:prefix_length]].append({
+            'cell': cell,
+            'count': cluster['count'],
+            'latitude': cluster['lat_sum'] / cluster['count'],
+            'longitude': cluster['lng_sum'] / cluster['count'],
+            'dominant_type': max(cluster['categories'].items(), key=lambda item: (item[1], item[0] or ''))[0],
+        })
+    return tiles
+
+
+def in_cells(cells, field='geohash'):
+    condition = Q()
+    for cell in cells:
+        condition |= Q(**{f'{field}__startswith': cell})
+    return condition
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Cadre qui contient le cercle : toutes les longitudes si le cercle contient
+    un pôle, sinon l'écart de longitude exact sur la sphère, ramené dans
+    [-180, 180] (min_lng > max_lng traverse l'antiméridien).
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angle)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), -180, min(max_lat, 90), 180
+    lng_delta = math.degrees(math.asin(min(math.sin(angle) / math.cos(math.radians(latitude)), 1)))
+    min_lng, max_lng = longitude - lng_delta, longitude + lng_delta
+    return min_lat, min_lng + 360 if min_lng < -180 else min_lng, max_lat, max_lng - 360 if max_lng > 180 else max_lng
+
+
+def filter_bbox(queryset, min_lat, min_lng, max_lat, max_lng, lat_field='latitude', lng_field='longitude'):
+    """Cadre (bornes incluses) ; min_lng > max_lng traverse l'antiméridien."""
+    queryset = queryset.filter(**{f'{lat_field}__gte': min_lat, f'{lat_field}__lte': max_lat})
+    if min_lng <= max_lng:
+        return queryset.filter(**{f'{lng_field}__gte': min_lng, f'{lng_field}__lte': max_lng})
+    return queryset.filter(Q(**{f'{lng_field}__gte': min_lng}) | Q(**{f'{lng_field}__lte': max_lng}))
+
+
+def haversine(latitude, longitude, lat_field='latitude', lng_field='longitude'):
+    """Expression SQL : distance en km entre chaque ligne et le point donné."""
+    lat0, lng0 = math.radians(latitude), math.radians(longitude)
+    dlat = Radians(F(lat_field)) - Value(lat0)
+    dlng = Radians(F(lng_field)) - Value(lng0)
+    a = (
+        Power(Sin(dlat / 2), 2)
+        + Value(math.cos(lat0)) * Cos(Radians(F(lat_field))) * Power(Sin(dlng / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km, field='geohash'):
+    """Lignes à moins de `radius_km` du point, annotées de `distance` (km)."""
+    precision = precision_for_radius(latitude, radius_km)
+    if precision:
+        queryset = queryset.filter(in_cells(neighborhood(latitude, longitude, precision), field))
+    queryset = filter_bbox(queryset, *bounding_box(latitude, longitude, radius_km))
+    return queryset.annotate(distance=haversine(latitude, longitude)).filter(distance__lte=radius_km)
+
+
+def nearest(queryset, latitude, longitude, count, field='geohash'):
+    """
+    Les `count` lignes les plus proches, par distance croissante, annotées de
+    `distance` (km). Le voisinage est élargi précision par précision jusqu'à
+    contenir `count` lignes dont la plus lointaine est plus proche que le bord
+    du voisinage : le résultat est alors exact.
+    """
+    distance = haversine(latitude, longitude)
+    for precision in range(GEOHASH_PRECISION - 2, 0, -1):
+        rows = list(
+            queryset.filter(in_cells(neighborhood(latitude, longitude, precision), field))
+            .annotate(distance=distance).order_by('distance').values_list('pk', 'distance')[:count]
+        )
+        # Bord du voisinage : au moins une cellule, mesurée là où elle est la plus étroite
+        edge = min(abs(latitude) + 2 * cell_size(precision)[0], 90)
+        if len(rows) == count and rows[-1][1] <= cell_min_km(precision, edge):
+            return queryset.filter(pk__in=[pk for pk, _ in rows]).annotate(distance=distance).order_by('distance')
+    pks = queryset.annotate(distance=distance).order_by('distance').values_list('pk', flat=True)[:count]
+    return queryset.filter(pk__in=list(pks)).annotate(distance=distance).order_by('distance')
+
+
+def _float(query_params, name, low, high):
+    try:
+        value = float(query_params[name])
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({name: "Nombre attendu."})
+    if not (low <= value <= high):
+        raise serializers.ValidationError({name: f"Valeur attendue entre {low} et {high}."})
+    return value
+
+
+def parse_bbox(value):
+    """`min_lng,min_lat,max_lng,max_lat` -> (min_lat, min_lng, max_lat, max_lng)."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise serializers.ValidationError({'bbox': "Format attendu : min_lng,min_lat,max_lng,max_lat."})
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise serializers.ValidationError({'bbox': "Coordonnées hors limites."})
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def parse_zoom(query_params):
+    try:
+        zoom = int(query_params.get('zoom', 0))
+    except ValueError:
+        raise serializers.ValidationError({'zoom': "Entier attendu."})
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise serializers.ValidationError({'zoom': f"Valeur attendue entre 0 et {MAX_ZOOM}."})
+    return zoom
+
+
+def filter_location(queryset, query_params):
+    """
+    Filtres de localisation d'une liste :
+    `?bbox=min_lng,min_lat,max_lng,max_lat`, `?lat=&lng=&radius=` (km) ou
+    `?lat=&lng=&nearest=N`. Avec un point, les lignes sont annotées de
+    `distance` et triées par distance croissante.
+    """
+    if query_params.get('bbox'):
+        queryset = filter_bbox(queryset, *parse_bbox(query_params['bbox']))
+    if 'lat' not in query_params and 'lng' not in query_params:
+        return queryset
+    latitude = _float(query_params, 'lat', -90, 90)
+    longitude = _float(query_params, 'lng', -180, 180)
+    if query_params.get('nearest'):
+        try:
+            count = int(query_params['nearest'])
+        except ValueError:
+            raise serializers.ValidationError({'nearest': "Entier attendu."})
+        if not 1 <= count <= MAX_NEAREST:
+            raise serializers.ValidationError({'nearest': f"Valeur attendue entre 1 et {MAX_NEAREST}."})
+        return nearest(queryset, latitude, longitude, count)
+    if query_params.get('radius'):
+        radius = _float(query_params, 'radius', 0, MAX_RADIUS_KM)
+        return within_radius(queryset, latitude, longitude, radius).order_by('distance')
+    return queryset.annotate(distance=haversine(latitude, longitude)).order_by('distance')
@@ -0,0 +1,177 @@
+"""
+Dérivés d'images (vignette et taille moyenne), générés en arrière-plan.
+
+À l'enregistrement d'un modèle suivi (`register`), si son image a changé,
+les dérivés sont calculés après le commit par un pool de threads : l'image
+source est réduite avec Pillow puis enregistrée en WebP (JPEG si Pillow n'a
+pas WebP), et les champs `image_thumb` / `image_medium` sont renseignés par
+un `update()`, sans repasser par `save()`. Une image retirée vide aussi ces
+champs ; les fichiers des dérivés sont supprimés si aucune autre ligne ne
+les référence (source partagée du stockage par contenu).
+
+Le nom d'un dérivé contient le chemin de la source et l'empreinte de son
+contenu : il ne change jamais de contenu, et peut donc être servi avec un
+cache d'un an (`serve_derivative`).
+"""
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import post_save
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from PIL import Image, ImageOps, features
+
+from .versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+SIZES = {'thumb': 200, 'medium': 800}  # Plus grand côté, en pixels
+FAR_FUTURE = 365 * 24 * 3600
+
+_executor = None
+registered = []  # Modèles suivis par `register`
+
+
+def _format():
+    if getattr(settings, 'IMAGE_DERIVATIVE_FORMAT', 'WEBP') == 'WEBP' and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def derivative_prefix(source_name, size):
+    stem = os.path.splitext(source_name)[0]
+    return f'{DERIVATIVES_DIR}/{size}/{stem}-'
+
+
+def is_current(source_name, derivative_name, size):
+    return bool(derivative_name) and derivative_name.startswith(derivative_prefix(source_name, size))
+
+
+def delete_derivatives(storage, source_name):
+    """Supprime les dérivés de toutes tailles d'une image source supprimée."""
+    for size in SIZES:
+        prefix = derivative_prefix(source_name, size)
+        directory, stem = prefix.rsplit('/', 1)
+        try:
+            _, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for name in files:
+            if name.startswith(stem):
+                storage.delete(f'{directory}/{name}')
+
+
+def delete_unreferenced(storage, names):
+    """Supprime les dérivés `names` qu'aucune ligne d'un modèle suivi ne référence plus (source partagée)."""
+    for name in names:
+        if not any(
+            model._base_manager.filter(Q(image_thumb=name) | Q(image_medium=name)).exists() for model in registered
+        ):
+            storage.delete(name)
+
+
+def _touched(model):
+    """`updated_at` mis à jour avec les dérivés : la synchronisation renvoie la ligne."""
+    return {'updated_at': Now()} if any(f.name == 'updated_at' for f in model._meta.fields) else {}
+
+
+def render(image, max_side, image_format):
+    """Copie réduite de `image` (déjà orientée) dans `max_side` pixels, encodée en `image_format`."""
+    copy = image.copy()
+    copy.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == 'JPEG' and copy.mode != 'RGB':
+        copy = copy.convert('RGB')
+    elif copy.mode not in ('RGB', 'RGBA'):
+        copy = copy.convert('RGBA' if 'A' in copy.getbands() or 'transparency' in copy.info else 'RGB')
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        copy.save(buffer, 'WEBP', quality=80, method=4)
+    else:
+        copy.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build_derivatives(model, pk, field='image'):
+    """Calcule et enregistre les dérivés de l'image de la ligne `pk` ; ignore une source remplacée entre-temps."""
+    row = model.objects.filter(pk=pk).values(field).first()
+    source_name = row and row[field]
+    if not source_name:
+        return
+    storage = model._meta.get_field(field).storage
+    with storage.open(source_name, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    image_format, extension = _format()
+
+    image = Image.open(io.BytesIO(content))
+    image.draft('RGB', (SIZES['medium'] * 2, SIZES['medium'] * 2))  # Décodage JPEG réduit
+    image = ImageOps.exif_transpose(image)
+    names = {}
+    for size, max_side in SIZES.items():
+        name = f'{derivative_prefix(source_name, size)}{digest}.{extension}'
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(render(image, max_side, image_format)))
+        names[f'{field}_{size}'] = name
+
+    if model.objects.filter(pk=pk, **{field: source_name}).update(**names, **_touched(model)):
+        bump_version(model)
+
+
+def _run(model, pk, field):
+    try:
+        build_derivatives(model, pk, field)
+    except Exception:
+        logger.exception("Dérivés d'image impossibles pour %s #%s", model._meta.label, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule(model, pk, field='image'):
+    """Calcule les dérivés après le commit, en arrière-plan (ou tout de suite si IMAGE_DERIVATIVES_ASYNC est faux)."""
+    global _executor
+    if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+        transaction.on_commit(lambda: build_derivatives(model, pk, field))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2), thread_name_prefix='image-derivatives'
+        )
+    transaction.on_commit(lambda: _executor.submit(_run, model, pk, field))
+
+
+def _image_saved(sender, instance, **kwargs):
+    source_name = instance.image.name
+    if source_name:
+        if not all(is_current(source_name, getattr(instance, f'image_{size}').name, size) for size in SIZES):
+            schedule(sender, instance.pk)
+    elif instance.image_thumb or instance.image_medium:
+        # Image retirée : dérivés vidés comme à leur génération, fichiers supprimés s'ils ne servent plus
+        stale = [name for name in (instance.image_thumb.name, instance.image_medium.name) if name]
+        sender.objects.filter(pk=instance.pk).update(image_thumb=None, image_medium=None, **_touched(sender))
+        instance.image_thumb = instance.image_medium = None
+        bump_version(sender)
+        storage = sender._meta.get_field('image_thumb').storage
+        transaction.on_commit(lambda: delete_unreferenced(storage, stale))
+
+
+def register(*models):
+    """Génère les dérivés de `image` à chaque enregistrement (champs `image_thumb` et `image_medium` requis)."""
+    for model in models:
+        registered.append(model)
+        post_save.connect(_image_saved, sender=model, dispatch_uid=f'image-derivatives-{model._meta.label_lower}')
+
+
+def serve_derivative(request, path):
+    """Sert un dérivé depuis MEDIA_ROOT avec un cache navigateur / CDN d'un an."""
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR))
+    patch_cache_control(response, public=True, max_age=FAR_FUTURE, immutable=True)
+    return response
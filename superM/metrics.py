@@ -0,0 +1,208 @@
+"""
+Instrumentation des requêtes HTTP.
+
+`InstrumentationMiddleware` mesure pour chaque requête, par vue (nom de
+l'URL résolue) : nombre de requêtes SQL et temps passé en base, temps de
+rendu de la réponse (encodage JSON des réponses DRF), taille de la réponse
+et durée totale.
+
+- En-tête `Server-Timing` (`db`, `render`, `total`, en millisecondes),
+  lisible dans les outils de développement du navigateur.
+- `/metrics` : compteurs cumulés au format texte Prometheus, par processus
+  (chaque worker gunicorn expose les siens). Réservé au collecteur
+  (`Authorization: Bearer <METRICS_TOKEN>`) et aux utilisateurs staff
+  (jeton d'accès ou session) ; refusé à tout autre.
+- Budgets de requêtes : QUERY_BUDGETS = {nom de vue: nombre maximal de
+  requêtes SQL des lectures (GET, HEAD)} ; `'POST nom de vue'` fixe le
+  budget d'une autre méthode. Un dépassement est journalisé et compté ; avec
+  QUERY_BUDGET_STRICT (activé par le lanceur de tests, superM.testing), il
+  lève `QueryBudgetExceeded` et fait échouer le test.
+
+Le contenu d'une réponse en flux (exports) est produit après le passage dans
+le middleware : ses requêtes et sa taille ne sont pas comptées.
+"""
+import hmac
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED = '<non résolue>'
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryTimer:
+    """`execute_wrapper` : nombre de requêtes et temps passé en base."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class Registry:
+    """Compteurs cumulés depuis le démarrage du processus."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = defaultdict(int)  # (vue, méthode, statut) -> nombre
+        self.views = defaultdict(lambda: {
+            'buckets': [0] * len(DURATION_BUCKETS), 'count': 0, 'duration': 0.0,
+            'queries': 0, 'db': 0.0, 'render': 0.0, 'bytes': 0,
+        })  # (vue, méthode) -> cumuls
+        self.budget_exceeded = defaultdict(int)  # vue -> nombre
+
+    def observe(self, view, method, status, duration, queries, db, render, size):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            stats = self.views[(view, method)]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][i] += 1
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['queries'] += queries
+            stats['db'] += db
+            stats['render'] += render
+            stats['bytes'] += size
+
+    def exceeded(self, view):
+        with self.lock:
+            self.budget_exceeded[view] += 1
+
+    def render(self):
+        """Texte d'exposition Prometheus (format 0.0.4)."""
+        with self.lock:
+            requests = sorted(self.requests.items())
+            views = sorted((key, {**stats, 'buckets': list(stats['buckets'])}) for key, stats in self.views.items())
+            exceeded = sorted(self.budget_exceeded.items())
+
+        lines = [
+            '# HELP http_requests_total Requêtes HTTP traitées.',
+            '# TYPE http_requests_total counter',
+        ]
+        lines += [
+            f'http_requests_total{_labels(view=view, method=method, status=status)} {count}'
+            for (view, method, status), count in requests
+        ]
+        lines += [
+            '# HELP http_request_duration_seconds Durée de traitement des requêtes.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), stats in views:
+            for bound, count in zip(DURATION_BUCKETS, stats['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{_labels(view=view, method=method, le=bound)} {count}')
+            lines.append(
+                f'http_request_duration_seconds_bucket{_labels(view=view, method=method, le="+Inf")} {stats["count"]}'
+            )
+            lines.append(f'http_request_duration_seconds_sum{_labels(view=view, method=method)} {stats["duration"]}')
+            lines.append(f'http_request_duration_seconds_count{_labels(view=view, method=method)} {stats["count"]}')
+        for name, key, help_text in (
+            ('http_request_db_queries_total', 'queries', 'Requêtes SQL exécutées.'),
+            ('http_request_db_seconds_total', 'db', 'Temps passé en base.'),
+            ('http_request_render_seconds_total', 'render', 'Temps de rendu des réponses.'),
+            ('http_response_bytes_total', 'bytes', 'Taille cumulée des réponses.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{_labels(view=view, method=method)} {stats[key]}' for (view, method), stats in views]
+        lines += [
+            '# HELP query_budget_exceeded_total Requêtes HTTP au-delà de leur budget de requêtes SQL.',
+            '# TYPE query_budget_exceeded_total counter',
+        ]
+        lines += [f'query_budget_exceeded_total{_labels(view=view)} {count}' for view, count in exceeded]
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = Registry()
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        render_started = getattr(request, '_render_started', None)
+        render = time.perf_counter() - render_started if render_started is not None else 0.0
+        size = 0 if response.streaming else len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED
+
+        registry.observe(view, request.method, response.status_code, duration, timer.count, timer.duration, render, size)
+        response['Server-Timing'] = (
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} SQL", '
+            f'render;dur={render * 1000:.1f}, total;dur={duration * 1000:.1f}'
+        )
+        self.check_budget(view, request, timer.count)
+        return response
+
+    def process_template_response(self, request, response):
+        # Appelé juste avant le rendu (réponses DRF) : la fin du rendu est le retour dans __call__
+        request._render_started = time.perf_counter()
+        return response
+
+    def check_budget(self, view, request, count):
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        budget = budgets.get(f'{request.method} {view}')
+        if budget is None and request.method in ('GET', 'HEAD'):
+            budget = budgets.get(view)
+        if budget is None or count <= budget:
+            return
+        registry.exceeded(view)
+        message = f"{request.method} {request.path} ({view}) : {count} requêtes SQL, budget {budget}"
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning("Budget de requêtes dépassé : %s", message)
+
+
+def _is_staff(request):
+    """Utilisateur staff authentifié comme sur l'API (jeton d'accès ou session)."""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user.is_staff
+    except APIException:
+        return False
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    collector = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not collector and not _is_staff(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,160 @@
+import json
+
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+def clamp_page_size(request, query_param, default, maximum):
+    """Retourne la taille de page demandée, bornée entre 1 et `maximum`."""
+    try:
+        limit = int(request.query_params.get(query_param, default))
+        if limit <= 0:
+            return default
+        return min(limit, maximum)
+    except (ValueError, TypeError):
+        return default
+
+
+class CustomShopPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        return clamp_page_size(request, self.page_size_query_param, self.page_size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'total': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'data': data
+        })
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) : chaque page est lue avec un
+    `WHERE (champ, pk) > (position)` sur des colonnes indexées, sans OFFSET ni
+    COUNT, donc le coût reste constant quelle que soit la profondeur de la page.
+
+    Le curseur porte la valeur de toutes les colonnes du tri, clé primaire
+    comprise : contrairement à `CursorPagination` (première colonne et
+    décalage), les lignes de même valeur ne sont ni sautées ni répétées.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        return clamp_page_size(request, self.page_size_query_param, self.page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Utilise `cursor_ordering` de la vue si défini, sinon le premier champ
+        simple de l'ordre du queryset, complété par la clé primaire pour
+        garantir un ordre total.
+        """
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering is None:
+            ordering = [
+                field for field in queryset.query.order_by
+                if isinstance(field, str) and LOOKUP_SEP not in field and field.lstrip('-') not in ('?', 'pk', 'id')
+            ][:1]
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append('-pk' if descending or not ordering else 'pk')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._after(ordering, current_position))
+
+        # Une ligne de plus pour savoir si une page suit
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = current_position is not None or offset > 0, current_position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = current_position is not None or offset > 0, current_position
+        return self.page
+
+    def _after(self, ordering, position):
+        """Lignes strictement après `position` dans l'ordre `ordering` (comparaison de n-uplets)."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            equal = {previous.lstrip('-'): value for previous, value in zip(ordering[:index], values)}
+            condition |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": values[index]})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [
+            instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            for name in (field.lstrip('-') for field in ordering)
+        ]
+        return json.dumps([str(value) for value in values])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'data': data
+        })
+
+
+class PaginatedListMixin:
+    """
+    `list` commun à tous les BaseViewSet : le queryset filtré n'est sérialisé
+    qu'une seule fois, et seulement la page demandée quand `paginate` est fourni.
+
+    - `?paginate=true`   : pagination par numéro de page (`page`, `limit`, `total`)
+    - `?paginate=cursor` : pagination keyset (`cursor`, `limit`), sans COUNT
+    """
+    pagination_class = CustomShopPagination
+    keyset_pagination_class = KeysetPagination
+
+    def get_list_paginator(self, request):
+        mode = request.query_params.get('paginate')
+        if mode == 'cursor' or (mode == 'true' and self.keyset_pagination_class.cursor_query_param in request.query_params):
+            return self.keyset_pagination_class()
+        if mode == 'true':
+            return self.pagination_class()
+        return None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.get_list_paginator(request)
+
+        if paginator is None:
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
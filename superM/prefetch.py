@@ -0,0 +1,178 @@
+"""
+Préchargement déduit des sérialiseurs.
+
+`plan(serializer_class)` parcourt les champs lus d'un sérialiseur DRF (hors
+`write_only`) et le chemin de leur `source` sur le modèle :
+
+- clé étrangère ou un-à-un -> `select_related` ;
+- relation inverse ou plusieurs-à-plusieurs -> `Prefetch`, dont le queryset
+  suit à son tour le plan du sérialiseur imbriqué (un nombre fixe de
+  requêtes, quelle que soit la profondeur) ;
+- colonnes lues -> `only()`. Un champ qui lit l'objet entier
+  (`SerializerMethodField`, propriété, `__str__`...) garde toutes les
+  colonnes de son modèle.
+
+`PrefetchPlanMixin` applique le plan au queryset filtré des lectures (list,
+retrieve) d'un ModelViewSet. Les `select_related` / `prefetch_related`
+déclarés par la vue sont conservés ; un `Prefetch` explicite de la vue
+l'emporte sur celui du plan.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, SlugRelatedField
+
+WHOLE = None  # Toutes les colonnes d'un modèle
+
+
+class Plan:
+    """Préchargement d'un modèle : chemins `select_related`, `Prefetch` imbriqués et colonnes par niveau."""
+
+    def __init__(self, model):
+        self.model = model
+        self.select = set()
+        self.prefetch = {}  # Chemin -> Plan du modèle lié
+        self.columns = {'': (model, set())}  # Préfixe du niveau -> (modèle, colonnes ou WHOLE)
+
+    def level(self, prefix, model):
+        return self.columns.setdefault(prefix, (model, set()))
+
+    def column(self, prefix, name):
+        model, columns = self.columns[prefix]
+        if columns is not WHOLE:
+            columns.add(name)
+
+    def whole(self, prefix):
+        self.columns[prefix] = (self.columns[prefix][0], WHOLE)
+
+    def only(self, extra=()):
+        fields = set(extra)
+        for prefix, (model, columns) in self.columns.items():
+            names = [f.name for f in model._meta.concrete_fields] if columns is WHOLE else [model._meta.pk.name, *columns]
+            fields.update(prefix + name for name in names)
+        return sorted(fields)
+
+    def prefetches(self):
+        return [
+            Prefetch(path, queryset=child.apply(child.model._default_manager.all()))
+            for path, child in sorted(self.prefetch.items())
+        ]
+
+    def apply(self, queryset, only=True, extra_columns=()):
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        planned = {prefetch.prefetch_to: prefetch for prefetch in self.prefetches()}
+        if planned:
+            existing = queryset._prefetch_related_lookups
+            explicit = {lookup.prefetch_to for lookup in existing if isinstance(lookup, Prefetch)}
+            kept = [lookup for lookup in existing if isinstance(lookup, Prefetch) or lookup not in planned]
+            queryset = queryset.prefetch_related(None).prefetch_related(
+                *(prefetch for path, prefetch in planned.items() if path not in explicit), *kept
+            )
+        if only:
+            extra = list(extra_columns)
+            for path, model in _selected(queryset):
+                if path + '__' not in self.columns:
+                    # `select_related` de la vue hors du plan : modèle lié chargé entier
+                    extra += [path, *(f'{path}__{f.name}' for f in model._meta.concrete_fields)]
+            queryset = queryset.only(*self.only(extra))
+        return queryset
+
+
+def _selected(queryset):
+    """Chemins `select_related` explicites du queryset, avec leur modèle."""
+    def walk(model, tree, prefix):
+        for name, subtree in tree.items():
+            related = model._meta.get_field(name).related_model
+            yield prefix + name, related
+            yield from walk(related, subtree, f'{prefix}{name}__')
+    tree = queryset.query.select_related
+    return list(walk(queryset.model, tree, '')) if isinstance(tree, dict) else []
+
+
+@lru_cache(maxsize=None)
+def plan(serializer_class):
+    serializer = serializer_class()
+    result = Plan(serializer.Meta.model)
+    _walk(serializer, result, '')
+    return result
+
+
+def _walk(serializer, plan, prefix):
+    model = plan.columns[prefix][0]
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, plan, prefix)
+            else:
+                plan.whole(prefix)
+            continue
+        _follow(field, field.source_attrs, model, plan, prefix)
+
+
+def _follow(field, attrs, model, plan, prefix):
+    name, rest = attrs[0], attrs[1:]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        plan.whole(prefix)  # Propriété ou méthode : colonnes lues inconnues
+        return
+    if not model_field.is_relation or (model_field.concrete and name == model_field.attname != model_field.name):
+        plan.column(prefix, model_field.name)  # Colonne, ou identifiant d'une clé étrangère (`product_id`)
+        return
+
+    related = model_field.related_model
+    if model_field.many_to_one or model_field.one_to_one:
+        if model_field.concrete:
+            plan.column(prefix, name)
+            if not rest and isinstance(field, PrimaryKeyRelatedField):
+                return  # Lit seulement la clé étrangère
+        path = prefix + name
+        plan.select.add(path)
+        plan.level(path + '__', related)
+        _read(field, rest, related, plan, path + '__')
+        return
+
+    child = plan.prefetch.setdefault(prefix + name, Plan(related))
+    if model_field.one_to_many:
+        child.column('', model_field.field.name)  # Clé vers le parent, pour répartir les lignes
+    if isinstance(field, ManyRelatedField):
+        field = field.child_relation
+    elif isinstance(field, serializers.ListSerializer):
+        field = field.child
+    _read(field, rest, related, child, '')
+
+
+def _read(field, rest, model, plan, prefix):
+    """Champs lus sur l'objet lié `model` au niveau `prefix`."""
+    if rest:
+        _follow(field, rest, model, plan, prefix)
+    elif isinstance(field, serializers.BaseSerializer):
+        _walk(field, plan, prefix)
+    elif isinstance(field, SlugRelatedField):
+        _follow(field, field.slug_field.split('__'), model, plan, prefix)
+    elif not isinstance(field, PrimaryKeyRelatedField):
+        plan.whole(prefix)
+
+
+class PrefetchPlanMixin:
+    """Applique aux lectures (list, retrieve) le préchargement déduit du sérialiseur (voir `plan`)."""
+    planned_actions = ('list', 'retrieve')
+
+    def plan_queryset(self, queryset, extra_columns=()):
+        # Colonnes de tri du modèle gardées : la pagination par curseur lit leur valeur. Les
+        # annotations (`search_rank` de superM.search) et les chemins liés ne sont pas des colonnes.
+        columns = {field.name for field in queryset.model._meta.concrete_fields}
+        ordering = [name for name in queryset.query.order_by or queryset.model._meta.ordering if isinstance(name, str)]
+        extra = [*extra_columns, *(name.lstrip('-') for name in ordering if name.lstrip('-') in columns)]
+        return plan(self.get_serializer_class()).apply(queryset, extra_columns=extra)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.planned_actions:
+            queryset = self.plan_queryset(queryset)
+        return queryset
@@ -0,0 +1,98 @@
+"""
+Recherche plein texte portable (Postgres et SQLite).
+
+Chaque modèle cherchable porte une colonne `search_text` : ses champs texte
+normalisés par `normalize` (minuscules, sans accents ni ponctuation),
+recalculée à chaque enregistrement. Les termes recherchés sont normalisés de
+la même façon, puis filtrés par `LIKE '%terme%'` sur cette colonne :
+"Boutique Élégance" est trouvée par `elegance`, `ÉLÉG` ou `boutique ele`.
+
+Sur Postgres, un index GIN trigramme (pg_trgm, voir `trigram_index`) sert ces
+filtres, préfixes compris, et la similarité trigramme affine le classement.
+Ailleurs (SQLite, tests), la même requête s'exécute sans index.
+
+Classement : texte identique > début du texte > début de mot > contenu.
+"""
+import re
+import unicodedata
+
+from django.db import connection, migrations
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+MAX_TERMS = 8
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(*values):
+    """Concatène les valeurs, en minuscules, sans accents ni ponctuation."""
+    text = ' '.join(str(value) for value in values if value)
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def search_terms(query):
+    return normalize(query).split()[:MAX_TERMS]
+
+
+def _word_prefix(field, term):
+    return Q(**{f'{field}__startswith': term}) | Q(**{f'{field}__contains': f' {term}'})
+
+
+def search(queryset, query, field='search_text'):
+    """
+    Lignes dont `field` contient tous les termes de `query`, annotées de
+    `search_rank` et triées par pertinence décroissante.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    phrase = ' '.join(terms)
+    condition = Q()
+    for term in terms:
+        condition &= Q(**{f'{field}__contains': term})
+
+    score = Case(
+        When(**{field: phrase}, then=Value(8)),
+        When(**{f'{field}__startswith': phrase}, then=Value(4)),
+        When(_word_prefix(field, phrase), then=Value(2)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    for term in terms:
+        score = score + Case(When(_word_prefix(field, term), then=Value(1)), default=Value(0))
+    rank = Cast(score, FloatField())
+    if connection.vendor == 'postgresql':
+        rank = rank + Func(F(field), Value(phrase), function='similarity', output_field=FloatField())
+    return queryset.filter(condition).annotate(search_rank=rank).order_by('-search_rank', 'pk')
+
+
+class SearchFilter(BaseFilterBackend):
+    """`?search=` sur la colonne `search_text` du modèle de la vue, résultats classés."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search(queryset, query)
+
+
+def trigram_index(table, column='search_text'):
+    """Opération de migration : index GIN trigramme sur Postgres, rien ailleurs."""
+    name = f'{table}_{column}_trgm'
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+    return migrations.RunPython(forwards, backwards)
@@ -46,9 +46,12 @@ INSTALLED_APPS = [
     'shops',
     'shopscollecte',
     'statistique',
+    'sync',
+    'medias',
 ]
 
 MIDDLEWARE = [
+    'superM.metrics.InstrumentationMiddleware',  # En premier : mesure toute la requête
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -144,7 +147,7 @@ REST_FRAMEWORK = {
     #     'rest_framework.authentication.SessionAuthentication',
     # ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # Ajoutez cette ligne
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -169,8 +172,93 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
 
+# Jetons d'accès à revendications signées (type, société, droits par module) :
+# les requêtes en lecture sont autorisées sans lire les tables accounts.
+JWT_CLAIMS_MODE = config('JWT_CLAIMS_MODE', default=False, cast=bool)
+TOKEN_VERSION_CACHE_TIMEOUT = 60  # secondes
+
+# Cache local des utilisateurs authentifiés (rôle, société, droits par module)
+USER_CACHE_MAXSIZE = 1024
+USER_CACHE_TTL = 300  # secondes
+
+# Cache partagé entre processus : Redis si REDIS_URL est défini, sinon mémoire locale
+# (un cache fichier, django.core.cache.backends.filebased.FileBasedCache, convient aussi hors production)
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Cache des réponses des statistiques (superM.statscache) : alias de CACHES, fraîcheur,
+# durée pendant laquelle une réponse périmée reste servie pendant son recalcul, verrou de recalcul
+# et attente du résultat d'un autre processus quand aucune réponse n'est en cache
+STATS_CACHE_ENABLED = True
+STATS_CACHE_ALIAS = 'default'
+STATS_CACHE_TTL = 60  # secondes
+STATS_CACHE_MAX_AGE = 3600  # secondes
+STATS_CACHE_LOCK_TIMEOUT = 30  # secondes
+STATS_CACHE_LOCK_WAIT = 2  # secondes
+# Agrégats journaliers (statistique.rollups) recalculés après le commit en arrière-plan
+STATS_ROLLUPS_ASYNC = True
+
+# Cache des réponses des données de référence (parametres)
+REFERENCE_CACHE_MAXSIZE = 512
+REFERENCE_CACHE_TTL = 300  # secondes
+
+# Durée de vie des analyses produits (statistique.analytics), invalidées par version des données
+ANALYTICS_CACHE_TIMEOUT = 600  # secondes
+
+# Périodes closes des séries temporelles (superM.timeseries)
+TIMESERIES_CACHE_TIMEOUT = 86400  # secondes
+
+# Tuiles de grappes de boutiques pour la carte, invalidées à chaque écriture sur les boutiques
+SHOP_CLUSTER_CACHE_TIMEOUT = 3600  # secondes
+
+# Lignes lues par aller-retour base de données dans les exports en flux (superM.exports)
+EXPORT_CHUNK_SIZE = 2000
+
+# Import par lot des produits collectés (shopscollecte.ingest)
+COLLECTE_IMPORT_MAX_ROWS = 5000
+COLLECTE_IMPORT_CHUNK_SIZE = 500
+
+# Synchronisation incrémentale des appareils (sync) : délai de lecture et conservation des suppressions
+SYNC_LAG_SECONDS = 5
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Dérivés d'images (superM.images) : calcul en arrière-plan, nombre de threads, format (WEBP ou JPEG)
+IMAGE_DERIVATIVES_ASYNC = True
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'
+
+# Instrumentation des requêtes (superM.metrics) : en-tête Server-Timing et /metrics (Prometheus)
+METRICS_ENABLED = True
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Jeton du collecteur ; sans lui, /metrics est réservé au staff
+# Nombre maximal de requêtes SQL des lectures par vue (nom d'URL ; 'POST <nom>' pour une
+# autre méthode). Dépassement : avertissement, ou échec du test sous le lanceur de tests.
+QUERY_BUDGETS = {
+    'user-list': 4,
+    'user-detail': 3,
+    'usertype-list': 4,
+    'module-permission-list': 4,
+    'product-list': 5,
+    'product-detail': 4,
+    'order-list': 5,
+    'order-detail': 4,
+    'order-item-list': 4,
+    'stats-list': 6,
+    'dashboard': 20,
+}
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+TEST_RUNNER = 'superM.testing.QueryBudgetTestRunner'
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -190,6 +278,12 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Médias rangés par empreinte de contenu et dédupliqués (medias.storage)
+STORAGES = {
+    'default': {'BACKEND': 'medias.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
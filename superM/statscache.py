@@ -0,0 +1,118 @@
+"""
+Cache des réponses des statistiques.
+
+Une réponse est mise en cache par point d'accès (chemin), périmètre de
+l'utilisateur (société, ou tout pour un Super_admin) et paramètres de la
+requête. L'entrée garde les versions des tables lues (`cache_models`, voir
+superM.versions) : elle est fraîche tant qu'aucune de ces tables n'a été
+modifiée et qu'elle a moins de STATS_CACHE_TTL secondes.
+
+Une entrée périmée reste servie (stale-while-revalidate) pendant
+STATS_CACHE_MAX_AGE secondes : le premier processus qui la lit prend un
+verrou (`cache.add`, atomique sur Redis) et recalcule la réponse, les autres
+renvoient l'ancienne valeur en attendant. Sans entrée du tout, le même
+verrou évite que chaque processus calcule la réponse en même temps : les
+autres attendent son résultat jusqu'à STATS_CACHE_LOCK_WAIT secondes, puis
+la calculent eux-mêmes. L'en-tête `X-Stats-Cache` indique hit, stale ou miss.
+
+Le cache utilisé est l'alias STATS_CACHE_ALIAS de CACHES : Redis en
+production (REDIS_URL), mémoire locale ou fichiers en développement et en
+test.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .versions import get_versions
+
+
+def stats_cache():
+    return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'default')]
+
+
+def cached_stats_response(key, models, build):
+    """Réponse en cache pour `key` ou construite par `build()` (une Response DRF) ; seuls les 200 sont gardés."""
+    cache = stats_cache()
+    versions = get_versions(models)
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry, versions):
+        return _cached(entry[2], 'hit')
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, getattr(settings, 'STATS_CACHE_LOCK_TIMEOUT', 30))
+    if not locked:
+        # Un autre processus recalcule : ancienne valeur, sinon son résultat après une courte attente
+        if entry is not None:
+            return _cached(entry[2], 'stale')
+        entry = _wait_for(cache, key, versions)
+        if entry is not None:
+            return _cached(entry[2], 'hit')
+
+    try:
+        response = build()
+        if response.status_code == 200:
+            cache.set(key, (versions, time.time(), response.data), getattr(settings, 'STATS_CACHE_MAX_AGE', 3600))
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    response['X-Stats-Cache'] = 'miss'
+    return response
+
+
+def _fresh(entry, versions):
+    entry_versions, created_at, _ = entry
+    return entry_versions == versions and time.time() - created_at < getattr(settings, 'STATS_CACHE_TTL', 60)
+
+
+def _wait_for(cache, key, versions):
+    """Entrée des `versions` courantes écrite par le détenteur du verrou, ou None après STATS_CACHE_LOCK_WAIT secondes."""
+    deadline = time.monotonic() + getattr(settings, 'STATS_CACHE_LOCK_WAIT', 2)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == versions:
+            return entry
+    return None
+
+
+def _cached(data, state):
+    response = Response(data)
+    response['X-Stats-Cache'] = state
+    return response
+
+
+class CachedStatsMixin:
+    """
+    Met en cache les GET d'une vue de statistiques (APIView ou ViewSet),
+    après l'authentification et les permissions. `cache_models` : tables
+    dont dépendent les réponses. `cache_scope` : périmètre des données d'un
+    utilisateur autre que Super_admin, 'user' (ses lignes), 'tenant' (sa
+    société, `for_tenant`) ou 'global' (mêmes données pour tous).
+    """
+    cache_models = ()
+    cache_scope = 'user'
+
+    def get_cache_scope(self, request):
+        user = request.user
+        if self.cache_scope == 'global' or user.is_super_admin:
+            return 'all'
+        if self.cache_scope == 'tenant':
+            return f'company:{user.company_id}'
+        return f'user:{user.pk}'
+
+    def get_cache_key(self, request):
+        params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+        digest = hashlib.sha256(urlencode(params).encode()).hexdigest()[:16]
+        return f'stats:{request.path}:{self.get_cache_scope(request)}:{digest}'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'GET' and self.cache_models and getattr(settings, 'STATS_CACHE_ENABLED', True):
+            handler = self.get
+            self.get = lambda request, *args, **kwargs: cached_stats_response(
+                self.get_cache_key(request), self.cache_models, lambda: handler(request, *args, **kwargs)
+            )
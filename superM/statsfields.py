@@ -0,0 +1,118 @@
+"""
+Champs clairsemés des statistiques (`?fields=`).
+
+`?fields=overview.total_users,by_commune` ne calcule que les métriques
+demandées : chaque métrique est une fonction sans argument, appelée par
+`select` seulement si elle est demandée, et les requêtes partagées par
+plusieurs métriques sont mémorisées (`functools.cache`). Un chemin pointé
+descend dans une section ; un nom seul la prend entière. `?sections=` est
+accepté comme synonyme (tableau de bord, produits collectés).
+
+`StatsFieldsMixin` lit les champs demandés (`self.fields`) et renvoie le
+nombre de requêtes exécutées pour la réponse dans l'en-tête
+`X-Stats-Queries` (0 pour une réponse servie par le cache).
+"""
+from django.db import connection
+from rest_framework import serializers
+
+
+class Fields:
+    """Arbre des champs demandés ; sans chemin, tous les champs sont demandés."""
+
+    def __init__(self, paths=()):
+        self.tree = {}
+        for path in paths:
+            node = self.tree
+            for name in path.split('.'):
+                node = node.setdefault(name, {})
+
+    @classmethod
+    def from_request(cls, request, params=('fields', 'sections')):
+        return cls(
+            path.strip()
+            for param in params
+            for value in request.query_params.getlist(param)
+            for path in value.split(',') if path.strip()
+        )
+
+    def __bool__(self):
+        return bool(self.tree)
+
+    def __contains__(self, name):
+        return not self.tree or name in self.tree
+
+    def __getitem__(self, name):
+        child = Fields()
+        child.tree = self.tree.get(name, {})
+        return child
+
+    def names(self):
+        return set(self.tree)
+
+
+ALL = Fields()
+
+
+def select(metrics, fields=ALL, prefix=''):
+    """
+    {nom: valeur} des métriques demandées. `metrics` : {nom: fonction sans
+    argument, ou dict de métriques pour une section}.
+    """
+    unknown = fields.names() - metrics.keys()
+    if unknown:
+        raise serializers.ValidationError({'fields': (
+            f"Champs inconnus : {', '.join(prefix + name for name in sorted(unknown))}. "
+            f"Valeurs possibles : {', '.join(prefix + name for name in metrics)}."
+        )})
+    return {
+        name: _value(metric, fields[name], f'{prefix}{name}.')
+        for name, metric in metrics.items() if name in fields
+    }
+
+
+def _value(metric, fields, prefix):
+    if isinstance(metric, dict):
+        return select(metric, fields, prefix)
+    value = metric()
+    if fields and isinstance(value, dict):
+        # Sous-champs d'une valeur calculée d'un bloc : la réponse est seulement réduite
+        return select({key: (lambda item=item: item) for key, item in value.items()}, fields, prefix)
+    return value
+
+
+class SparseSerializerMixin:
+    """Sérialiseur réduit aux champs demandés (`context['fields']`, un `Fields`)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class StatsFieldsMixin:
+    """Champs demandés dans `self.fields` ; nombre de requêtes dans `X-Stats-Queries`."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.fields = Fields.from_request(request)
+        if request.method == 'GET':
+            handler = self.get
+
+            def counted(request, *args, **kwargs):
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    response = handler(request, *args, **kwargs)
+                response['X-Stats-Queries'] = str(counter.count)
+                return response
+            self.get = counted
@@ -0,0 +1,105 @@
+"""
+Outils de test : lanceur à budgets de requêtes stricts et jeu de données
+réaliste (plusieurs lignes par liste, relations imbriquées renseignées),
+pour qu'un N+1 se voie dans les nombres de requêtes.
+"""
+import io
+from datetime import date
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test.runner import DiscoverRunner
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Budgets de requêtes stricts pendant les tests : un dépassement fait échouer le test (voir superM.metrics)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+
+
+def sample_data(size=5):
+    """
+    `size` boutiques, produits (deux formats chacun), commandes (deux lignes
+    chacune) et produits collectés ; un super administrateur (`admin`) et
+    un fournisseur (`supplier`) avec des droits par module.
+    """
+    from accounts.models import ModulePermission, User
+    from parametres.models import (
+        Category, Commune, Couleur, Module, OrderStatus, Quartier, ShopType, Taille, TypeCommerce, UserType, Zone
+    )
+    from products.models import Order, OrderItem, Product, ProductFormat
+    from shops.models import Shop
+    from shopscollecte.models import ProductCollecte
+
+    commune = Commune.objects.create(name='Cocody', code='CO')
+    quartier = Quartier.objects.create(name='Angré', commune=commune)
+    zone = Zone.objects.create(name='Nord', commune=commune)
+    super_admin = UserType.objects.create(name='super_admin')
+    supplier_type = UserType.objects.create(name='Fournisseur')
+    admin = User.objects.create_user(
+        'admin@x.com', 'admin', 'pw', user_type=super_admin, is_staff=True, company_name='ACME',
+        commune=commune, quartier=quartier, zone=zone
+    )
+    supplier = User.objects.create_user(
+        'supplier@x.com', 'supplier', 'pw', user_type=supplier_type, company_name='ACME', commune=commune
+    )
+    modules = [Module.objects.create(name=name) for name in ('Shops', 'ProductsCollecte', 'Produits')]
+    for module in modules:
+        ModulePermission.objects.create(user=supplier, module=module, can_read=True)
+
+    categories = [Category.objects.create(name=name) for name in ('Riz', 'Huile')]
+    tailles = [Taille.objects.create(name=name) for name in ('S', 'L')]
+    couleurs = [Couleur.objects.create(name=name) for name in ('Rouge', 'Bleu')]
+    shop_type = ShopType.objects.create(name='Boutique', code='BO')
+    typecommerce = TypeCommerce.objects.create(name='Détail')
+    statuses = [OrderStatus.objects.create(name=name, code=code) for name, code in (('En attente', 'EA'), ('Livrée', 'LI'))]
+
+    shops, products, formats, orders = [], [], [], []
+    for i in range(size):
+        shops.append(Shop.objects.create(
+            owner=supplier, name=f'Boutique {i}', type=shop_type, typecommerce=typecommerce, address='Rue 1',
+            commune=commune, quartier=quartier, zone=zone, latitude=5.35 + i / 100, longitude=-4.0 + i / 100,
+            owner_name='Awa', owner_gender='F', owner_phone='0102030405', owner_email='awa@x.com'
+        ))
+        product = Product.objects.create(
+            name=f'Produit {i}', category=categories[i % 2], supplier=supplier, last_order=date.today()
+        )
+        products.append(product)
+        for j in range(2):
+            formats.append(ProductFormat.objects.create(
+                product=product, taille=tailles[j], couleur=couleurs[j], price=10 + i, stock=100, min_stock=5
+            ))
+        ProductCollecte.objects.create(
+            owner=supplier, name=f'Collecté {i}', category=categories[i % 2], price=100 + i, stock=i,
+            min_stock=2, reorder_frequency=i, supplier=shops[-1]
+        )
+    for i in range(size):
+        order = Order.objects.create(user=supplier, status=statuses[i % 2])
+        orders.append(order)
+        for product_format in formats[2 * i:2 * i + 2]:
+            OrderItem.objects.create(
+                order=order, product_format=product_format, quantity=1 + i, price_at_order=product_format.price
+            )
+    return SimpleNamespace(
+        admin=admin, supplier=supplier, shops=shops, products=products, formats=formats, orders=orders
+    )
+
+
+def png(color):
+    """Petite image PNG unie (contenu identique pour une même couleur)."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='photo.png')
+
+
+def jwt_client(user):
+    """Client authentifié par jeton d'accès, comme les applications."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
@@ -0,0 +1,579 @@
+import csv
+import io
+import json
+import math
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import date, datetime, time as clock, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework import serializers
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.authentication import invalidate_all_users
+from parametres.models import Category
+from products.models import Order, OrderItem, Product
+from shops.models import Shop
+from .exports import stream_csv
+from .geo import (
+    EARTH_RADIUS_KM, KM_PER_DEGREE, MAX_NEAREST, MAX_RADIUS_KM, covering_cells, encode_geohash, filter_bbox, nearest,
+    parse_bbox, within_radius
+)
+from .metrics import QueryBudgetExceeded
+from .pagination import CustomShopPagination, KeysetPagination
+from .statscache import CachedStatsMixin, cached_stats_response
+from .statsfields import Fields, select
+from .testing import jwt_client, png, sample_data
+from .timeseries import bucket_series, parse_series_params
+from .images import SIZES
+from .versions import bump_version, get_versions
+
+
+@override_settings(STATS_CACHE_ENABLED=False)
+class PrefetchPlanTests(TestCase):
+    """Listes des vues réécrites par superM.prefetch : nombre de requêtes fixe, quel que soit le nombre de lignes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.data.admin)  # Sans requête d'authentification
+
+    def add_rows(self):
+        for product_format in self.data.formats:
+            order = Order.objects.create(user=self.data.supplier, status=self.data.orders[0].status)
+            OrderItem.objects.create(order=order, product_format=product_format, quantity=1, price_at_order=1)
+
+    def assertQueries(self, url, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_queries(self):
+        expected = {
+            'product-list': 2,  # Produits, formats
+            'order-list': 2,  # Commandes, lignes (formats, produits, tailles et couleurs joints)
+            'order-item-list': 1,
+            'shop-list': 1,
+            'products-collecte-list': 1,
+            'user-list': 1,
+        }
+        for view, count in expected.items():
+            with self.subTest(view=view):
+                self.assertQueries(reverse(view), count)
+                self.assertQueries(reverse(view) + '?paginate=true', count + 1)  # + COUNT(*)
+        self.add_rows()
+        self.assertQueries(reverse('order-list'), 2)
+
+    def test_detail_queries(self):
+        self.assertQueries(reverse('product-detail', args=[self.data.products[0].pk]), 2)
+        response = self.assertQueries(reverse('order-detail', args=[self.data.orders[0].pk]), 2)
+        self.assertEqual(
+            [item['product_format']['product_name'] for item in response.json()['items']],
+            [self.data.products[0].name] * 2
+        )
+
+    def test_search_through_planner(self):
+        for view, query in (
+            ('product-list', 'produit'), ('shop-list', 'boutique'),
+            ('products-collecte-list', 'collecte'), ('user-list', 'supplier'),
+        ):
+            with self.subTest(view=view):
+                response = self.client.get(reverse(view), {'search': query})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json())
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, STATS_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """Chaque entrée de QUERY_BUDGETS est appelée sur un jeu de données réaliste, budget strict."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()
+
+    def setUp(self):
+        self.client = jwt_client(self.data.admin)
+
+    def get(self, url):
+        # Utilisateur, droits et versions relus : le cas le plus coûteux (première requête d'un processus)
+        cache.clear()
+        invalidate_all_users()
+        return self.client.get(url)
+
+    def urls(self):
+        data = self.data
+        return {
+            'user-list': reverse('user-list'),
+            'user-detail': reverse('user-detail', args=[data.supplier.pk]),
+            'usertype-list': reverse('usertype-list'),
+            'module-permission-list': reverse('module-permission-list'),
+            'product-list': reverse('product-list'),
+            'product-detail': reverse('product-detail', args=[data.products[0].pk]),
+            'order-list': reverse('order-list'),
+            'order-detail': reverse('order-detail', args=[data.orders[0].pk]),
+            'order-item-list': reverse('order-item-list'),
+            'stats-list': reverse('stats-list'),
+            'dashboard': reverse('dashboard'),
+        }
+
+    def test_every_budget_has_an_endpoint(self):
+        self.assertEqual(set(settings.QUERY_BUDGETS), set(self.urls()))
+
+    def test_endpoints_stay_within_budget(self):
+        for view, url in self.urls().items():
+            for query in ('', '?paginate=true'):
+                with self.subTest(view=view, query=query):
+                    response = self.get(url + query)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_exceeded_budget_fails(self):
+        with override_settings(QUERY_BUDGETS={'product-list': 1}), self.assertRaises(QueryBudgetExceeded):
+            self.get(reverse('product-list'))
+
+
+class MetricsAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+
+    def test_denied_by_default(self):
+        self.assertEqual(APIClient().get('/metrics').status_code, 403)
+        self.assertEqual(jwt_client(self.data.supplier).get('/metrics').status_code, 403)
+
+    def test_staff_user(self):
+        self.assertEqual(jwt_client(self.data.admin).get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_collector_token(self):
+        self.assertEqual(APIClient(HTTP_AUTHORIZATION='Bearer s3cret').get('/metrics').status_code, 200)
+        self.assertEqual(APIClient(HTTP_AUTHORIZATION='Bearer wrong').get('/metrics').status_code, 403)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=2)
+        Product.objects.filter(pk=cls.data.products[0].pk).update(name='=HYPERLINK("http://x")')
+        Product.objects.filter(pk=cls.data.products[1].pk).update(name='-2+3')
+
+    def export(self, output):
+        response = jwt_client(self.data.admin).get(reverse('product-export'), {'output': output})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'produits.{output}', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv').decode('utf-8-sig'))))
+        self.assertEqual(rows[0], ['id', 'name', 'category', 'supplier', 'company', 'last_order'])
+        self.assertEqual(sorted(row[1] for row in rows[1:]), ["'-2+3", '\'=HYPERLINK("http://x")'])
+
+    def test_csv_neutralizes_every_formula_start(self):
+        content = ''.join(stream_csv(['@titre'], [(p + 'x',) for p in '=+-@\t\r'] + [(-5,), ('a=b',)], 2))
+        rows = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(rows, [["'@titre"], *([f"'{p}x"] for p in '=+-@\t\r'), ['-5'], ['a=b']])
+
+    def test_ndjson_keeps_values(self):
+        rows = [json.loads(line) for line in self.export('ndjson').decode().splitlines()]
+        self.assertEqual(sorted(row['name'] for row in rows), ['-2+3', '=HYPERLINK("http://x")'])
+        self.assertEqual(set(rows[0]), {'id', 'name', 'category', 'supplier', 'company', 'last_order'})
+
+    def test_xlsx(self):
+        with zipfile.ZipFile(io.BytesIO(self.export('xlsx'))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('[Content_Types].xml', archive.namelist())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">last_order</t>', sheet)
+        self.assertIn('<t xml:space="preserve">\'=HYPERLINK("http://x")</t>', sheet)
+        self.assertIn("'-2+3", sheet)
+
+
+class StatsCacheTests(TestCase):
+    key = 'stats:/api/test/:all:0'
+
+    def setUp(self):
+        cache.clear()
+        self.build = mock.Mock(side_effect=lambda: Response({'total': self.build.call_count}))
+
+    def get(self):
+        response = cached_stats_response(self.key, [Order], self.build)
+        return response['X-Stats-Cache'], response.data
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.get(), ('miss', {'total': 1}))
+        self.assertEqual(self.get(), ('hit', {'total': 1}))
+        self.assertEqual(self.build.call_count, 1)
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+
+    def test_version_change_invalidates(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version(Order)
+        self.assertEqual(self.get(), ('miss', {'total': 2}))
+
+    @override_settings(STATS_CACHE_TTL=0)
+    def test_stale_served_while_another_process_rebuilds(self):
+        self.get()
+        cache.add(f'{self.key}:lock', 1)
+        self.assertEqual(self.get(), ('stale', {'total': 1}))
+        cache.delete(f'{self.key}:lock')
+        self.assertEqual(self.get(), ('miss', {'total': 2}))
+
+    def test_cold_miss_waits_for_the_lock_holder(self):
+        cache.add(f'{self.key}:lock', 1)
+
+        def other_process_done(seconds):
+            cache.set(self.key, (get_versions([Order]), time.time(), {'total': 'autre'}))
+        with mock.patch('superM.statscache.time.sleep', side_effect=other_process_done):
+            self.assertEqual(self.get(), ('hit', {'total': 'autre'}))
+        self.build.assert_not_called()
+
+    @override_settings(STATS_CACHE_LOCK_WAIT=0.1)
+    def test_cold_miss_builds_after_waiting(self):
+        cache.add(f'{self.key}:lock', 1)
+        self.assertEqual(self.get(), ('miss', {'total': 1}))
+        self.assertIsNotNone(cache.get(f'{self.key}:lock'))  # Verrou de l'autre processus laissé en place
+
+    def test_scope_isolation(self):
+        class View(CachedStatsMixin):
+            cache_scope = 'tenant'
+
+        def key(user, query=''):
+            return View().get_cache_key(SimpleNamespace(user=user, path='/api/test/', query_params=QueryDict(query)))
+
+        def user(pk, company_id, super_admin=False):
+            return SimpleNamespace(pk=pk, company_id=company_id, is_super_admin=super_admin)
+
+        self.assertEqual(key(user(1, 10)), key(user(2, 10)))
+        self.assertNotEqual(key(user(1, 10)), key(user(3, 11)))
+        self.assertIn(':all:', key(user(4, 11, super_admin=True)))
+        self.assertNotEqual(key(user(1, 10), 'days=7'), key(user(1, 10), 'days=30'))
+        self.assertEqual(key(user(1, 10), 'a=1&b=2'), key(user(1, 10), 'b=2&a=1'))
+        View.cache_scope = 'user'
+        self.assertNotEqual(key(user(1, 10)), key(user(2, 10)))
+
+
+@override_settings(STATS_CACHE_ENABLED=False)
+class TimeseriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=4)
+        cls.today = timezone.localdate()
+        for shop, days_ago in zip(cls.data.shops, (40, 10, 10, 7)):
+            moment = timezone.make_aware(datetime.combine(cls.today - timedelta(days=days_ago), clock(12)))
+            Shop.objects.filter(pk=shop.pk).update(created_at=moment)
+
+    def test_out_of_range_dates_are_rejected(self):
+        for query in (
+            'end=0001-01-05', 'start=0001-01-01&end=0001-01-05',
+            'start=9999-12-01&end=9999-12-31&granularity=month', 'end=9999-12-31&granularity=year', 'end=2024-13-01',
+        ):
+            with self.subTest(query=query), self.assertRaises(serializers.ValidationError):
+                parse_series_params(QueryDict(query), Shop.objects.all())
+        response = jwt_client(self.data.admin).get(reverse('stats-shops-growth-list'), {'end': '0001-01-05'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end', response.json())
+
+    def test_gaps_are_filled_with_cumulative_totals(self):
+        start, end = self.today - timedelta(days=10), self.today - timedelta(days=6)
+        series = bucket_series(Shop.objects.all(), 'day', start, end)
+        self.assertEqual([row['period'] for row in series], [start + timedelta(days=i) for i in range(5)])
+        self.assertEqual([row['total'] for row in series], [2, 0, 0, 1, 0])
+        self.assertEqual([row['cumulative'] for row in series], [3, 3, 3, 4, 4])  # Une boutique plus ancienne
+
+    def test_closed_periods_are_cached(self):
+        start = self.today - timedelta(days=10)
+        cache.clear()
+        first = bucket_series(Shop.objects.all(), 'day', start, self.today, cache_key='test')
+        with self.assertNumQueries(1):  # Seule la période ouverte (aujourd'hui) est recomptée
+            second = bucket_series(Shop.objects.all(), 'day', start, self.today, cache_key='test')
+        self.assertEqual(first, second)
+        self.assertEqual(second[-1]['cumulative'], 4)
+
+
+@override_settings(IMAGE_DERIVATIVES_ASYNC=False)
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+
+    def create(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name=name, image=png('red'))
+        category.refresh_from_db()
+        return category
+
+    def derivatives(self, category):
+        return [getattr(category, f'image_{size}') for size in SIZES]
+
+    def test_derivatives_generated_after_commit(self):
+        category = self.create('Riz')
+        for derivative in self.derivatives(category):
+            self.assertTrue(derivative.name.startswith('derivatives/'))
+            self.assertTrue(derivative.storage.exists(derivative.name))
+
+    def test_clearing_the_image_clears_derivatives(self):
+        category = self.create('Riz')
+        names = [derivative.name for derivative in self.derivatives(category)]
+        version, updated_at = get_versions([Category]), category.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            category.image = None
+            category.save()
+        category.refresh_from_db()
+        self.assertEqual([derivative.name for derivative in self.derivatives(category)], [None, None])
+        self.assertGreater(category.updated_at, updated_at)
+        self.assertNotEqual(get_versions([Category]), version)
+        self.assertFalse(any(category.image_thumb.storage.exists(name) for name in names))
+
+    def test_shared_derivatives_are_kept(self):
+        first, second = self.create('Riz'), self.create('Huile')
+        names = [derivative.name for derivative in self.derivatives(second)]
+        self.assertEqual(names, [derivative.name for derivative in self.derivatives(first)])
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image = None
+            first.save()
+        self.assertTrue(all(second.image_thumb.storage.exists(name) for name in names))
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=2)
+        category = Category.objects.first()
+        for _ in range(7):  # Plus de doublons que de lignes par page
+            Product.objects.create(name='Riz', category=category, supplier=cls.data.supplier, last_order=date.today())
+
+    def setUp(self):
+        self.client = jwt_client(self.data.admin)
+
+    def pages(self, url):
+        bodies = []
+        while url:
+            bodies.append(self.client.get(url).json())
+            url = bodies[-1]['next']
+        return bodies
+
+    def ids(self, bodies):
+        return [row['id'] for body in bodies for row in body['data']]
+
+    def test_cursor_walks_duplicate_values_once(self):
+        url = reverse('product-list') + '?paginate=cursor&limit=3'
+        bodies = self.pages(url)
+        ids = self.ids(bodies)
+        self.assertEqual(ids, list(Product.objects.order_by('name', 'pk').values_list('pk', flat=True)))
+
+        backwards = [bodies[-1]]
+        while backwards[0]['previous']:
+            backwards.insert(0, self.client.get(backwards[0]['previous']).json())
+        self.assertEqual(self.ids(backwards), ids)
+
+    def test_cursor_on_a_descending_datetime(self):
+        Order.objects.filter(pk__in=[order.pk for order in self.data.orders]).update(created_at=timezone.now())
+        url = reverse('order-list') + '?paginate=cursor&limit=1'
+        ids = self.ids(self.pages(url))
+        self.assertEqual(ids, list(Order.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('product-list'), {'paginate': 'cursor', 'cursor': 'cD1SaXo='})  # p=Riz : ancien curseur
+        self.assertEqual(response.status_code, 404)
+
+    def test_ordering_ends_with_the_primary_key(self):
+        paginator, view = KeysetPagination(), SimpleNamespace()
+        cases = [
+            (Product.objects.order_by('name'), ('name', 'pk')),
+            (Order.objects.order_by('-created_at'), ('-created_at', '-pk')),
+            (Product.objects.order_by('category__name', 'name'), ('name', 'pk')),
+            (Product.objects.order_by('?'), ('-pk',)),
+            (Product.objects.all(), ('-pk',)),  # Plus récentes d'abord
+        ]
+        for queryset, ordering in cases:
+            self.assertEqual(paginator.get_ordering(None, queryset, view), ordering)
+        view.cursor_ordering = ('created_at', 'pk')
+        self.assertEqual(paginator.get_ordering(None, Product.objects.order_by('name'), view), ('created_at', 'pk'))
+
+    def test_page_size_is_clamped(self):
+        for limit, size in (('3', 3), ('0', 10), ('-2', 10), ('x', 10), ('1000', 100), ('', 10)):
+            request = Request(APIRequestFactory().get('/', {'limit': limit}))
+            self.assertEqual(KeysetPagination().get_page_size(request), size)
+            self.assertEqual(CustomShopPagination().get_page_size(request), size)
+
+    def test_list_modes(self):
+        url, count = reverse('product-list'), Product.objects.count()
+        self.assertEqual(len(self.client.get(url).json()), count)
+        page = self.client.get(url, {'paginate': 'true', 'limit': 4}).json()
+        self.assertEqual((page['total'], len(page['data'])), (count, 4))
+        page = self.client.get(url, {'paginate': 'cursor', 'limit': 4}).json()
+        self.assertNotIn('total', page)
+        self.assertEqual(len(page['data']), 4)
+        cursor = parse_qs(urlparse(page['next']).query)['cursor'][0]
+        page = self.client.get(url, {'paginate': 'true', 'cursor': cursor, 'limit': 4}).json()
+        self.assertNotIn('total', page)  # Un curseur garde la pagination keyset
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Haversine en Python, référence des tests de superM.geo."""
+    dlat, dlng = math.radians(lat2 - lat1), math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=1)
+        Shop.objects.all().delete()
+        rng = random.Random(7)
+        points = [(5.3 + rng.uniform(-0.2, 0.2), -4.0 + rng.uniform(-0.2, 0.2)) for _ in range(40)]
+        points += [(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(15)]
+        points += [(0.5, 179.9), (-0.5, -179.9), (0.0, 179.99), (89.95, 10.0), (89.95, -170.0)]
+        cls.points = {cls.place(latitude, longitude).pk: (latitude, longitude) for latitude, longitude in points}
+
+    @classmethod
+    def place(cls, latitude, longitude):
+        return Shop.objects.create(
+            owner=cls.data.supplier, name='Boutique', type=cls.data.shops[0].type,
+            typecommerce=cls.data.shops[0].typecommerce, address='Rue 1', commune=cls.data.shops[0].commune,
+            latitude=latitude, longitude=longitude, owner_name='Awa', owner_gender='F',
+            owner_phone='0102030405', owner_email='awa@x.com'
+        )
+
+    def brute_force(self, latitude, longitude):
+        return sorted(self.points, key=lambda pk: distance_km(latitude, longitude, *self.points[pk]))
+
+    def test_antimeridian_bbox(self):
+        bbox = parse_bbox('170,-10,-170,10')
+        self.assertEqual(bbox, (-10, 170, 10, -170))
+        expected = {
+            pk for pk, (latitude, longitude) in self.points.items()
+            if -10 <= latitude <= 10 and (longitude >= 170 or longitude <= -170)
+        }
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(set(filter_bbox(Shop.objects.all(), *bbox).values_list('pk', flat=True)), expected)
+        for precision in range(1, 4):
+            cells = covering_cells(*bbox, precision)
+            for pk in expected:
+                self.assertTrue(any(encode_geohash(*self.points[pk]).startswith(cell) for cell in cells))
+
+        response = jwt_client(self.data.admin).get(reverse('shop-list'), {'bbox': '170,-10,-170,10'})
+        self.assertEqual({row['id'] for row in response.json()}, expected)
+
+    def test_nearest_matches_brute_force(self):
+        for latitude, longitude in ((5.3, -4.0), (5.45, -3.85), (0.0, -179.95), (89.9, 100.0), (-40.0, 60.0)):
+            for count in (1, 5, 12):
+                with self.subTest(point=(latitude, longitude), count=count):
+                    rows = list(nearest(Shop.objects.all(), latitude, longitude, count).values_list('pk', 'distance'))
+                    self.assertEqual([pk for pk, _ in rows], self.brute_force(latitude, longitude)[:count])
+                    for pk, distance in rows:
+                        self.assertAlmostEqual(distance, distance_km(latitude, longitude, *self.points[pk]), places=6)
+        everything = nearest(Shop.objects.all(), 5.3, -4.0, len(self.points) + 10)
+        self.assertEqual(len(everything), len(self.points))
+
+    def test_radius_matches_brute_force(self):
+        for latitude, longitude in ((5.3, -4.0), (0.0, 179.95), (89.9, 0.0)):
+            for radius in (0.5, 5, 25, 120, MAX_RADIUS_KM):
+                with self.subTest(point=(latitude, longitude), radius=radius):
+                    expected = {
+                        pk for pk, point in self.points.items() if distance_km(latitude, longitude, *point) <= radius
+                    }
+                    rows = within_radius(Shop.objects.all(), latitude, longitude, radius)
+                    self.assertEqual(set(rows.values_list('pk', flat=True)), expected)
+
+    def test_radius_edges(self):
+        latitude, longitude = 10.0, 20.0
+        east = 1 / (KM_PER_DEGREE * math.cos(math.radians(latitude)))  # Environ 1 km en longitude
+        center, inside, outside = (
+            self.place(latitude, longitude), self.place(latitude, longitude + 0.999 * east),
+            self.place(latitude, longitude + 1.02 * east)
+        )
+        self.points.update({shop.pk: (shop.latitude, shop.longitude) for shop in (center, inside, outside)})
+        radius = distance_km(latitude, longitude, inside.latitude, inside.longitude) + 1e-6
+        self.assertLess(radius, distance_km(latitude, longitude, outside.latitude, outside.longitude))
+        rows = within_radius(Shop.objects.all(), latitude, longitude, radius)
+        self.assertEqual(set(rows.values_list('pk', flat=True)), {center.pk, inside.pk})
+        self.assertEqual(
+            list(within_radius(Shop.objects.all(), latitude, longitude, 0).values_list('pk', flat=True)), [center.pk]
+        )
+
+        client = jwt_client(self.data.admin)
+        for params in ({'radius': MAX_RADIUS_KM + 1}, {'radius': -1}, {'nearest': 0}, {'nearest': MAX_NEAREST + 1}):
+            with self.subTest(params=params):
+                response = client.get(reverse('shop-list'), {'lat': latitude, 'lng': longitude, **params})
+                self.assertEqual(response.status_code, 400)
+        response = client.get(reverse('shop-list'), {'lat': latitude, 'lng': longitude, 'radius': radius})
+        self.assertEqual([row['id'] for row in response.json()], [center.pk, inside.pk])
+
+
+@override_settings(STATS_CACHE_ENABLED=False)
+class StatsFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data(size=2)
+
+    def setUp(self):
+        self.client = jwt_client(self.data.admin)
+
+    def get(self, **params):
+        return self.client.get(reverse('stats-list'), params)
+
+    def queries(self, response):
+        self.assertEqual(response.status_code, 200)
+        return int(response['X-Stats-Queries'])
+
+    def test_fields_prune_queries(self):
+        full = self.get()
+        self.assertEqual(set(full.json()), {'overview', 'by_user_type', 'by_commune', 'by_commerce_type'})
+        self.assertEqual(self.queries(full), 4)
+
+        response = self.get(fields='overview.total_users,overview.activity_rate')
+        self.assertEqual(response.json(), {'overview': {
+            'total_users': full.json()['overview']['total_users'],
+            'activity_rate': full.json()['overview']['activity_rate'],
+        }})
+        self.assertEqual(self.queries(response), 1)  # Agrégat partagé calculé une fois
+
+        response = self.get(sections='by_commune')
+        self.assertEqual(response.json(), {'by_commune': full.json()['by_commune']})
+        self.assertEqual(self.queries(response), 1)
+        self.assertEqual(self.queries(self.get(fields='overview.timeframe_days')), 0)
+
+    def test_unknown_fields_are_rejected(self):
+        for fields, unknown in (('nope', 'nope'), ('overview.nope,by_commune', 'overview.nope')):
+            with self.subTest(fields=fields):
+                response = self.get(fields=fields)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(f'Champs inconnus : {unknown}.', response.json()['fields'])
+
+    def test_subfields_of_a_computed_block(self):
+        metrics = {'block': lambda: {'a': 1, 'b': 2}, 'other': lambda: self.fail('non demandé')}
+        self.assertEqual(select(metrics, Fields(['block.a'])), {'block': {'a': 1}})
+        with self.assertRaises(serializers.ValidationError):
+            select(metrics, Fields(['block.c']))
+
+    @override_settings(STATS_CACHE_ENABLED=True)
+    def test_cached_response_runs_no_query(self):
+        cache.clear()
+        self.assertGreater(self.queries(self.get(fields='by_commune')), 0)
+        response = self.get(fields='by_commune')
+        self.assertEqual(self.queries(response), 0)
+        self.assertEqual(set(response.json()), {'by_commune'})
+        self.assertEqual(self.queries(self.get(fields='by_user_type')), 1)  # Clé de cache propre aux champs
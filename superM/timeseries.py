@@ -0,0 +1,158 @@
+"""
+Séries temporelles par période (jour, semaine, mois, année).
+
+`bucket_series` compte les lignes d'un queryset par période entre `start` et
+`end` (dates incluses) et renvoie toutes les périodes, y compris vides, avec
+un cumul depuis l'origine des données.
+
+Les périodes closes ne changent plus qu'en cas de modification ou de
+suppression de lignes anciennes : avec une clé de cache, leurs totaux sont
+mis en cache et seule la période ouverte (celle d'aujourd'hui) est
+recomptée à chaque appel, par une requête `COUNT` bornée.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from rest_framework import serializers
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12, 'year': 5}
+MAX_BUCKETS = 1000
+# Dates acceptées : les calculs de périodes (recul de MAX_BUCKETS périodes, période suivante) restent dans les
+# bornes de `date`
+MIN_DATE, MAX_DATE = date(1900, 1, 1), date(9998, 12, 31)
+
+
+def floor_date(day, granularity):
+    """Premier jour de la période contenant `day`."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_period(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    if granularity == 'year':
+        return date(day.year + 1, 1, 1)
+    return day + timedelta(days=1)
+
+
+def shift_periods(day, granularity, count):
+    """Recule de `count` périodes à partir du début de période `day`."""
+    if granularity == 'month':
+        months = day.year * 12 + day.month - 1 - count
+        return date(months // 12, months % 12 + 1, 1)
+    if granularity == 'year':
+        return date(day.year - count, 1, 1)
+    return day - timedelta(days=count * (7 if granularity == 'week' else 1))
+
+
+def periods(start, end, granularity):
+    day = floor_date(start, granularity)
+    while day <= end:
+        yield day
+        day = next_period(day, granularity)
+
+
+def _bound(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def _parse_date(value, name):
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise serializers.ValidationError({name: "Date invalide, format attendu : AAAA-MM-JJ."})
+    if not MIN_DATE <= day <= MAX_DATE:
+        raise serializers.ValidationError({name: f"Date hors limites : du {MIN_DATE} au {MAX_DATE}."})
+    return day
+
+
+def parse_series_params(query_params, queryset=None, field='created_at', default_granularity='day'):
+    """
+    Lit `granularity`, `start` et `end` (AAAA-MM-JJ). Sans `start`, la série
+    couvre les dernières périodes (DEFAULT_BUCKETS), ou toute l'histoire du
+    queryset si `queryset` est fourni, dans la limite de MAX_BUCKETS.
+    """
+    granularity = query_params.get('granularity', default_granularity)
+    if granularity not in GRANULARITIES:
+        raise serializers.ValidationError(
+            {'granularity': f"Valeur invalide. Valeurs possibles : {', '.join(GRANULARITIES)}."}
+        )
+    end = _parse_date(query_params['end'], 'end') if query_params.get('end') else timezone.localdate()
+    if query_params.get('start'):
+        start = _parse_date(query_params['start'], 'start')
+    else:
+        start = shift_periods(floor_date(end, granularity), granularity, DEFAULT_BUCKETS[granularity] - 1)
+        if queryset is not None:
+            first = queryset.aggregate(first=Min(field))['first']
+            earliest = shift_periods(floor_date(end, granularity), granularity, MAX_BUCKETS - 1)
+            start = max(timezone.localtime(first).date(), earliest) if first else end
+    if start > end:
+        raise serializers.ValidationError({'start': "La date de début doit précéder la date de fin."})
+    if sum(1 for _ in zip(range(MAX_BUCKETS + 1), periods(start, end, granularity))) > MAX_BUCKETS:
+        raise serializers.ValidationError(
+            {'start': f"Période trop longue : {MAX_BUCKETS} périodes au maximum."}
+        )
+    return granularity, start, end
+
+
+def _closed_totals(queryset, field, granularity, start, closed_end):
+    """Totaux des périodes closes [start, closed_end[ et nombre de lignes antérieures à start."""
+    lower = _bound(floor_date(start, granularity))
+    counts = {}
+    if closed_end > floor_date(start, granularity):
+        counts = dict(
+            queryset.filter(**{f'{field}__gte': lower, f'{field}__lt': _bound(closed_end)})
+            .annotate(period=Trunc(field, granularity, output_field=DateField()))
+            .values_list('period').annotate(total=Count('pk')).order_by()
+        )
+    before = queryset.filter(**{f'{field}__lt': lower}).count()
+    return {'before': before, 'counts': counts}
+
+
+def bucket_series(queryset, granularity, start, end, field='created_at', cache_key=None):
+    """
+    Série zéro-remplie : [{'period': date, 'total': n, 'cumulative': n}, ...].
+    `cache_key` doit identifier le périmètre du queryset et changer quand des
+    lignes anciennes sont modifiées ou supprimées.
+    """
+    today = timezone.localdate()
+    open_start = floor_date(today, granularity)
+    last = floor_date(end, granularity)
+    closed_end = min(open_start, next_period(last, granularity))
+
+    if cache_key is None:
+        closed = _closed_totals(queryset, field, granularity, start, closed_end)
+    else:
+        key = f'timeseries:{cache_key}:{field}:{granularity}:{start}:{closed_end}'
+        closed = cache.get(key)
+        if closed is None:
+            closed = _closed_totals(queryset, field, granularity, start, closed_end)
+            cache.set(key, closed, getattr(settings, 'TIMESERIES_CACHE_TIMEOUT', 86400))
+
+    counts = dict(closed['counts'])
+    if open_start <= last:
+        counts[open_start] = queryset.filter(**{
+            f'{field}__gte': _bound(open_start),
+            f'{field}__lt': _bound(next_period(open_start, granularity)),
+        }).count()
+
+    cumulative = closed['before']
+    series = []
+    for period in periods(start, end, granularity):
+        total = counts.get(period, 0)
+        cumulative += total
+        series.append({'period': period, 'total': total, 'cumulative': cumulative})
+    return series
@@ -0,0 +1,40 @@
+"""
+Suivi des valeurs lues en base, pour que `save()` ne recalcule ou ne propage
+que ce qui a réellement changé.
+"""
+
+
+class LoadedValuesMixin:
+    """Valeurs lues en base (`from_db`) : `has_changed` évite les mises à jour dérivées inutiles dans `save()`."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, *attnames):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True  # Instance non lue en base : valeurs précédentes inconnues
+        return any(name not in loaded or loaded[name] != getattr(self, name) for name in attnames)
+
+    def remember_loaded_values(self, update_fields=None):
+        """Après `save()` : les valeurs enregistrées deviennent les valeurs en base."""
+        saved = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (update_fields is None or field.name in update_fields)
+        }
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **saved} if update_fields is not None else saved
+
+
+def saves_any(update_fields, names):
+    """
+    Vrai si un `save(update_fields=...)` enregistre l'un des champs `names`
+    (nom ou attname d'une clé étrangère) ; toujours vrai pour un enregistrement complet.
+    """
+    if update_fields is None:
+        return True
+    saved = set(update_fields)
+    return any(name in saved or f'{name}_id' in saved for name in names)
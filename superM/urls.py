@@ -1,7 +1,10 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .images import DERIVATIVES_DIR, serve_derivative
+from .metrics import metrics_view
+from .views import TypeaheadView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,4 +15,11 @@ urlpatterns = [
     path('api/', include('shopscollecte.urls')),
     path('api/', include('parametres.urls')),
     path('api/', include('statistique.urls')),
+    path('api/', include('sync.urls')),
+    path('api/search/', TypeaheadView.as_view(), name='search-typeahead'),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(
+        rf'^{settings.MEDIA_URL.strip("/")}/{DERIVATIVES_DIR}/(?P<path>.+)$', serve_derivative,
+        name='image-derivative'
+    ),
 ]+static(settings.MEDIA_URL,document_root=settings.MEDIA_ROOT)
\ No newline at end of file
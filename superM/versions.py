@@ -0,0 +1,56 @@
+"""
+Numéros de version des données, par table.
+
+Chaque écriture sur une table suivie incrémente sa version, après le commit.
+Les caches de résultats incluent ces versions dans leur clé : une écriture
+rend les anciennes entrées inaccessibles, sans invalidation explicite.
+
+Les versions sont stockées dans le cache Django. Avec un cache partagé
+(Redis), tous les processus voient la même version. Avec le cache mémoire
+par défaut, chaque processus a ses propres versions ; la durée de vie des
+entrées en cache borne alors le délai de prise en compte.
+
+Les écritures qui ne déclenchent pas de signaux (`update()`, `bulk_create()`)
+doivent appeler `bump_version` elles-mêmes.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+
+def _key(model):
+    """Un modèle, ou un nom libre pour une version qui n'est pas liée à une table entière."""
+    label = model if isinstance(model, str) else model._meta.label_lower
+    return f'data_version:{label}'
+
+
+def get_versions(models):
+    keys = [_key(model) for model in models]
+    versions = cache.get_many(keys)
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def _bump(models):
+    for model in models:
+        key = _key(model)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def bump_version(*models):
+    transaction.on_commit(lambda: _bump(models))
+
+
+def _bump_sender(sender, **kwargs):
+    bump_version(sender)
+
+
+def track(*models):
+    """Incrémente la version de chaque modèle à chaque save/delete."""
+    for model in models:
+        label = model._meta.label_lower
+        post_save.connect(_bump_sender, sender=model, dispatch_uid=f'data-version-save-{label}')
+        post_delete.connect(_bump_sender, sender=model, dispatch_uid=f'data-version-delete-{label}')
@@ -0,0 +1,67 @@
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.views import UserViewSet
+from products.views import ProductViewSet
+from shops.views import ShopViewSet
+from shopscollecte.views import ProductCollecteViewSet
+from .search import search, search_terms
+
+# Type de résultat -> (vue de liste dont on reprend le périmètre, champ affiché)
+TYPEAHEAD_SOURCES = {
+    'products': (ProductViewSet, 'name'),
+    'shops': (ShopViewSet, 'name'),
+    'collecte': (ProductCollecteViewSet, 'name'),
+    'users': (UserViewSet, 'username'),
+}
+
+
+class TypeaheadView(APIView):
+    """
+    Suggestions de recherche : `?q=&types=products,shops,collecte,users&limit=5`.
+    Chaque type est cherché dans le même périmètre que sa liste, sur la
+    colonne `search_text` indexée ; seuls l'identifiant et le libellé sont lus.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+    min_length = 2
+    default_limit = 5
+    max_limit = 20
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise serializers.ValidationError({'limit': "Entier attendu."})
+        return min(max(limit, 1), self.max_limit)
+
+    def get_types(self, request):
+        types = [name for name in request.query_params.get('types', '').split(',') if name]
+        unknown = set(types) - TYPEAHEAD_SOURCES.keys()
+        if unknown:
+            raise serializers.ValidationError(
+                {'types': f"Valeurs possibles : {', '.join(TYPEAHEAD_SOURCES)}."}
+            )
+        return types or list(TYPEAHEAD_SOURCES)
+
+    def get_source_queryset(self, request, view_class):
+        view = view_class(request=request, action='list', args=(), kwargs={}, format_kwarg=None)
+        return view.get_queryset()
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        limit = self.get_limit(request)
+        types = self.get_types(request)
+        results = {name: [] for name in types}
+        if len(' '.join(search_terms(query))) >= self.min_length:
+            for name in types:
+                view_class, label = TYPEAHEAD_SOURCES[name]
+                queryset = search(self.get_source_queryset(request, view_class), query)
+                results[name] = [
+                    {'id': pk, 'label': value, 'rank': round(rank, 3)}
+                    for pk, value, rank in queryset.values_list('pk', label, 'search_rank')[:limit]
+                ]
+        return Response({'query': query, 'results': results})
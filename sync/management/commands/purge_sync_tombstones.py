@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les traces de suppression plus anciennes que SYNC_TOMBSTONE_RETENTION_DAYS. "
+        "Les appareils dont le jeton est plus ancien repartent d'une synchronisation complète."
+    )
+
+    def handle(self, *args, **options):
+        days = getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90)
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} suppressions purgées."))
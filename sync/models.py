@@ -0,0 +1,21 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """Trace d'une suppression, transmise aux appareils par la synchronisation."""
+    model = models.CharField(max_length=100)  # app_label.model
+    object_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True, blank=True)  # Périmètre de la ligne supprimée
+    company_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        verbose_name = "Suppression synchronisée"
+        verbose_name_plural = "Suppressions synchronisées"
+        indexes = [
+            models.Index(fields=['model', 'deleted_at']),
+        ]
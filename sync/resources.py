@@ -0,0 +1,45 @@
+"""
+Ressources synchronisées : nom -> vue de liste (périmètre, queryset,
+serializer) et filtre des suppressions visibles par l'utilisateur.
+"""
+from django.db.models import Q
+
+from parametres.views import ReferenceBundleView
+from products.views import ProductViewSet, ProductFormatViewSet
+from shops.views import ShopViewSet
+from shopscollecte.views import ProductCollecteViewSet
+
+
+def _all(user):
+    return Q()
+
+
+def _owned(user):
+    return Q() if user.is_super_admin else Q(owner_id=user.pk)
+
+
+def _owned_unless_staff(user):
+    return Q() if user.is_staff else Q(owner_id=user.pk)
+
+
+def _tenant(user):
+    if user.is_super_admin:
+        return Q()
+    if user.company_id is None:
+        # `Q(company_id=None)` viserait les suppressions de tous les utilisateurs sans société
+        return Q(pk__in=[])
+    return Q(company_id=user.company_id)
+
+
+RESOURCES = {
+    'shops': (ShopViewSet, _owned),
+    'products_collecte': (ProductCollecteViewSet, _owned_unless_staff),
+    'products': (ProductViewSet, _tenant),
+    'product_formats': (ProductFormatViewSet, _tenant),
+    **{name: (viewset, _all) for name, viewset in ReferenceBundleView.viewsets.items()},
+}
+
+
+def synced_models():
+    return [viewset.queryset.model if viewset.queryset is not None else viewset.serializer_class.Meta.model
+            for viewset, _ in RESOURCES.values()]
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+
+from .models import Tombstone
+from .resources import synced_models
+
+
+def record_deletion(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.label_lower,
+        object_id=instance.pk,
+        owner_id=getattr(instance, 'owner_id', None),
+        company_id=getattr(instance, 'company_id', None),
+    )
+
+
+for model in synced_models():
+    post_delete.connect(record_deletion, sender=model, dispatch_uid=f'sync-tombstone-{model._meta.label_lower}')
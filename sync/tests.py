@@ -0,0 +1,92 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from products.models import Product
+from superM.testing import jwt_client, sample_data
+
+
+@override_settings(SYNC_LAG_SECONDS=0, STATS_CACHE_ENABLED=False)
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = sample_data()
+
+    def sync(self, user=None, **params):
+        response = jwt_client(user or self.data.admin).get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_resets_and_sends_everything(self):
+        body = self.sync(resources='shops,products')
+        self.assertFalse(body['has_more'])
+        shops = body['changes']['shops']
+        self.assertTrue(shops['reset'])
+        self.assertEqual({row['id'] for row in shops['upserts']}, {shop.pk for shop in self.data.shops})
+        self.assertEqual(len(body['changes']['products']['upserts']), len(self.data.products))
+
+    def test_next_sync_sends_changes_after_the_token(self):
+        token = self.sync(resources='shops')['token']
+        self.assertEqual(self.sync(resources='shops', token=token)['changes']['shops']['upserts'], [])
+        shop = self.data.shops[2]
+        shop.name = 'Boutique renommée'
+        shop.save()
+        changes = self.sync(resources='shops', token=token)['changes']['shops']
+        self.assertFalse(changes['reset'])
+        self.assertEqual([(row['id'], row['name']) for row in changes['upserts']], [(shop.pk, 'Boutique renommée')])
+
+    def test_deletions_are_sent_as_tombstones(self):
+        token = self.sync(resources='products')['token']
+        product = Product.objects.create(
+            name='Éphémère', category=self.data.products[0].category, supplier=self.data.supplier,
+            last_order=date.today()
+        )
+        product_id = product.pk
+        product.delete()
+        changes = self.sync(resources='products', token=token)['changes']['products']
+        self.assertEqual(changes['deletes'], [product_id])
+        self.assertNotIn(product_id, [row['id'] for row in changes['upserts']])
+
+    def test_pages_follow_the_token_until_has_more_is_false(self):
+        seen, token, pages = [], None, 0
+        while True:
+            body = self.sync(resources='shops', limit=2, **({'token': token} if token else {}))
+            seen += [row['id'] for row in body['changes']['shops']['upserts']]
+            token, pages = body['token'], pages + 1
+            if not body['has_more']:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(shop.pk for shop in self.data.shops))
+
+    def test_expired_token_resets_the_resource(self):
+        token = self.sync(resources='shops')['token']
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            changes = self.sync(resources='shops', token=token)['changes']['shops']
+        self.assertTrue(changes['reset'])
+        self.assertEqual(changes['deletes'], [])
+        self.assertEqual(len(changes['upserts']), len(self.data.shops))
+
+    def test_deletions_are_scoped_to_the_tenant(self):
+        user_type = self.data.supplier.user_type
+        other = User.objects.create_user('o@x.com', 'other', 'pw', user_type=user_type, company_name='Autre')
+        loners = [
+            User.objects.create_user(f'{name}@x.com', name, 'pw', user_type=user_type) for name in ('solo', 'seul')
+        ]
+        self.assertIsNone(loners[0].company_id)
+        tokens = {user: self.sync(user, resources='products')['token'] for user in (self.data.admin, self.data.supplier, *loners)}
+        deleted = {}
+        for user in (self.data.supplier, other, loners[0]):
+            product = Product.objects.create(
+                name='Éphémère', category=self.data.products[0].category, supplier=user, last_order=date.today()
+            )
+            deleted[user] = product.pk
+            product.delete()
+
+        def deletes(user):
+            return self.sync(user, resources='products', token=tokens[user])['changes']['products']['deletes']
+
+        self.assertEqual(deletes(self.data.supplier), [deleted[self.data.supplier]])
+        self.assertEqual(deletes(loners[1]), [])  # Sans société : pas les suppressions des autres sans société
+        self.assertEqual(sorted(deletes(self.data.admin)), sorted(deleted.values()))
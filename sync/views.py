@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Tombstone
+from .resources import RESOURCES
+
+TOKEN_SALT = 'sync.token'
+
+
+def _keyset_after(field, cursor):
+    """Lignes strictement après le curseur (horodatage, id)."""
+    stamp, pk = cursor
+    return Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'pk__gt': pk})
+
+
+def _encode_cursor(stamp, pk):
+    return [stamp.isoformat(), pk]
+
+
+def _decode_cursor(value):
+    return datetime.fromisoformat(value[0]), int(value[1])
+
+
+@method_decorator(gzip_page, name='dispatch')
+class SyncView(APIView):
+    """
+    Synchronisation incrémentale des appareils :
+    `GET /api/sync/?token=&resources=shops,products,...&limit=500`.
+
+    Sans jeton, tout le périmètre de l'utilisateur est envoyé. Chaque réponse
+    contient, par ressource, les lignes créées ou modifiées (`upserts`, triées
+    par `updated_at`) et les identifiants supprimés (`deletes`), ainsi qu'un
+    nouveau jeton à renvoyer à l'appel suivant. Tant que `has_more` est vrai,
+    il reste des pages. `reset` indique que les suppressions ne sont plus
+    connues depuis ce jeton : l'appareil doit vider la ressource avant
+    d'appliquer la page. Les réponses sont compressées en gzip.
+
+    Les lignes modifiées dans les dernières secondes (SYNC_LAG_SECONDS) ne sont
+    envoyées qu'à l'appel suivant, pour ne pas manquer une transaction encore
+    en cours au moment de la lecture.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+    default_limit = 500
+    max_limit = 2000
+
+    def get_resources(self, request):
+        names = [name for name in request.query_params.get('resources', '').split(',') if name]
+        unknown = set(names) - RESOURCES.keys()
+        if unknown:
+            raise serializers.ValidationError({'resources': f"Valeurs possibles : {', '.join(RESOURCES)}."})
+        return names or list(RESOURCES)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise serializers.ValidationError({'limit': "Entier attendu."})
+        return min(max(limit, 1), self.max_limit)
+
+    def get_cursors(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return {}
+        try:
+            data = signing.loads(token, salt=TOKEN_SALT)
+            return {
+                name: (_decode_cursor(value['u']), _decode_cursor(value['d']))
+                for name, value in data['c'].items()
+            }
+        except (signing.BadSignature, KeyError, TypeError, ValueError, IndexError):
+            raise serializers.ValidationError({'token': "Jeton de synchronisation invalide."})
+
+    def sync_resource(self, request, name, cursors, until, limit):
+        viewset, tombstone_scope = RESOURCES[name]
+        view = viewset(request=request, action='list', args=(), kwargs={}, format_kwarg=None)
+        # Préchargement du sérialiseur ; `updated_at` gardé pour le curseur
+        queryset = view.plan_queryset(view.get_queryset(), extra_columns=('updated_at',)).filter(updated_at__lte=until)
+        retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+        reset = cursors is not None and cursors[1][0] < timezone.now() - retention
+        if cursors is None or reset:
+            upsert_cursor, delete_cursor = None, (until, 0)
+        else:
+            upsert_cursor, delete_cursor = cursors
+
+        if upsert_cursor is not None:
+            queryset = queryset.filter(_keyset_after('updated_at', upsert_cursor))
+        rows = list(queryset.order_by('updated_at', 'pk')[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        upsert_cursor = (rows[-1].updated_at, rows[-1].pk) if more else (until, 0)
+
+        deletes = []
+        if not reset and cursors is not None:
+            tombstones = list(
+                Tombstone.objects.filter(
+                    tombstone_scope(request.user), _keyset_after('deleted_at', delete_cursor),
+                    model=queryset.model._meta.label_lower, deleted_at__lte=until
+                ).order_by('deleted_at', 'pk').values_list('deleted_at', 'pk', 'object_id')[:limit + 1]
+            )
+            more = more or len(tombstones) > limit
+            tombstones = tombstones[:limit]
+            deletes = [object_id for _, _, object_id in tombstones]
+            delete_cursor = tombstones[-1][:2] if len(tombstones) == limit else (until, 0)
+
+        return more, {'u': _encode_cursor(*upsert_cursor), 'd': _encode_cursor(*delete_cursor)}, {
+            'reset': cursors is None or reset,
+            'upserts': view.get_serializer(rows, many=True).data,
+            'deletes': deletes,
+        }
+
+    def get(self, request):
+        names = self.get_resources(request)
+        limit = self.get_limit(request)
+        cursors = self.get_cursors(request)
+        until = timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_LAG_SECONDS', 5))
+
+        has_more = False
+        token = {
+            name: {'u': _encode_cursor(*upserts), 'd': _encode_cursor(*deletes)}
+            for name, (upserts, deletes) in cursors.items()
+        }
+        changes = {}
+        for name in names:
+            more, token[name], changes[name] = self.sync_resource(request, name, cursors.get(name), until, limit)
+            has_more = has_more or more
+        return Response({
+            'token': signing.dumps({'c': token}, salt=TOKEN_SALT, compress=True),
+            'until': until,
+            'has_more': has_more,
+            'changes': changes,
+        })